@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+"""Micro-benchmark the vectorized cleaning code in `spreads`.
+
+Build raw tables shaped like `read_html`'s output for several seasons, clean
+them with the vectorized functions in `spreads` and with the row-at-a-time
+implementation they replaced, check that both give the same tables, and print
+how long each took. Run it from the repository's root directory:
+
+    $ python3 benchmarks/bench_cleaning.py --seasons 6
+"""
+
+import os
+import sys
+import random
+import timeit
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import spreads
+
+
+GAMES_PER_SEASON = 267
+ROWS_PER_GAME = 60
+SEASON_COLUMNS = ['Week', 'Day', 'Date', 'Unnamed: 3', 'Winner/tie',
+				  'Unnamed: 5', 'Loser/tie', 'PtsW', 'PtsL', 'YdsW', 'TOW',
+				  'YdsL', 'TOL']
+TEAMS = ['Denver Broncos', 'Baltimore Ravens', 'St. Louis Rams',
+		 'San Francisco 49ers', 'New England Patriots', 'Buffalo Bills']
+
+
+def raw_movement(year, rng):
+	"A season's worth of line-movement rows as `read_html` returns them."
+	rows = []
+	for i in range(GAMES_PER_SEASON * ROWS_PER_GAME):
+		month = rng.choice(['09', '10', '11', '12', '01', '02'])
+		rows.append(['%s/%02d %02d:%02d' % (month, rng.randint(1, 28),
+											rng.randint(0, 23),
+											rng.randint(0, 59))] +
+					[rng.choice(['--', '(Pick)', '-3', '-3.5', '-7'])
+					 for _ in range(3)])
+	return pd.DataFrame(rows, columns=['Unnamed: 0', 'Pinnacle', 'BetOnline',
+									   'Bookmaker'], dtype=object)
+
+
+def raw_season_games(year, rng):
+	"A season's table of games as `read_html` returns it."
+	header = SEASON_COLUMNS
+	rows = []
+	for i in range(GAMES_PER_SEASON):
+		if i % 16 == 15:
+			rows.append(header)
+		if i == GAMES_PER_SEASON - 11:
+			rows.append(['nan'] * len(header))
+		week = str(1 + i // 16) if i < GAMES_PER_SEASON - 11 else rng.choice(
+			list(spreads._PLAYOFF_WEEKS))
+		month = rng.choice(['September', 'October', 'November', 'December']
+						   if week.isdigit() else ['January', 'February'])
+		winner, loser = rng.sample(TEAMS, 2)
+		rows.append([week, 'Sun', '%s %d' % (month, rng.randint(1, 28)),
+					 'boxscore', winner, rng.choice(['@', 'nan']), loser] +
+					[str(rng.randint(0, 500)) for _ in range(6)])
+	return pd.DataFrame(rows, columns=header, dtype=object)
+
+
+# The legacy functions pass format='mixed' to pd.to_datetime so that current
+# versions of Pandas infer each string's format, as older versions did.
+
+def legacy_movement(t, name, year):
+	"The row-at-a-time cleaning that `spreads._clean_movement` replaced."
+	date_col = t.columns[0]
+	datetime = pd.to_datetime(
+		t[date_col]
+		.replace(r'(\d\d?/\d\d?)', r'\1/%d' % year, regex=True)
+		.replace(r'(01|02)/(\d\d?)/\d{4}', r'\1/\2/%d' % (year + 1),
+				 regex=True), format='mixed')
+	del t[date_col]
+	for column in t.keys():
+		t[column] = (t[column]
+					 .replace('--', 'nan')
+					 .replace('(Pick)', 0)
+					 .apply(float))
+	t['datetime'] = datetime
+	t.columns = [h.lower() for h in t.columns]
+	for col in 'pinnacle', 'betonline', 'bookmaker':
+		t[col + '_' + name] = t[col]
+		del t[col]
+	return t
+
+
+def legacy_season_games(data, year):
+	"The row-at-a-time cleaning that `spreads._clean_season_games` replaced."
+	del data["Unnamed: 3"]
+	data = data[(data.Week != "Week") & (data.Week != "nan")]
+	data['week'] = (data.Week
+					.replace("WildCard", "wild-card")
+					.replace("Division", "divisional")
+					.replace("ConfChamp", "conference")
+					.replace("SuperBowl", "super-bowl")
+					.apply(
+						lambda s: (int(s)
+								   if all(c in '1234567890' for c in s)
+								   else s)))
+	del data['Week']
+	data['season'] = year
+	data['game_date'] = pd.to_datetime(
+		data.Date
+		.replace(r"$", r", %d" % year, regex=True)
+		.replace(r"^(January|February) (\d+), \d+$", r"\1 \2, %d" % (year + 1),
+				 regex=True), format='mixed')
+	del data['Date']
+	for column in "PtsW", "PtsL", "YdsW", "TOW", "YdsL", "TOL":
+		data[column] = data[column].apply(int)
+	data['WatL'] = data['Unnamed: 5'].apply(lambda x: x == '@')
+	del data['Unnamed: 5']
+	data['hometeam'] = (~data.WatL * data['Winner/tie'] +
+						data.WatL * data['Loser/tie'])
+	data['awayteam'] = (data.WatL * data['Winner/tie'] +
+						~data.WatL * data['Loser/tie'])
+	data['winner'] = data['Winner/tie']
+	for column in 'Winner/tie', 'Loser/tie', "WatL":
+		del data[column]
+	for column in 'hometeam', 'awayteam', 'winner':
+		data[column] = data[column].apply(lambda s: s.split()[-1].lower())
+	return data
+
+
+def assert_same(expected, actual):
+	pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+	for column in expected:
+		if expected[column].dtype.kind in 'ifM':
+			assert expected[column].dtype == actual[column].dtype, column
+
+
+def bench(label, fresh, implementations, repeat):
+	"Time each of `implementations` on copies of the `fresh` tables."
+	results, times = [], []
+	for clean in implementations:
+		results.append([clean(t.copy(), year) for year, t in fresh])
+		timer = timeit.Timer(lambda: [clean(t.copy(), y) for y, t in fresh])
+		times.append(min(timer.repeat(repeat, number=1)))
+	for expected, actual in zip(*results):
+		assert_same(expected, actual)
+	(old, new), rows = times, sum(len(t) for _, t in fresh)
+	print('%-13s %9d rows  legacy %8.3fs  vectorized %8.3fs  speedup %5.1fx'
+		  % (label, rows, old, new, old / new))
+
+
+def main(args):
+	a = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	a.add_argument('--seasons', type=int, default=6)
+	a.add_argument('--repeat', type=int, default=3)
+	args = a.parse_args(args)
+	rng = random.Random(0)
+	years = range(spreads.EARLIEST_DATA_SEASON,
+				  spreads.EARLIEST_DATA_SEASON + args.seasons)
+	movement = [(year, raw_movement(year, rng)) for year in years]
+	games = [(year, raw_season_games(year, rng)) for year in years]
+	bench('movement', movement,
+		  [lambda t, y: legacy_movement(t, 'spread', y),
+		   lambda t, y: spreads._clean_movement(t, 'spread', y)],
+		  args.repeat)
+	bench('season_games', games,
+		  [legacy_season_games, spreads._clean_season_games], args.repeat)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,249 @@
+#! /usr/bin/env python
+"""Benchmark downloading whole games and seasons without touching the network.
+
+Serve the sites `spreads` downloads from on localhost (see `fakesite`) with a
+given latency and jitter, point `spreads` at the local server, and time
+`game`, `season_games`, `season`, `seasons`, and `hometeamify` at several
+levels of concurrency and numbers of seasons. For each run, print the
+throughput in games per second, the median and 95th percentile latency of each
+call (of each game, for `season` and `seasons`), and the peak resident memory.
+Each run happens in a fresh process so that its peak memory is its own. Run it
+from the repository's root directory:
+
+    $ python3 benchmarks/bench_download.py --latency 0.05 --jitter 0.02 \\
+        --concurrency 1 8 32 --seasons 1 3
+
+The pages are generated to look like the real sites'. To benchmark with real
+pages instead, record them once with `--record DIR`, which needs the network,
+and then pass `--pages DIR` to every later run.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import multiprocessing
+from concurrent import futures
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import spreads
+import fakesite
+
+try:
+	import resource
+except ImportError:  # Windows
+	resource = None
+
+
+def peak_rss_mb():
+	"Return this process's peak resident memory in MiB, or NaN if unknown."
+	if resource is None:
+		return float('nan')
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Linux reports kibibytes, macOS bytes.
+	return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+def _timed(f, samples):
+	"Wrap `f` to append the number of seconds each call takes to `samples`."
+	@functools.wraps(f)
+	def wrapper(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return f(*args, **kwargs)
+		finally:
+			samples.append(time.perf_counter() - start)
+	return wrapper
+
+
+# Each bench_* function returns the number of games it handled, the number of
+# seconds it took, and a list of the seconds each call took.
+
+
+def bench_game(options, years):
+	"Time `game` on the first `options.games` games of the first season."
+	spreads.set_homeaway_index(spreads.HomeAwayIndex())
+	games = spreads.season_games(years[0]).head(options.games)
+	args = []
+	for arg in zip(games.hometeam, games.awayteam, games.week):
+		arg += (years[0],)
+		# Learn which order of teams works before timing anything.
+		table = spreads.game_unknown_homeaway(*arg, parser=options.parser)
+		args.append(arg[1::-1] + arg[2:]
+					if table.home_away_discrepency.any() else arg)
+	spreads.set_homeaway_index(None)
+	samples = []
+	game = _timed(spreads.game, samples)
+	start = time.perf_counter()
+	for arg in args:
+		game(*arg, parser=options.parser)
+	return len(args), time.perf_counter() - start, samples
+
+
+def bench_season_games(options, years):
+	"Time `season_games` once for each season."
+	samples = []
+	season_games = _timed(spreads.season_games, samples)
+	start = time.perf_counter()
+	n = sum(len(season_games(year)) for year in years)
+	return n, time.perf_counter() - start, samples
+
+
+def bench_seasons(options, years, concurrency):
+	"Time `season` on one season or `seasons` on several."
+	samples = []
+	spreads.game_unknown_homeaway = _timed(spreads.game_unknown_homeaway,
+										   samples)
+	kwargs = dict(concurrency=concurrency, parser=options.parser,
+				  parse_processes=options.parse_processes)
+	start = time.perf_counter()
+	if len(years) == 1:
+		table, failures = spreads.season(years[0], **kwargs)
+	else:
+		table, failures = spreads.seasons(years, **kwargs)
+	elapsed = time.perf_counter() - start
+	if failures:
+		print('%d games failed' % len(failures), file=sys.stderr)
+	return len(samples), elapsed, samples
+
+
+def bench_hometeamify(options, years):
+	"Time `hometeamify` on the first season's table."
+	table, _ = spreads.season(years[0], concurrency=options.concurrency[-1],
+							  parser=options.parser)
+	samples = []
+	hometeamify = _timed(spreads.hometeamify, samples)
+	start = time.perf_counter()
+	for _ in range(options.repeat):
+		hometeamify(table)
+	n = len(table.groupby(['hometeam', 'awayteam', 'week'])) * options.repeat
+	return n, time.perf_counter() - start, samples
+
+
+def run(base, name, options, years, concurrency=None):
+	"""Run benchmark `name` against the site at `base` and return its results.
+
+	This runs in a fresh process for each benchmark.
+	"""
+	fakesite.install(base)
+	if options.adaptive:
+		spreads.set_limiter(spreads.AdaptiveLimiter(
+			max_concurrency=2 * max(options.concurrency)))
+	bench = globals()['bench_' + name]
+	args = (options, years) if concurrency is None else (
+		options, years, concurrency)
+	n, elapsed, samples = bench(*args)
+	return {
+		'benchmark': name, 'concurrency': concurrency, 'seasons': len(years),
+		'games': n, 'seconds': elapsed, 'games_per_second': n / elapsed,
+		'p50_ms': 1000 * np.percentile(samples, 50),
+		'p95_ms': 1000 * np.percentile(samples, 95),
+		'peak_rss_mb': peak_rss_mb(),
+	}
+
+
+def runs(options):
+	"Generate the (name, years, concurrency) of each benchmark to run."
+	first = options.first_year
+	one = [first]
+	yield 'game', one, None
+	yield 'season_games', list(range(first, first + max(options.seasons))), None
+	for n in options.seasons:
+		for concurrency in options.concurrency:
+			yield 'seasons', list(range(first, first + n)), concurrency
+	yield 'hometeamify', one, None
+
+
+# The name, width, and format of each column of the output.
+_COLUMNS = (('benchmark', 12, ''), ('concurrency', 11, 'd'), ('seasons', 7, 'd'),
+			('games', 6, 'd'), ('seconds', 8, '.2f'),
+			('games_per_second', 16, '.1f'), ('p50_ms', 8, '.1f'),
+			('p95_ms', 8, '.1f'), ('peak_rss_mb', 11, '.1f'))
+
+
+def print_row(cells):
+	"Print a row of `cells`, a dict like `run` returns, lined up in columns."
+	print('  '.join(_align(cells[key], width, spec)
+					for key, width, spec in _COLUMNS), flush=True)
+
+
+def _align(value, width, spec):
+	if isinstance(value, str):
+		return value.ljust(width)
+	return ('-' if value is None else format(value, spec)).rjust(width)
+
+
+def parse_args(args):
+	a = argparse.ArgumentParser(
+		description=__doc__.split('\n\n')[0],
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	a.add_argument('--latency', type=float, default=0.05,
+				   help='seconds the server waits before each response')
+	a.add_argument('--jitter', type=float, default=0.02,
+				   help='the most seconds to add to or take from the latency')
+	a.add_argument('--handshake', type=float, default=0.0,
+				   help='seconds each new connection waits before answering')
+	a.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+				   metavar='N', help='numbers of threads to try')
+	a.add_argument('--capacity', type=int, metavar='N',
+				   help=('have the server answer 503 to requests beyond N at '
+						 'once'))
+	a.add_argument('--adaptive', action='store_true',
+				   help='download with spreads.AdaptiveLimiter')
+	a.add_argument('--seasons', type=int, nargs='+', default=[1, 2],
+				   metavar='N', help='numbers of seasons to try')
+	a.add_argument('--first-year', type=int, default=2013,
+				   help='the first season to download')
+	a.add_argument('--games', type=int, default=20,
+				   help='number of games to time game() on')
+	a.add_argument('--repeat', type=int, default=20,
+				   help='number of times to time hometeamify()')
+	a.add_argument('--parser', choices=sorted(spreads._PARSERS),
+				   default=spreads._DEFAULT_PARSER)
+	a.add_argument('--parse-processes', type=int, metavar='N',
+				   help='parse pages in N processes')
+	a.add_argument('--pages', metavar='DIR',
+				   help='serve pages recorded in DIR where there are any')
+	a.add_argument('--record', metavar='DIR',
+				   help=('instead of benchmarking, record the real pages of '
+						 'the seasons benchmarked into DIR'))
+	a.add_argument('--json', metavar='FILE',
+				   help='also write the results to FILE as JSON')
+	return a.parse_args(args)
+
+
+def main(args):
+	options = parse_args(args)
+	if options.record is not None:
+		last = options.first_year + max(options.seasons)
+		fakesite.record(options.record, range(options.first_year, last))
+		return 0
+	server = fakesite.serve(options.latency, options.jitter, options.pages,
+							options.capacity, options.handshake)
+	base = fakesite.base_url(server)
+	print('  '.join(key.rjust(width) if spec else key.ljust(width)
+					for key, width, spec in _COLUMNS))
+	results = []
+	context = multiprocessing.get_context('spawn')
+	try:
+		for name, years, concurrency in runs(options):
+			with futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+				result = pool.submit(run, base, name, options, years,
+									 concurrency).result()
+			print_row(result)
+			results.append(result)
+	finally:
+		server.shutdown()
+	if options.json is not None:
+		with open(options.json, 'w') as f:
+			json.dump({'options': vars(options), 'results': results}, f,
+					  indent=2)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
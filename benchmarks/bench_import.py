@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+"""Benchmark how long `spreads` takes to start up.
+
+Time, each in a fresh interpreter, importing `spreads`, running `spreads.py`
+with `--version`, `--help`, and `--dry-run`, and, for comparison, importing
+the parsing stack that `spreads` puts off importing until it parses a page.
+Print the median and fastest time of each. With `--budget`, exit with status
+1 if importing `spreads` takes longer than that. Run it from the repository's
+root directory:
+
+    $ python3 benchmarks/bench_import.py --repeat 10 --budget 250
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'spreads.py')
+
+
+def commands(cache_dir):
+	"Return the (name, argv) of each command to time."
+	python = sys.executable
+	return [
+		('python', [python, '-c', 'pass']),
+		('import spreads', [python, '-c', 'import spreads']),
+		('--version', [python, SCRIPT, '--version']),
+		('--help', [python, SCRIPT, '--help']),
+		('--dry-run', [python, SCRIPT, '--dry-run', '--year', '2013',
+					   '--cache-dir', cache_dir, '--verbosity', 'ERROR']),
+		('parsing stack', [python, '-c',
+						   'import pandas, bs4, lxml.html, pandas.io.html']),
+	]
+
+
+def time_command(argv, repeat):
+	"Return the seconds each of `repeat` runs of `argv` took."
+	samples = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		subprocess.run(argv, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+		samples.append(time.perf_counter() - start)
+	return samples
+
+
+def main(args):
+	a = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	a.add_argument('--repeat', type=int, default=5)
+	a.add_argument('--budget', type=float, metavar='MS',
+				   help='fail if importing spreads takes more than MS ms')
+	args = a.parse_args(args)
+	print('%-16s %10s %10s' % ('command', 'median_ms', 'min_ms'))
+	results = {}
+	with tempfile.TemporaryDirectory() as cache_dir:
+		for name, argv in commands(cache_dir):
+			samples = time_command(argv, args.repeat)
+			results[name] = statistics.median(samples)
+			print('%-16s %10.1f %10.1f' % (
+				name, 1000 * results[name], 1000 * min(samples)), flush=True)
+	if args.budget is not None and 1000 * results['import spreads'] > args.budget:
+		print('Importing spreads took more than %g ms' % args.budget,
+			  file=sys.stderr)
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,331 @@
+"""A local stand-in for the web sites `spreads` downloads from.
+
+`serve` starts an HTTP server on localhost that answers the URLs of
+`spreads.season_games_url`, `spreads.spread_url`, and `spreads.over_under_url`
+after an artificial delay, and `install` points `spreads` at it. Pages come
+from a directory of pages recorded from the real sites (see `record`) when one
+is given, and are otherwise generated to look like the real sites' pages: the
+same tables, subheaders, and links, a full 32-team schedule, a few games whose
+home and away teams disagree between the two sites, and enough navigation
+boilerplate to make the pages about as big as the real ones.
+"""
+
+import os
+import re
+import time
+import gzip
+import zlib
+import random
+import datetime
+import threading
+import http.server
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+import spreads
+
+
+CITIES = {
+	'cardinals': 'Arizona', 'falcons': 'Atlanta', 'ravens': 'Baltimore',
+	'bills': 'Buffalo', 'panthers': 'Carolina', 'bears': 'Chicago',
+	'bengals': 'Cincinnati', 'browns': 'Cleveland', 'cowboys': 'Dallas',
+	'broncos': 'Denver', 'lions': 'Detroit', 'packers': 'Green Bay',
+	'texans': 'Houston', 'colts': 'Indianapolis', 'jaguars': 'Jacksonville',
+	'chiefs': 'Kansas City', 'dolphins': 'Miami', 'vikings': 'Minnesota',
+	'patriots': 'New England', 'saints': 'New Orleans', 'giants': 'New York',
+	'jets': 'New York', 'raiders': 'Oakland', 'eagles': 'Philadelphia',
+	'steelers': 'Pittsburgh', 'chargers': 'San Diego', '49ers': 'San Francisco',
+	'seahawks': 'Seattle', 'rams': 'St. Louis', 'buccaneers': 'Tampa Bay',
+	'titans': 'Tennessee', 'redskins': 'Washington',
+}
+TEAMS = sorted(CITIES)
+REGULAR_WEEKS = 17
+PLAYOFFS = (('WildCard', 'January 5', 6), ('Division', 'January 12', 4),
+			('ConfChamp', 'January 19', 2), ('SuperBowl', 'February 2', 1))
+MOVEMENT_ROWS = 60
+# Share of games whose home team on the spreads site is the schedule's away
+# team.
+DISCREPANCY_RATE = 0.05
+
+_SEASON_HEADER = ('Week', 'Day', 'Date', '', 'Winner/tie', '', 'Loser/tie',
+				  'PtsW', 'PtsL', 'YdsW', 'TOW', 'YdsL', 'TOL')
+_GAME_PATH = '/nfl/matchup/{hometeam}-{awayteam}-{week}-{year:n}'
+_SEASON_PATH = '/years/{year:n}/games.htm'
+_GAME_RE = re.compile(r'^/nfl/matchup/(?P<hometeam>[a-z0-9]+)-'
+					  r'(?P<awayteam>[a-z0-9]+)-(?P<week>[a-z0-9-]+)-'
+					  r'(?P<year>\d{4})/(?P<kind>spread|over-under)-movement$')
+_SEASON_RE = re.compile(r'^/years/(?P<year>\d{4})/games\.htm$')
+
+
+def _rng(*key):
+	"Return a random number generator seeded reproducibly from `key`."
+	return random.Random(zlib.crc32(repr(key).encode()))
+
+
+def _full_name(team):
+	return '%s %s' % (CITIES[team], team.capitalize())
+
+
+def _slug(team):
+	return '%s-%s' % (CITIES[team].lower().replace(' ', '-').replace('.', ''),
+					  team)
+
+
+def schedule(year):
+	"""Return the games of the season starting in `year`.
+
+	Each game is a tuple of pro-football-reference's week, date, winner,
+	loser, and whether the winner was the away team.
+	"""
+	rng = _rng('schedule', year)
+	games = []
+	for week in range(1, REGULAR_WEEKS + 1):
+		teams = TEAMS[:]
+		rng.shuffle(teams)
+		day = datetime.date(year, 9, 7) + datetime.timedelta(weeks=week - 1)
+		date = '%s %d' % (day.strftime('%B'), day.day)
+		for i in range(0, len(teams), 2):
+			games.append((str(week), date, teams[i], teams[i + 1],
+						  rng.random() < 0.5))
+	teams = TEAMS[:]
+	for week, date, n in PLAYOFFS:
+		rng.shuffle(teams)
+		for i in range(n):
+			games.append((week, date, teams[2 * i], teams[2 * i + 1],
+						  rng.random() < 0.5))
+	return games
+
+
+def season_page(year):
+	"Return a pro-football-reference-like page of the games in `year`."
+	head = ''.join('<th>%s</th>' % h for h in _SEASON_HEADER)
+	rows = []
+	for i, (week, date, winner, loser, at) in enumerate(schedule(year)):
+		if i and i % 16 == 0:
+			# The real page repeats its header every so often.
+			rows.append('<tr class="thead">%s</tr>' % head.replace('th>', 'td>'))
+		if week == PLAYOFFS[0][0] and rows and 'Playoffs' not in rows[-1]:
+			rows.append('<tr>%s</tr>' % ''.join(
+				'<td>%s</td>' % ('Playoffs' if h == 'Date' else '')
+				for h in _SEASON_HEADER))
+		rng = _rng('score', year, week, winner)
+		cells = (week, 'Sun', date, '<a href="/boxscores/">boxscore</a>',
+				 '<a href="/teams/">%s</a>' % _full_name(winner),
+				 '@' if at else '', '<a href="/teams/">%s</a>' % _full_name(loser),
+				 rng.randint(21, 45), rng.randint(0, 20), rng.randint(250, 500),
+				 rng.randint(0, 3), rng.randint(150, 450), rng.randint(0, 4))
+		rows.append('<tr>%s</tr>' % ''.join('<td>%s</td>' % c for c in cells))
+	return ('<html><head><title>%d NFL Weekly League Schedule</title></head>'
+			'<body>%s<table id="games" class="sortable stats_table">'
+			'<thead><tr>%s</tr></thead><tbody>%s</tbody></table>%s'
+			'</body></html>' % (year, _BOILERPLATE, head, ''.join(rows),
+								_BOILERPLATE)).encode()
+
+
+def _spreads_site_games(year):
+	"Return the (hometeam, awayteam, week) of each game on the spreads site."
+	for week, _, winner, loser, at in schedule(year):
+		hometeam, awayteam = (loser, winner) if at else (winner, loser)
+		if _rng('discrepancy', year, week, hometeam).random() < DISCREPANCY_RATE:
+			hometeam, awayteam = awayteam, hometeam
+		if week.isdigit():
+			week = 'week-' + week
+		else:
+			week = spreads._PLAYOFF_WEEKS[week]
+		yield hometeam, awayteam, week
+
+
+def movement_page(kind, hometeam, awayteam, week, year):
+	"""Return a teamrankings-like spread or over-under movement page.
+
+	`kind` is 'spread' or 'over-under'.
+	"""
+	rng = _rng(kind, hometeam, awayteam, week, year)
+	favored = rng.choice((hometeam, awayteam))
+	if kind == 'spread':
+		table, corner = '<table id="table-000" class="datatable">', ''
+		lines = ['--', '(Pick)', '-1', '-2.5', '-3', '-3.5', '-6.5', '-7']
+	else:
+		table, corner = '<table cellspacing="0" class="datatable">', '&nbsp;'
+		lines = ['--', '41', '43.5', '44', '46.5', '47']
+	rows = ['<tr><td>Open</td>%s</tr>' % ('<td>-3</td>' * 3),
+			'<tr><td>Current</td>%s</tr>' % ('<td>-3</td>' * 3),
+			'<tr><td colspan="4">Line Movement History</td></tr>']
+	month = 1 if week in ('wild-card', 'divisional', 'conference') else (
+		2 if week == 'super-bowl' else 9)
+	for i in range(MOVEMENT_ROWS):
+		rows.append('<tr><td>%02d/%02d %02d:%02d</td>%s</tr>' % (
+			month, 1 + i % 28, i % 24, rng.randint(0, 59),
+			''.join('<td>%s</td>' % rng.choice(lines) for _ in range(3))))
+	return ('<html><head><title>Line Movement</title></head><body>%s'
+			'<p class="h1-sub"><strong>Sun Sep 8 | Odds: %s by 3, O/U 44 | '
+			'<a href="/nfl/team/%s">%s</a> at <a href="/nfl/team/%s">%s</a>'
+			'</strong></p>%s<thead><tr><th>%s</th><th>Pinnacle</th>'
+			'<th>BetOnline</th><th>Bookmaker</th></tr></thead><tbody>%s'
+			'</tbody></table>%s</body></html>' % (
+				_BOILERPLATE, CITIES[favored], _slug(awayteam),
+				CITIES[awayteam], _slug(hometeam), CITIES[hometeam], table,
+				corner, ''.join(rows), _BOILERPLATE)).encode()
+
+
+# About 20 KB of navigation links, which the real pages have plenty of.
+_BOILERPLATE = '<div class="nav"><ul>%s</ul></div>' % ''.join(
+	'<li><a href="/nfl/team/%s/stats/%d">%s stat %d</a></li>' %
+	(_slug(team), i, _full_name(team), i) for team in TEAMS for i in range(8))
+
+
+class _Site:
+	"The pages of the stand-in site, generated or read from `directory`."
+
+	def __init__(self, directory=None):
+		self.directory = directory
+		self._games = {}
+		self._lock = threading.Lock()
+
+	def page(self, path):
+		"Return the page at `path`, or `None` if there is none."
+		if self.directory is not None:
+			try:
+				with open(os.path.join(self.directory, path.lstrip('/')),
+						  'rb') as f:
+					return f.read()
+			except FileNotFoundError:
+				pass
+		m = _SEASON_RE.match(path)
+		if m:
+			return season_page(int(m.group('year')))
+		m = _GAME_RE.match(path)
+		if m:
+			year = int(m.group('year'))
+			game = m.group('hometeam', 'awayteam', 'week')
+			if game in self._year_games(year):
+				return movement_page(m.group('kind'), *game, year=year)
+		return None
+
+	def _year_games(self, year):
+		with self._lock:
+			if year not in self._games:
+				self._games[year] = set(_spreads_site_games(year))
+			return self._games[year]
+
+
+def serve(latency=0.0, jitter=0.0, directory=None, capacity=None,
+		  handshake=0.0):
+	"""Start serving the stand-in site on localhost in a background thread.
+
+	Each response waits `latency` seconds plus or minus up to `jitter`
+	seconds. If `directory` is given, serve pages recorded there by `record`
+	in preference to generated ones. If `capacity` is given, answer requests
+	beyond that many at once with 503 Service Unavailable, like an overloaded
+	site. Each new connection waits another `handshake` seconds before its
+	first response, like the round trips of a TCP and TLS handshake to a
+	distant site. Return the server; call its `shutdown` method to stop it.
+	"""
+	site = _Site(directory)
+	lock = threading.Lock()
+	active = [0]
+
+	class Handler(http.server.BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+		# Headers and body go out in separate writes, which on a kept-alive
+		# connection would wait on the client's delayed ACK.
+		disable_nagle_algorithm = True
+
+		def setup(self):
+			super().setup()
+			if handshake > 0:
+				time.sleep(handshake)
+
+		def do_GET(self):
+			with lock:
+				active[0] += 1
+				overloaded = capacity is not None and active[0] > capacity
+			try:
+				if overloaded:
+					self.send_error(503)
+				else:
+					self._send_page()
+			except ConnectionError: # The client gave up, as on a timeout.
+				pass
+			finally:
+				with lock:
+					active[0] -= 1
+
+		def _send_page(self):
+			delay = latency + random.uniform(-jitter, jitter)
+			if delay > 0:
+				time.sleep(delay)
+			body = site.page(self.path)
+			if body is None:
+				# The spreads site answers unknown games with a page that
+				# lacks the tables rather than with a 404.
+				body = b'<html><body><p>Game not found</p></body></html>'
+			# Like the real sites, answer conditional requests for pages that
+			# haven't changed with 304 Not Modified.
+			etag = '"%08x"' % zlib.crc32(body)
+			if self.headers.get('If-None-Match') == etag:
+				self.send_response(304)
+				self.send_header('ETag', etag)
+				self.end_headers()
+				return
+			self.send_response(200)
+			self.send_header('ETag', etag)
+			self.send_header('Content-Type', 'text/html; charset=utf-8')
+			# Like the real sites, compress pages for clients that accept it.
+			if 'gzip' in self.headers.get('Accept-Encoding', ''):
+				body = gzip.compress(body, 6)
+				self.send_header('Content-Encoding', 'gzip')
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, *args):
+			pass
+
+	server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+def base_url(server):
+	"Return the URL of the root of the site that `server` serves."
+	return 'http://%s:%d' % server.server_address[:2]
+
+
+def install(base):
+	"""Point `spreads` at the stand-in site whose root URL is `base`.
+
+	Also turn off `spreads`' page cache and home/away index so that every call
+	really downloads its pages.
+	"""
+	game = base + _GAME_PATH
+	spreads._SPREAD_URL_TEMPLATE = game + '/spread-movement'
+	spreads._OVER_UNDER_URL_TEMPLATE = game + '/over-under-movement'
+	spreads._SEASON_URL_TEMPLATE = base + _SEASON_PATH
+	spreads.set_cache(None)
+	spreads.set_homeaway_index(None)
+
+
+def record(directory, years):
+	"""Save the real sites' pages for the seasons `years` under `directory`.
+
+	Record the schedule and both orders of teams for every game, so that
+	`serve` can replay everything `spreads.season` downloads.
+	"""
+	def save(path, url):
+		filename = os.path.join(directory, path.lstrip('/'))
+		os.makedirs(os.path.dirname(filename), exist_ok=True)
+		with urlopen(url) as response, open(filename, 'wb') as f:
+			f.write(response.read())
+
+	for year in years:
+		save(_SEASON_PATH.format(year=year), spreads.season_games_url(year))
+		games = spreads.season_games(year)
+		for team_a, team_b, week in zip(games.hometeam, games.awayteam,
+										games.week):
+			for hometeam, awayteam in (team_a, team_b), (team_b, team_a):
+				for url in (spreads.spread_url(hometeam, awayteam, week, year),
+							spreads.over_under_url(hometeam, awayteam, week,
+												   year)):
+					save(urlsplit(url).path, url)
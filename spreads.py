@@ -14,16 +14,58 @@ All the functions that return tables return them as Pandas DataFrames.
 import logging
 import datetime
 import sys
+import io
+import os
 import re
-import warnings
+import gzip
+import zlib
+import time
+import hashlib
+import threading
+import json
+import sqlite3
 import argparse
+import asyncio
+import contextlib
+import contextvars
+import collections
+import http.client
+import heapq
+import struct
+import platform
+import functools
+import importlib.util
+import csv
+from html.parser import HTMLParser
+import multiprocessing
 from multiprocessing import cpu_count
 from concurrent import futures
-from urllib.request import urlopen
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
 
-import pandas as pd
-from pandas.io.html import read_html
-from bs4 import BeautifulSoup
+
+class _LazyModule:
+	"""Stand-in for the module `name` that imports it when first used.
+
+	Pandas, NumPy, BeautifulSoup, and lxml take most of a second to import,
+	which `--help`, `--version`, `--dry-run`, and building URLs don't need.
+	The first attribute lookup imports the module, which `import_module` makes
+	safe from any thread, and replaces the global `alias` with the module.
+	"""
+
+	def __init__(self, name, alias):
+		self._name, self._alias = name, alias
+
+	def __getattr__(self, attr):
+		module = importlib.import_module(self._name)
+		globals()[self._alias] = module
+		return getattr(module, attr)
+
+
+np = _LazyModule('numpy', 'np')
+pd = _LazyModule('pandas', 'pd')
+bs4 = _LazyModule('bs4', 'bs4')
+lxml_html = _LazyModule('lxml.html', 'lxml_html')
 
 
 __author__ = ('William Schwartz', 'Christopher Holt')
@@ -38,12 +80,1125 @@ _SEASON_URL_TEMPLATE = ("http://www.pro-football-reference.com/years/"
 					   "{year:n}"
 					   "/games.htm")
 _DEFAULT_CONCURRENCY = cpu_count()
+_DEFAULT_ASYNC_CONCURRENCY = 100
+_DEFAULT_ADAPTIVE_CONCURRENCY = 32
+_DEFAULT_PARSER = 'pandas' # See `_PARSERS`
+_DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'spreads')
+_DEFAULT_CACHE_TTL = 6 * 60 * 60 # Seconds to keep pages from the current season
+_DEFAULT_CACHE_MAX_BYTES = 512 * 2**20
+_DEFAULT_CONNECT_TIMEOUT = 10 # Seconds to wait to connect to a site
+_DEFAULT_READ_TIMEOUT = 30 # Seconds to wait for each read from a site
+_DEFAULT_PARSED_CACHE_MAX_BYTES = 128 * 2**20
+_PARSER_VERSION = 1 # Bump when parsing changes to invalidate `ParsedCache`s
+_CACHE = None # See `set_cache`
+_PARSED_CACHE = None # See `set_parsed_cache`
+_HOMEAWAY_INDEX = None # See `set_homeaway_index`
+_COLLECTORS = () # See `add_collector`
+_JOURNAL = None # See `set_journal`
+_LIMITER = None # See `set_limiter`
+# See `set_request_timeouts`
+_REQUEST_TIMEOUTS = _DEFAULT_CONNECT_TIMEOUT, _DEFAULT_READ_TIMEOUT
+_DEADLINE = contextvars.ContextVar('deadline', default=None) # See `_deadline`
+_STORE_TABLE = 'spreads' # Name of the table in `update_store`'s database
+_CHANGING_DAYS = 7 # Games within this many days before today may still change
+_DEFAULT_LEASE = 5 * 60 # Seconds a worker holds games without a heartbeat
+_DEFAULT_WATCH_INTERVAL = 5 * 60 # Seconds between polls of a game before kickoff
+_DEFAULT_WATCH_MAX_INTERVAL = 60 * 60 # Longest wait between polls after kickoff
+_DEFAULT_KICKOFF = datetime.timedelta(hours=13) # Kickoff if the schedule lacks it
 LOG = logging.getLogger(__name__)
 
 
 class CantFindTheRightTable(Exception): pass
 
 
+class ResponseCache:
+	"""On-disk cache of downloaded pages keyed by URL.
+
+	Each page body is stored gzipped in its own file under `directory`. A file's
+	modification time records when the page was downloaded and its access time
+	records when the page was last read from the cache, so that once the files
+	total more than `max_bytes`, the least recently used ones are evicted.
+
+	Any object with `get` and `put` methods like this class's can be passed to
+	`set_cache` instead. Without a `delete` method, pages that fail to parse
+	stay in such a cache.
+	"""
+
+	def __init__(self, directory=_DEFAULT_CACHE_DIR, ttl=_DEFAULT_CACHE_TTL,
+				 max_bytes=_DEFAULT_CACHE_MAX_BYTES):
+		self.directory, self.ttl, self.max_bytes = directory, ttl, max_bytes
+		os.makedirs(directory, exist_ok=True)
+		self._lock = threading.Lock()
+		self._size = sum(size for _, size, _ in self._entries())
+
+	def _entries(self):
+		"Return the (access time, size, path) of each cached page."
+		entries = []
+		for e in os.scandir(self.directory):
+			# Other processes sharing the directory may remove files under us.
+			with contextlib.suppress(OSError):
+				if e.is_file() and e.name.endswith('.gz'):
+					stat = e.stat()
+					entries.append((stat.st_atime, stat.st_size, e.path))
+		return entries
+
+	def _path(self, url):
+		digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+		return os.path.join(self.directory, digest + '.gz')
+
+	def get(self, url, max_age=None):
+		"""Return the cached body of `url` as bytes, or `None` on a miss.
+
+		If not `None`, `max_age` is the number of seconds after which a cached
+		page counts as stale and therefore as a miss.
+		"""
+		path = self._path(url)
+		try:
+			stat = os.stat(path)
+			if max_age is not None and time.time() - stat.st_mtime > max_age:
+				return None
+			with open(path, 'rb') as f:
+				body = gzip.decompress(f.read())
+		except (OSError, EOFError):
+			return None
+		# Another thread or process may have evicted the page since we read it.
+		with contextlib.suppress(OSError):
+			os.utime(path, (time.time(), stat.st_mtime))
+		return body
+
+	def has(self, url, max_age=None):
+		"Return whether `get` would find `url`, without reading the page."
+		try:
+			stat = os.stat(self._path(url))
+		except OSError:
+			return False
+		return max_age is None or time.time() - stat.st_mtime <= max_age
+
+	def put(self, url, body):
+		"Store the bytes `body` as the page for `url`."
+		path = self._path(url)
+		data = gzip.compress(body)
+		tmp = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+		with open(tmp, 'wb') as f:
+			f.write(data)
+		with self._lock:
+			try:
+				self._size -= os.stat(path).st_size
+			except OSError:
+				pass
+			os.replace(tmp, path)
+			self._size += len(data)
+			if self._size > self.max_bytes:
+				self._evict()
+
+	def delete(self, url):
+		"Remove the page for `url` from the cache if it's there."
+		path = self._path(url)
+		with self._lock, contextlib.suppress(OSError):
+			size = os.stat(path).st_size
+			os.remove(path)
+			self._size -= size
+
+	def _evict(self):
+		# Caller must hold self._lock.
+		entries = sorted(self._entries())
+		self._size = sum(size for _, size, _ in entries)
+		for _, size, path in entries:
+			if self._size <= self.max_bytes:
+				break
+			with contextlib.suppress(OSError):
+				os.remove(path)
+				self._size -= size
+		LOG.debug('Evicted cache down to %d bytes', self._size)
+
+
+class ParsedCache(ResponseCache):
+	"""On-disk cache of parsed game pages keyed by the pages' contents.
+
+	Parsing a page takes much longer than downloading it, so a page
+	downloaded again without having changed is better looked up here than
+	parsed again. Keys come from `_parsed_key`, which includes
+	`_PARSER_VERSION`, so changing the parser invalidates every entry. Each
+	entry is the page's table, column by column, and its favored team in
+	gzipped NumPy .npz form, evicted like `ResponseCache`'s pages.
+	"""
+
+	def __init__(self, directory=os.path.join(_DEFAULT_CACHE_DIR, 'parsed'),
+				 max_bytes=_DEFAULT_PARSED_CACHE_MAX_BYTES):
+		super().__init__(directory, None, max_bytes)
+
+	def get(self, key):
+		"Return the cached `_parse_page` value for `key`, or `None` on a miss."
+		body = super().get(key)
+		if body is None:
+			return None
+		with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+			columns = arrays['columns']
+			table = pd.DataFrame({column: arrays['c%d' % i]
+								  for i, column in enumerate(columns)})
+			favored = str(arrays['favored']) or None
+		return table, favored
+
+	def put(self, key, parsed):
+		"Store `_parse_page`'s value `parsed` for `key`."
+		table, favored = parsed
+		arrays = {'c%d' % i: table[column].to_numpy()
+				  for i, column in enumerate(table.columns)}
+		f = io.BytesIO()
+		np.savez(f, columns=np.array(table.columns, dtype=str),
+				 favored=np.array(favored or ''), **arrays)
+		super().put(key, f.getvalue())
+
+
+def set_cache(cache):
+	"""Cache all downloaded pages in `cache`, or turn off caching if `None`.
+
+	`cache` is usually a `ResponseCache`. Return the previous cache.
+	"""
+	global _CACHE
+	old, _CACHE = _CACHE, cache
+	return old
+
+
+def set_parsed_cache(cache):
+	"""Cache parsed game pages in `cache`, or turn off caching if `None`.
+
+	`cache` is usually a `ParsedCache`. Return the previous cache.
+	"""
+	global _PARSED_CACHE
+	old, _PARSED_CACHE = _PARSED_CACHE, cache
+	return old
+
+
+def _cached(url, year):
+	"""Return the cached page at `url`, which has data for season `year`.
+
+	Return `None` if the page isn't cached. Pages for seasons that have finished
+	never change, so once cached they are kept forever. Pages for the current
+	season are kept for the cache's `ttl`.
+	"""
+	cache = _CACHE
+	if cache is None:
+		return None
+	body = cache.get(url, _max_age(cache, year))
+	if body is not None:
+		LOG.debug('Cache hit %s', url)
+	return body
+
+
+def _is_cached(url, year):
+	"Return whether `_cached` would find the page at `url`."
+	cache = _CACHE
+	if cache is None:
+		return False
+	max_age = _max_age(cache, year)
+	if hasattr(cache, 'has'):
+		return cache.has(url, max_age)
+	return cache.get(url, max_age) is not None
+
+
+def _max_age(cache, year):
+	"Return the seconds `cache` keeps pages with data for season `year`."
+	if year < latest_season_before(datetime.date.today()):
+		return None
+	return getattr(cache, 'ttl', None)
+
+
+def _store(url, body):
+	cache = _CACHE
+	if cache is not None:
+		cache.put(url, body)
+
+
+def _discard(url):
+	cache = _CACHE
+	if cache is not None and hasattr(cache, 'delete'):
+		cache.delete(url)
+
+
+@contextlib.contextmanager
+def _discard_unparsed(url):
+	"""Remove the page at `url` from the cache if the block parsing it raises.
+
+	Otherwise a page that doesn't parse, such as an error page served with a
+	success status, would fail its game again on every later run, even with
+	--retry-failures.
+	"""
+	try:
+		yield
+	except Exception:
+		_discard(url)
+		raise
+
+
+def _fetch(url, year):
+	"""Download the page at `url`, which has data for season `year`, as bytes.
+
+	Raise `futures.TimeoutError` if the current `_deadline` passes first.
+	"""
+	body = _cached(url, year)
+	if body is None:
+		body = _request(url, lambda connect, read: _CONNECTIONS.get(
+			url, connect, read))
+		_count('pages_downloaded')
+		_count('bytes_downloaded', len(body))
+		_store(url, body)
+	else:
+		_count('cache_hits')
+	return body
+
+
+def _fetch_if_changed(url, validators=None):
+	"""Download the page at `url` unless it hasn't changed since `validators`.
+
+	`validators` are from the last time this function downloaded the page, if
+	ever. Return the page as bytes, or `None` if it hasn't changed, and the
+	validators to pass next time. This skips `set_cache`'s cache.
+	"""
+	body, validators = _request(url, lambda connect, read: (
+		_CONNECTIONS.get_if_changed(url, validators, connect, read)))
+	if body is None:
+		_count('pages_not_modified')
+	else:
+		_count('pages_downloaded')
+		_count('bytes_downloaded', len(body))
+	return body, validators
+
+
+def _request(url, request):
+	"""Return `request(connect_timeout, read_timeout)`, a request for `url`.
+
+	Retry as `set_limiter`'s limiter says. Raise `futures.TimeoutError` if the
+	current `_deadline` passes first.
+	"""
+	attempt = 0
+	while True:
+		attempt += 1
+		connect, read = _request_timeouts()
+		try:
+			with _limited(url), _timing('fetch'):
+				return request(connect, read)
+		except Exception as e:
+			if not _retry(e, attempt):
+				raise
+
+
+def set_request_timeouts(connect=_DEFAULT_CONNECT_TIMEOUT,
+						 read=_DEFAULT_READ_TIMEOUT):
+	"""Set the seconds to wait to connect to a site and for each read from it.
+
+	Either may be `None` to wait forever. Return the previous timeouts.
+	"""
+	global _REQUEST_TIMEOUTS
+	old, _REQUEST_TIMEOUTS = _REQUEST_TIMEOUTS, (connect, read)
+	return old
+
+
+def _request_timeouts():
+	"""Return the connect and read timeouts for a request starting now.
+
+	They are `set_request_timeouts`' timeouts cut short by the current
+	`_deadline`.
+	"""
+	remaining = _remaining()
+	if remaining is None:
+		return _REQUEST_TIMEOUTS
+	return tuple(remaining if t is None else min(t, remaining)
+				 for t in _REQUEST_TIMEOUTS)
+
+
+@contextlib.contextmanager
+def _deadline(seconds=None, cancelled=None):
+	"""Stop downloading in the `with` statement's body when time runs out.
+
+	Time runs out after `seconds`, unless `None`, or once the `threading.Event`
+	`cancelled`, unless `None`, is set. See `_remaining`.
+	"""
+	at = None if seconds is None else time.monotonic() + seconds
+	token = _DEADLINE.set((at, cancelled))
+	try:
+		yield
+	finally:
+		_DEADLINE.reset(token)
+
+
+def _remaining():
+	"""Return the seconds left until the current `_deadline`, if there is one.
+
+	Raise `futures.TimeoutError` if time has run out. Return `None` if there's
+	no limit.
+	"""
+	deadline = _DEADLINE.get()
+	if deadline is None:
+		return None
+	at, cancelled = deadline
+	if cancelled is not None and cancelled.is_set():
+		raise _DeadlineError('Cancelled')
+	if at is None:
+		return None
+	remaining = at - time.monotonic()
+	if remaining <= 0:
+		raise _DeadlineError('Deadline passed')
+	return remaining
+
+
+class _DeadlineError(futures.TimeoutError):
+	"The current `_deadline` passed, so this isn't the host's fault."
+
+
+def _out_of_time():
+	"Return whether the current `_deadline` has passed or been cancelled."
+	try:
+		_remaining()
+	except _DeadlineError:
+		return True
+	return False
+
+
+def _call_before(seconds, cancelled, f, *args, **kwargs):
+	"Return `f(*args, **kwargs)` called inside `_deadline(seconds, cancelled)`."
+	with _deadline(seconds, cancelled):
+		return f(*args, **kwargs)
+
+
+class _ReadTimeout:
+	"""Mix-in for `http.client` connections to time out reads separately.
+
+	The `timeout` argument limits only connecting; `read_timeout` limits each
+	read after that.
+	"""
+
+	def __init__(self, *args, read_timeout=None, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.read_timeout = read_timeout
+
+	def connect(self):
+		super().connect()
+		if self.read_timeout is not None:
+			self.sock.settimeout(self.read_timeout)
+
+
+class _HTTPConnection(_ReadTimeout, http.client.HTTPConnection): pass
+class _HTTPSConnection(_ReadTimeout, http.client.HTTPSConnection): pass
+
+
+class ConnectionPool:
+	"""Persistent HTTP connections to each host, shared by all downloads.
+
+	Keep connections open between requests so that each download after the
+	first to a host skips connecting (and, for HTTPS, the TLS handshake).
+	Each download holds one connection, so there are never more connections
+	to a host than downloads from it in flight. If `per_host` is not `None`,
+	at most that many are open at once; a download that finds them all busy
+	waits for one, up to its connect timeout, and then fails without counting
+	against the host (see `_overloaded`).
+
+	Requests ask for gzip or deflate compression, and `get` decompresses the
+	response and follows up to `max_redirects` redirects. `get_if_changed`
+	downloads a page only if it has changed since the last time.
+	"""
+
+	HEADERS = {'Accept-Encoding': 'gzip, deflate',
+			   'User-Agent': 'spreads/' + __version__}
+	REDIRECTS = 301, 302, 303, 307, 308
+	# Response headers identifying a version of a page, and the request
+	# headers that ask for the page only if it's changed from that version.
+	VALIDATORS = {'ETag': 'If-None-Match', 'Last-Modified': 'If-Modified-Since'}
+
+	def __init__(self, per_host=None, max_redirects=5):
+		self.per_host, self.max_redirects = per_host, max_redirects
+		self._lock = threading.Lock()
+		self._idle = collections.defaultdict(list)
+		self._slots = {}
+
+	def get(self, url, connect_timeout=None, read_timeout=None):
+		"""Download the page at `url` and return its body as bytes.
+
+		Raise `HTTPError` for error statuses and `URLError` if `per_host`
+		leaves no free connection to the host within `connect_timeout` seconds.
+		Reads time out after `read_timeout` seconds.
+		"""
+		return self._get(url, connect_timeout, read_timeout)[1]
+
+	def get_if_changed(self, url, validators=None, connect_timeout=None,
+					   read_timeout=None):
+		"""Download the page at `url` unless it hasn't changed since `validators`.
+
+		`validators` is a dict of `VALIDATORS` headers from the response to the
+		last download of `url`, or `None`. Return the page's body, or `None`
+		if it hasn't changed, and the validators to pass next time. Otherwise
+		like `get`.
+		"""
+		headers = {condition: validators[header]
+				   for header, condition in self.VALIDATORS.items()
+				   if validators and header in validators}
+		response, body = self._get(url, connect_timeout, read_timeout,
+								   headers)
+		if response.status == 304:
+			return None, validators
+		return body, {header: response.getheader(header)
+					  for header in self.VALIDATORS
+					  if response.getheader(header) is not None}
+
+	def _get(self, url, connect_timeout, read_timeout, headers=None):
+		"Return the response to a GET of `url` and its decompressed body."
+		for _ in range(self.max_redirects + 1):
+			response, body = self._request(url, connect_timeout, read_timeout,
+										   headers)
+			if response.status not in self.REDIRECTS:
+				break
+			url = urljoin(url, response.getheader('Location'))
+		if response.status == 304 and headers:
+			return response, None
+		if response.status >= 300:
+			raise HTTPError(url, response.status, response.reason,
+							response.headers, None)
+		encoding = response.getheader('Content-Encoding')
+		return response, _decompress(body, encoding)
+
+	def _host_slots(self, host):
+		"Return the semaphore that holds `host` to `per_host` connections."
+		# Two threads' first downloads from a host must share one semaphore.
+		with self._lock:
+			slots = self._slots.get(host)
+			if slots is None:
+				slots = self._slots[host] = threading.BoundedSemaphore(
+					self.per_host)
+			return slots
+
+	def _request(self, url, connect_timeout, read_timeout, headers=None):
+		"Return the response to one GET of `url` and its (compressed) body."
+		parts = urlsplit(url)
+		host = parts.scheme, parts.netloc
+		path = parts.path or '/'
+		if parts.query:
+			path += '?' + parts.query
+		slots = None if self.per_host is None else self._host_slots(host)
+		if slots is not None and not slots.acquire(timeout=connect_timeout):
+			raise URLError('No free connection to %s' % parts.netloc)
+		headers = dict(self.HEADERS, **(headers or {}))
+		try:
+			while True:
+				connection, reused = self._checkout(host)
+				connection.timeout = connect_timeout
+				connection.read_timeout = read_timeout
+				if connection.sock is not None:
+					connection.sock.settimeout(read_timeout)
+				try:
+					connection.request('GET', path, headers=headers)
+					response = connection.getresponse()
+					body = response.read()
+				except ConnectionError:
+					connection.close()
+					if reused: # The host closed it while idle; try a new one.
+						continue
+					raise
+				except BaseException:
+					connection.close()
+					raise
+				if response.will_close:
+					connection.close()
+				else:
+					with self._lock:
+						self._idle[host].append(connection)
+				return response, body
+		finally:
+			if slots is not None:
+				slots.release()
+
+	def _checkout(self, host):
+		"Return an idle connection to `host`, or a new one, and whether idle."
+		with self._lock:
+			idle = self._idle[host]
+			if idle:
+				return idle.pop(), True
+		scheme, netloc = host
+		cls = _HTTPSConnection if scheme == 'https' else _HTTPConnection
+		return cls(netloc), False
+
+	def close(self):
+		"Close all the idle connections."
+		with self._lock:
+			idle = [c for connections in self._idle.values()
+					for c in connections]
+			self._idle.clear()
+		for connection in idle:
+			connection.close()
+
+
+def _decompress(body, encoding):
+	"Decompress the response `body` sent with Content-Encoding `encoding`."
+	encoding = (encoding or '').strip().lower()
+	if encoding in ('gzip', 'x-gzip'):
+		return gzip.decompress(body)
+	if encoding == 'deflate':
+		try:
+			return zlib.decompress(body)
+		except zlib.error: # Some servers send raw deflate without the header.
+			return zlib.decompress(body, -zlib.MAX_WBITS)
+	return body
+
+
+def set_connection_pool(pool):
+	"""Download every page through `pool`, usually a `ConnectionPool`.
+
+	Return the previous pool.
+	"""
+	global _CONNECTIONS
+	old, _CONNECTIONS = _CONNECTIONS, pool
+	return old
+
+
+_CONNECTIONS = ConnectionPool() # See `set_connection_pool`
+
+
+class HomeAwayIndex:
+	"""Remember which team teamrankings.com considers home for each game.
+
+	Pro-football-reference.com and teamrankings.com sometimes disagree about
+	which team is home, and teamrankings.com's URLs depend on it. The index
+	records, for each season, week, and pair of teams, which order of teams
+	worked in the URLs and which orders are known to fail, so that
+	`game_unknown_homeaway` can try the right URLs first.
+
+	If `path` is not `None`, the index is loaded from the JSON Lines file
+	there, and whatever `record` learns is appended to it.
+	"""
+
+	def __init__(self, path=None):
+		self.path = path
+		self._lock = threading.Lock()
+		self._home, self._bad = {}, {}
+		if path is not None and os.path.exists(path):
+			with open(path) as f:
+				for line in f:
+					try:
+						entry = json.loads(line)
+					except ValueError: # Truncated by a crash
+						continue
+					self._remember(*entry)
+
+	@staticmethod
+	def _key(hometeam, awayteam, week, year):
+		return (year, week) + tuple(sorted((hometeam, awayteam)))
+
+	def _remember(self, hometeam, awayteam, week, year, worked):
+		"Update the index and return whether that changed anything."
+		key = self._key(hometeam, awayteam, week, year)
+		if worked:
+			if self._home.get(key) == hometeam and key not in self._bad:
+				return False
+			self._home[key] = hometeam
+			self._bad.pop(key, None)
+		else:
+			bad = self._bad.setdefault(key, set())
+			if hometeam in bad:
+				return False
+			bad.add(hometeam)
+		return True
+
+	def orderings(self, team_a, team_b, week, year):
+		"""Return the (hometeam, awayteam) pairs to try, in order.
+
+		Orders known to fail come last rather than not at all, since they may
+		have failed only for the moment, as when a page was throttled or a game
+		timed out.
+		"""
+		key = self._key(team_a, team_b, week, year)
+		with self._lock:
+			home, bad = self._home.get(key), self._bad.get(key, ())
+		if home is not None:
+			return [(home, team_b if home == team_a else team_a)]
+		return sorted([(team_a, team_b), (team_b, team_a)],
+					  key=lambda ordering: ordering[0] in bad)
+
+	def record(self, hometeam, awayteam, week, year, worked):
+		"Record whether `game(hometeam, awayteam, week, year)` worked."
+		entry = [hometeam, awayteam, week, year, worked]
+		with self._lock:
+			# Only append what's new so the file doesn't grow on every run.
+			if self._remember(*entry) and self.path is not None:
+				with open(self.path, 'a') as f:
+					f.write(json.dumps(entry) + '\n')
+
+
+def set_homeaway_index(index):
+	"""Consult `index`, a `HomeAwayIndex`, to find out which team is home.
+
+	If `index` is `None`, don't use an index. Return the previous index.
+	"""
+	global _HOMEAWAY_INDEX
+	old, _HOMEAWAY_INDEX = _HOMEAWAY_INDEX, index
+	return old
+
+
+def _homeaway_orderings(team_a, team_b, week, year):
+	index = _HOMEAWAY_INDEX
+	if index is None:
+		return [(team_a, team_b), (team_b, team_a)]
+	return index.orderings(team_a, team_b, week, year)
+
+
+def _record_homeaway(hometeam, awayteam, week, year, worked):
+	index = _HOMEAWAY_INDEX
+	if index is not None:
+		index.record(hometeam, awayteam, week, year, worked)
+
+
+class Journal:
+	"""Checkpoint journal of the games a run has finished and failed.
+
+	As each game finishes, its table or its failure is appended to the JSON
+	Lines file at `path`, so a run that crashes or times out loses nothing it
+	has done. Loading the journal again lets a later run skip the games it
+	already has (see `table`) and re-download only the ones that failed.
+
+	If `retry_failures`, the run should download only the journal's failed
+	games (see `wanted`).
+	"""
+
+	def __init__(self, path, retry_failures=False):
+		self.path = path
+		self.retry_failures = retry_failures
+		self._lock = threading.Lock()
+		self._done, self._failed = {}, {}
+		if os.path.exists(path):
+			with open(path) as f:
+				for line in f:
+					try:
+						entry = json.loads(line)
+					except ValueError: # Truncated by a crash
+						continue
+					self._remember(tuple(entry['game']), entry, line)
+
+	def _remember(self, args, entry, line):
+		if 'error' in entry:
+			self._failed[args] = entry['error']
+		else:
+			# Keep just the line, and parse it again only if it's needed.
+			self._done[args] = line
+			self._failed.pop(args, None)
+
+	@property
+	def failures(self):
+		"The arguments of the games that failed and haven't worked since."
+		with self._lock:
+			return list(self._failed)
+
+	def table(self, args):
+		"Return the finished table for game `args`, or `None` if it hasn't one."
+		with self._lock:
+			line = self._done.get(tuple(args))
+		if line is None:
+			return None
+		entry = json.loads(line)
+		table = pd.DataFrame(entry['table']['data'],
+							 columns=entry['table']['columns'])
+		return table.astype(entry['dtypes'])
+
+	def wanted(self, args):
+		"Return whether to download game `args` at all."
+		if not self.retry_failures:
+			return True
+		args = tuple(args)
+		with self._lock:
+			return args in self._done or args in self._failed
+
+	def record(self, args, table=None, error=None):
+		"Record game `args`' table, or the `error` that prevented it."
+		args = tuple(args)
+		entry = {'game': list(args)}
+		if table is None:
+			entry['error'] = str(error)
+			line = json.dumps(entry)
+		else:
+			entry['dtypes'] = {c: str(t) for c, t in table.dtypes.items()}
+			line = '%s, "table": %s}' % (json.dumps(entry)[:-1], table.to_json(
+				orient='split', index=False, date_format='iso',
+				date_unit='us'))
+		with self._lock:
+			self._remember(args, entry, line)
+			with open(self.path, 'a') as f:
+				f.write(line + '\n')
+
+
+def set_journal(journal):
+	"""Record each game's result in `journal`, a `Journal`, and resume from it.
+
+	Games the journal has tables for aren't downloaded again. If `journal` is
+	`None`, don't keep a journal. Return the previous journal.
+	"""
+	global _JOURNAL
+	old, _JOURNAL = _JOURNAL, journal
+	return old
+
+
+def _journaled(args):
+	"Return game `args`' table from the journal, or `None` if it hasn't one."
+	journal = _JOURNAL
+	if journal is None:
+		return None
+	table = journal.table(args)
+	if table is not None:
+		LOG.info('Already done: %s', args)
+	return table
+
+
+def _journal_filter(games, year):
+	"Limit `season_games` table `games` to the games the journal wants."
+	journal = _JOURNAL
+	if journal is None or not journal.retry_failures:
+		return games
+	return games[[journal.wanted(arg + (year,)) for arg in
+				  zip(games.hometeam, games.awayteam, games.week)]]
+
+
+def _journal_record(args, table=None, error=None):
+	journal = _JOURNAL
+	if journal is not None:
+		journal.record(args, table, error)
+
+
+class Stats:
+	"""Collect timings and counts from the stages of downloading games.
+
+	Pass an instance to `add_collector` to start collecting. For each stage,
+	such as 'fetch', 'read_html', or 'merge_game', keep the number of calls, the
+	total and longest time, and a histogram of times. Also keep counters, such
+	as 'bytes_downloaded', and the `slowest` games. `summary` returns all that
+	as a dict and `write` saves it as JSON.
+	"""
+
+	# Upper bounds, in seconds, of the buckets of each stage's histogram.
+	BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5,
+			   10, float('inf'))
+
+	def __init__(self, slowest=10):
+		self.slowest = slowest
+		self._lock = threading.Lock()
+		self._start = time.monotonic()
+		self._stages = {}
+		self._counters = collections.Counter()
+		self._gauges = {}
+		self._games = [] # A heap of (seconds, game)
+
+	def timing(self, stage, seconds, game=None):
+		"Record that `stage`, for `game` if not `None`, took `seconds`."
+		bucket = next(i for i, b in enumerate(self.BUCKETS) if seconds <= b)
+		with self._lock:
+			s = self._stages.get(stage)
+			if s is None:
+				s = self._stages[stage] = {
+					'count': 0, 'total': 0.0, 'max': 0.0,
+					'histogram': [0] * len(self.BUCKETS)}
+			s['count'] += 1
+			s['total'] += seconds
+			s['max'] = max(s['max'], seconds)
+			s['histogram'][bucket] += 1
+			if game is not None and self.slowest:
+				item = seconds, list(game)
+				if len(self._games) < self.slowest:
+					heapq.heappush(self._games, item)
+				else:
+					heapq.heappushpop(self._games, item)
+
+	def count(self, name, n=1):
+		"Add `n` to the counter `name`."
+		with self._lock:
+			self._counters[name] += n
+
+	def gauge(self, name, value):
+		"Record that the quantity `name` is now `value`."
+		with self._lock:
+			g = self._gauges.get(name)
+			if g is None:
+				self._gauges[name] = dict(last=value, min=value, max=value)
+			else:
+				g.update(last=value, min=min(g['min'], value),
+						 max=max(g['max'], value))
+
+	def summary(self):
+		"Return everything collected so far as a JSON-serializable dict."
+		labels = ['<=%gs' % b for b in self.BUCKETS[:-1]]
+		labels.append('>%gs' % self.BUCKETS[-2])
+		with self._lock:
+			stages = {
+				stage: dict(count=s['count'], total=s['total'],
+							mean=s['total'] / s['count'], max=s['max'],
+							histogram=dict(zip(labels, s['histogram'])))
+				for stage, s in sorted(self._stages.items())}
+			games = sorted(self._games, reverse=True)
+			counters = dict(self._counters)
+			gauges = {name: dict(g) for name, g in sorted(self._gauges.items())}
+		return {
+			'elapsed': time.monotonic() - self._start,
+			'counters': counters,
+			'gauges': gauges,
+			'stages': stages,
+			'slowest_games': [{'game': g, 'seconds': t} for t, g in games],
+		}
+
+	def write(self, path):
+		"Write `summary` to the file at `path` as JSON."
+		with open(path, 'w') as f:
+			json.dump(self.summary(), f, indent=2)
+			f.write('\n')
+
+
+def add_collector(collector):
+	"""Send timings and counts from downloading games to `collector`.
+
+	`collector` is usually a `Stats`, but any object with `timing(stage,
+	seconds, game)` and `count(name, n)` methods like `Stats`' will do, and its
+	`gauge(name, value)` method, if it has one, gets quantities that go up and
+	down, like `AdaptiveLimiter`'s limits. They may be called from many threads
+	at once. Stages that run in other processes, such as parsing with
+	`parse_processes`, aren't collected.
+	"""
+	global _COLLECTORS
+	_COLLECTORS += (collector,)
+
+
+def remove_collector(collector):
+	"Stop sending timings and counts to `collector`."
+	global _COLLECTORS
+	_COLLECTORS = tuple(c for c in _COLLECTORS if c is not collector)
+
+
+@contextlib.contextmanager
+def _timing(stage, game=None):
+	"Time the body of the `with` statement as `stage` for the collectors."
+	collectors = _COLLECTORS
+	if not collectors:
+		yield
+		return
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		seconds = time.perf_counter() - start
+		for collector in collectors:
+			collector.timing(stage, seconds, game)
+
+
+def _count(name, n=1):
+	for collector in _COLLECTORS:
+		collector.count(name, n)
+
+
+def _gauge(name, value):
+	for collector in _COLLECTORS:
+		gauge = getattr(collector, 'gauge', None)
+		if gauge is not None:
+			gauge(name, value)
+
+
+class AdaptiveLimiter:
+	"""Adapt how many pages to download at once, and how fast, from each host.
+
+	Pass an instance to `set_limiter` to start limiting. Each host gets its own
+	limit on the downloads in flight, starting at `concurrency`, and its own
+	token bucket that starts downloads at no more than `rate` pages per second.
+	Like TCP's congestion control, both limits grow while the host answers
+	quickly, by one for every download until the first trouble and by about one
+	for every limit's worth of downloads after that, and both halve when a
+	download fails or when downloads take, on average, more than `slow` times
+	as long as the host's fastest answer. Failures from downloads that started
+	before the last halving don't halve the limits again. Failures that don't
+	mean the host is overloaded, such as HTTP 404s or a game's time running
+	out (see `_overloaded`), count as quick answers. The limits stay within
+	`min_concurrency` to `max_concurrency` and `min_rate` to `max_rate`.
+	Each halving is logged, and the limits go to the collectors (see
+	`add_collector`) as the gauges 'concurrency HOST' and 'rate HOST'.
+	Downloads that fail because the host is overloaded are tried again, under
+	the lower limits, up to `retries` more times.
+	"""
+
+	# Seconds an asyncio download waits before checking again for a free slot.
+	POLL = 0.01
+
+	def __init__(self, concurrency=4, rate=10.0, slow=8.0, min_concurrency=1,
+				 max_concurrency=64, min_rate=0.5, max_rate=200.0, retries=3):
+		self.concurrency, self.rate, self.slow = concurrency, rate, slow
+		self.retries = retries
+		self.min_concurrency, self.max_concurrency = (min_concurrency,
+													  max_concurrency)
+		self.min_rate, self.max_rate = min_rate, max_rate
+		self._condition = threading.Condition()
+		self._hosts = {}
+
+	def limits(self):
+		"Return a dict from each host to its concurrency and rate limits."
+		with self._condition:
+			return {host: dict(concurrency=int(h['limit']), rate=h['rate'])
+					for host, h in self._hosts.items()}
+
+	def _host(self, host):
+		h = self._hosts.get(host)
+		if h is None:
+			h = self._hosts[host] = dict(
+				limit=float(self.concurrency), rate=float(self.rate), tokens=1.0,
+				refilled=time.monotonic(), active=0, fastest=float('inf'),
+				latency=None, halved=float('-inf'))
+		return h
+
+	def _try_acquire(self, host):
+		"""Start a download from `host` if its limits allow.
+
+		Return 0 if the download may start, the number of seconds until a
+		token is due if it must wait for one, or `None` if it must wait for
+		another download to finish. Call with `_condition` held.
+		"""
+		h = self._host(host)
+		now = time.monotonic()
+		h['tokens'] = min(max(1.0, h['limit']),
+						  h['tokens'] + (now - h['refilled']) * h['rate'])
+		h['refilled'] = now
+		if h['active'] >= int(h['limit']):
+			return None
+		if h['tokens'] < 1:
+			return (1 - h['tokens']) / h['rate']
+		h['tokens'] -= 1
+		h['active'] += 1
+		return 0
+
+	def acquire(self, host):
+		"Wait until a download from `host` may start."
+		with self._condition:
+			wait = self._try_acquire(host)
+			while wait != 0:
+				self._condition.wait(wait)
+				wait = self._try_acquire(host)
+
+	async def acquire_async(self, host):
+		"Coroutine version of `acquire`."
+		while True:
+			with self._condition:
+				wait = self._try_acquire(host)
+			if wait == 0:
+				return
+			await asyncio.sleep(self.POLL if wait is None else wait)
+
+	def release(self, host, seconds, ok):
+		"""Finish a download from `host` that took `seconds`.
+
+		`ok` is false if the download failed in a way that suggests the host is
+		overloaded.
+		"""
+		with self._condition:
+			h = self._hosts[host]
+			h['active'] -= 1
+			now = time.monotonic()
+			if ok:
+				h['fastest'] = min(h['fastest'], seconds)
+				h['latency'] = seconds if h['latency'] is None else (
+					0.9 * h['latency'] + 0.1 * seconds)
+			trouble = not ok or h['latency'] > self.slow * h['fastest']
+			halve = trouble and now - seconds >= h['halved']
+			if not trouble:
+				old = int(h['limit'])
+				# Grow fast until the first trouble, like TCP's slow start.
+				step = 1 if h['halved'] == float('-inf') else 1 / h['limit']
+				h['limit'] = min(self.max_concurrency, h['limit'] + step)
+				h['rate'] = min(self.max_rate, h['rate'] + step)
+				if int(h['limit']) > old:
+					LOG.debug('Raising %s to %d downloads at once, %.1f per '
+							  'second', host, h['limit'], h['rate'])
+			elif halve:
+				# Judge the lower limits only by downloads made under them.
+				h['halved'], h['latency'] = now, None
+				h['limit'] = max(self.min_concurrency, h['limit'] / 2)
+				h['rate'] = max(self.min_rate, h['rate'] / 2)
+				LOG.info('Backing off %s to %d downloads at once, %.1f per '
+						 'second', host, h['limit'], h['rate'])
+			limit, rate = int(h['limit']), h['rate']
+			self._condition.notify_all()
+		if halve:
+			_count('backoffs')
+		_gauge('concurrency ' + host, limit)
+		_gauge('rate ' + host, rate)
+
+
+def set_limiter(limiter):
+	"""Limit downloads from each host with `limiter`, or stop if `None`.
+
+	`limiter` is usually an `AdaptiveLimiter`. Return the previous limiter.
+	"""
+	global _LIMITER
+	old, _LIMITER = _LIMITER, limiter
+	return old
+
+
+def _overloaded(error):
+	"""Return whether exception `error` from a download suggests overloading.
+
+	That's HTTP status 429 or 5xx, or a connection the host refused, reset,
+	or dropped, or that timed out. Timeouts because the current `_deadline`
+	passed, or because the download was cancelled, don't count.
+	"""
+	if isinstance(error, _DeadlineError) or _out_of_time():
+		return False
+	status = getattr(error, 'code', None) or getattr(error, 'status', None)
+	if isinstance(status, int):
+		return status == 429 or status >= 500
+	if isinstance(error, URLError):
+		error = error.reason
+	errors = ConnectionError, TimeoutError, http.client.HTTPException
+	aiohttp = sys.modules.get('aiohttp')
+	if aiohttp is not None:
+		errors += aiohttp.ClientConnectionError, aiohttp.ClientPayloadError
+	return isinstance(error, errors)
+
+
+def _retry(error, attempt):
+	"Return whether to try again a download that failed with `error`."
+	limiter = _LIMITER
+	if (limiter is None or attempt > getattr(limiter, 'retries', 0) or
+		not _overloaded(error)):
+		return False
+	_count('retries')
+	LOG.debug('Retrying download after %r', error)
+	return True
+
+
+@contextlib.contextmanager
+def _limited(url):
+	"Hold the `with` statement's body to the limiter's limits for `url`'s host."
+	limiter = _LIMITER
+	if limiter is None:
+		yield
+		return
+	host = urlsplit(url).netloc
+	limiter.acquire(host)
+	start, ok = time.monotonic(), True
+	try:
+		yield
+	except Exception as e:
+		ok = not _overloaded(e)
+		raise
+	finally:
+		limiter.release(host, time.monotonic() - start, ok)
+
+
+@contextlib.asynccontextmanager
+async def _limited_async(url):
+	"Asynchronous version of `_limited`."
+	limiter = _LIMITER
+	if limiter is None:
+		yield
+		return
+	host = urlsplit(url).netloc
+	await limiter.acquire_async(host)
+	start, ok = time.monotonic(), True
+	try:
+		yield
+	except Exception as e:
+		ok = not _overloaded(e)
+		raise
+	finally:
+		limiter.release(host, time.monotonic() - start, ok)
+
+
 def spread_url(hometeam, awayteam, week, year):
 	"Calculate the URL for the spreads for the given game."
 	if not isinstance(week, str):
@@ -60,244 +1215,981 @@ def over_under_url(hometeam, awayteam, week, year):
 		hometeam=hometeam, awayteam=awayteam, week=week, year=year)
 
 
-def game(hometeam, awayteam, week, year):
+def game(hometeam, awayteam, week, year, parser=_DEFAULT_PARSER,
+		 parse_pool=None):
 	"""Download, parse, and clean the spreads & over-under tables for one game.
 
 	The columns are pinnacle, betonline, bookmaker each with suffix _spread or
 	_over_under; datetime; hometeam, awayteam, favored; week. The first three
 	are the bookies and give the spreads from the point of view of the favored
 	team (so they're generally nonpositive).
+
+	`parser` is 'pandas' to parse the pages with `read_html` and BeautifulSoup,
+	or 'lxml' to parse them with a faster, single-pass lxml parser. If given,
+	`parse_pool` is an executor, such as a `ProcessPoolExecutor`, in which to
+	parse the pages so that this thread only downloads them. Pages that
+	`set_parsed_cache`'s cache has seen before aren't parsed again.
 	"""
-	with urlopen(spread_url(hometeam, awayteam, week, year)) as connection:
-		spreads_page = connection.read()
-	# Note that infer_types is deprecated and won't work starting in Pandas 0.14
 	LOG.debug('Getting game %s', (hometeam, awayteam, week, year))
-	sp = read_html(io=spreads_page.decode('utf-8'),
-					 match="History", attrs={'id': 'table-000'},
-					 infer_types=False, header=0,
-					 skiprows=[1, 2, 3])
-	if len(sp) != 1:
-		raise CantFindTheRightTable
-	sp = sp.pop()
-
-	# Get the over-under page
-	ou = read_html(io=over_under_url(hometeam, awayteam, week, year),
-				   match="History", attrs={'cellspacing': 0},
-				   infer_types=False, header=0,
-				   skiprows=[1, 2, 3])
-	if len(ou) != 1:
+	# Download both pages at once, parsing each as soon as it arrives.
+	pool = futures.ThreadPoolExecutor(len(_MOVEMENT_TABLES))
+	try:
+		# Copy the context so the downloads keep to this thread's `_deadline`.
+		urls = dict(_game_urls(hometeam, awayteam, week, year))
+		futures_to_names = {
+			pool.submit(contextvars.copy_context().run, _fetch, url, year): name
+			for name, url in urls.items()}
+		parsed, keys = {}, {}
+		for future in futures.as_completed(futures_to_names):
+			name = futures_to_names[future]
+			args = future.result(), name, year, parser
+			key = _parsed_key(*args)
+			cached = _cached_parse(key)
+			if cached is not None:
+				parsed[name] = cached
+				continue
+			keys[name] = key
+			if parse_pool is None:
+				with _discard_unparsed(urls[name]):
+					parsed[name] = _parse_page(*args)
+			else:
+				parsed[name] = parse_pool.submit(_parse_page, *args)
+	finally:
+		pool.shutdown(wait=False)
+	for name, key in keys.items():
+		if parse_pool is not None:
+			with _discard_unparsed(urls[name]):
+				parsed[name] = parsed[name].result()
+		_store_parse(key, parsed[name])
+	return _game_table(parsed, hometeam, awayteam, week)
+
+
+def _game_urls(hometeam, awayteam, week, year):
+	"Return (name, URL) pairs for the pages `game` downloads."
+	return (('spread', spread_url(hometeam, awayteam, week, year)),
+			('over_under', over_under_url(hometeam, awayteam, week, year)))
+
+
+def _parse_page_cached(page, name, year, parser=_DEFAULT_PARSER):
+	"Return `_parse_page`'s value from `set_parsed_cache`'s cache or parse."
+	key = _parsed_key(page, name, year, parser)
+	parsed = _cached_parse(key)
+	if parsed is None:
+		parsed = _parse_page(page, name, year, parser)
+		_store_parse(key, parsed)
+	return parsed
+
+
+def _parsed_key(page, name, year, parser):
+	"""Return the key of `_parse_page`'s value in `set_parsed_cache`'s cache.
+
+	Return `None` if there's no cache.
+	"""
+	if _PARSED_CACHE is None:
+		return None
+	return '%s:%s:%s:%d:%d' % (hashlib.sha1(page).hexdigest(), name, parser,
+							   year, _PARSER_VERSION)
+
+
+def _cached_parse(key):
+	cache = _PARSED_CACHE
+	if cache is None or key is None:
+		return None
+	parsed = cache.get(key)
+	if parsed is not None:
+		_count('parse_cache_hits')
+	return parsed
+
+
+def _store_parse(key, parsed):
+	cache = _PARSED_CACHE
+	if cache is not None and key is not None:
+		cache.put(key, parsed)
+
+
+def _parse_page(page, name, year, parser=_DEFAULT_PARSER):
+	"""Parse a game's spread or over-under page, depending on `name`.
+
+	`parser` is the name of the backend to parse with, 'pandas' or 'lxml'.
+	Return the page's cleaned line-movement table and, for spread pages, the
+	favored team (otherwise `None`).
+	"""
+	try:
+		backend = _PARSERS[parser]
+	except KeyError:
+		raise ValueError('Unknown parser %r' % parser) from None
+	return backend(page, name, year)
+
+
+# For each kind of line-movement page, the attributes identifying its table.
+_MOVEMENT_TABLES = {
+	'spread': {'id': 'table-000'},
+	'over_under': {'cellspacing': 0},
+}
+
+
+def _parse_page_pandas(page, name, year):
+	"Parse a game's page with Pandas' `read_html` and with BeautifulSoup."
+	with _timing('read_html'):
+		t = pd.read_html(io.BytesIO(page), encoding='utf-8',
+					  match="History", attrs=_MOVEMENT_TABLES[name], header=0,
+					  skiprows=[1, 2, 3])
+	if len(t) != 1:
 		raise CantFindTheRightTable
-	ou = ou.pop()
-
-	# Cleaning.
-	for t, name, date_col in (sp, 'spread', 'Unnamed: 0'), (ou, 'over_under', '\xa0'):
-		datetime = pd.to_datetime(
-			t[date_col]
-			.replace(r'(\d\d?/\d\d?)', r'\1/%d' % year, regex=True)
-			.replace(r'(01|02)/(\d\d?)/\d{4}', r'\1/\2/%d' % (year + 1),
-					 regex=True))
-		del t[date_col]
-
-		# Replace all the '--' as missing so we can convert numbers to floats.
-		for column in t.keys():
-			t[column] = (t[column]
-						 .replace('--', 'nan')
-						 .replace('(Pick)', 0)
-						 .apply(float))
-
-		# Add datetime back in after the str-to-float conversion so we don't do
-		# it for the datetime.
-		t['datetime'] = datetime
-
-		# Lowercase column names for ease of programming later
-		t.columns = [h.lower() for h in t.columns]
-
-		# Give spreads/over-under their suffixes
-		for col in 'pinnacle', 'betonline', 'bookmaker':
-			t[col + '_' + name] = t[col]
-			del t[col]
-
-	data = sp.merge(ou, on=['datetime'], how='outer')
-	assert set(data.datetime) == (set(sp.datetime) | set(ou.datetime))
+	with _timing('clean_movement'):
+		t = _clean_movement(t.pop(), name, year)
+	if name != 'spread':
+		return t, None
+	with _timing('beautifulsoup'):
+		soup = bs4.BeautifulSoup(page)
+		subheader = soup.find('p', attrs={'class': 'h1-sub'}).find('strong')
+		links = [link['href'] for link in subheader.findAll('a')]
+	return t, _favored_team(subheader.contents[0], links, subheader.contents)
+
+
+def _parse_page_lxml(page, name, year):
+	"""Parse a game's page in a single pass over one lxml tree.
+
+	The 'pandas' backend parses spread pages twice, once for `read_html` and
+	once for BeautifulSoup. This backend pulls the table's cells and the
+	subheader's text and links out of one tree instead.
+	"""
+	with _timing('lxml'):
+		tree = lxml_html.fromstring(page)
+		(attr, value), = _MOVEMENT_TABLES[name].items()
+		tables = [table for table in tree.iter('table')
+				  if table.get(attr) == str(value)
+				  and 'History' in table.text_content()]
+		if len(tables) != 1:
+			raise CantFindTheRightTable
+		rows = [[cell.text_content().strip() or None
+				 for cell in row if cell.tag in ('td', 'th')]
+				for row in tables[0].iter('tr')]
+	# Like read_html's header=0, skiprows=[1, 2, 3].
+	header, rows = rows[0], rows[4:]
+	n = len(header)
+	rows = [row[:n] + [None] * (n - len(row)) for row in rows]
+	with _timing('clean_movement'):
+		t = _clean_movement(pd.DataFrame(rows, columns=header), name, year)
+	if name != 'spread':
+		return t, None
+	for subheader in tree.find_class('h1-sub'):
+		if subheader.tag == 'p':
+			strong = subheader.find('.//strong')
+			break
+	else:
+		raise ValueError("Couldn't find the subheader with the odds")
+	links = [link.get('href', '') for link in strong.iter('a')]
+	return t, _favored_team(strong.text or '', links, strong.text_content())
+
+
+def _clean_movement(t, name, year):
+	"""Clean the line-movement table `t` from a spread or over-under page.
+
+	`name` is 'spread' or 'over_under', which becomes the suffix of the bookie
+	columns.
+	"""
+	# The first column has dates without years, like '09/05 21:05'. Dates in
+	# January and February fall in the year after the season starts.
+	date_col = t.columns[0]
+	dates = t[date_col].astype(str).str.extract(r'^(.*?\d\d?/\d\d?)(.*)$')
+	years = np.where(dates[0].str.contains(r'\b0[12]/\d\d?$', na=False),
+					 '/%d' % (year + 1), '/%d' % year)
+	datetime = _to_datetime(dates[0] + years + dates[1], '%m/%d/%Y %H:%M')
+	del t[date_col]
+
+	# Replace all the '--' as missing so we can convert numbers to floats.
+	t = (t.replace({'--': np.nan, '(Pick)': 0})
+		 .apply(pd.to_numeric)
+		 .astype('float64'))
+
+	# Add datetime back in after the str-to-float conversion so we don't do
+	# it for the datetime.
+	t['datetime'] = datetime
+
+	# Lowercase column names for ease of programming later
+	t.columns = [h.lower() for h in t.columns]
+
+	# Give spreads/over-under their suffixes
+	for col in 'pinnacle', 'betonline', 'bookmaker':
+		t[col + '_' + name] = t.pop(col)
+	return t
 
-	# Add this function's arguments to the table.
-	data['hometeam'] = hometeam
-	data['awayteam'] = awayteam
-	data['week'] = week
 
-	# Get favored team from the big "Odds: Washington by 4," that shows up at the
-	# top of the page.
-	soup = BeautifulSoup(spreads_page)
-	subheader = soup.find('p', attrs={'class': 'h1-sub'}).find('strong')
-	m = _FAVORED_RE.search(subheader.contents[0])
+def _to_datetime(strings, format):
+	"""Convert a Series of `strings` to datetimes having the given `format`.
+
+	Parsing with a known format is much faster than inferring the format, but
+	if any string doesn't match `format`, fall back to inferring it.
+	"""
+	try:
+		return pd.to_datetime(strings, format=format)
+	except ValueError:
+		return pd.to_datetime(strings)
+
+
+def _favored_team(text, links, context):
+	"""Return the favored team's name from a spread page's subheader.
+
+	`text` is the start of the subheader, which contains the big "Odds:
+	Washington by 4," and `links` are the hrefs of the subheader's links, which
+	include links to both teams' pages. `context` goes in error messages.
+	"""
+	m = _FAVORED_RE.search(text)
 	if m is None or not m.group('city'):
-		raise ValueError("Couldn't figure out who was favored: %r" %
-						 (subheader.contents))
+		raise ValueError("Couldn't figure out who was favored: %r" % (context,))
 	city = m.group('city').replace(' ', '-').replace('.', '').lower()
 	# city will be something like 'san-francisco' after the transformations
 	# above. Find what team that is by looking for the links to the teams that
 	# are also in that subheader.
-	for link in subheader.findAll('a'):
-		link = link['href']
+	for link in links:
 		if city in link:
-			data['favored'] = link.split('-')[-1]
-			break
+			return link.split('-')[-1]
+	raise ValueError("couldn't figure out who %s is" % city)
+
+
+_PARSERS = {'pandas': _parse_page_pandas, 'lxml': _parse_page_lxml}
+
+
+def _game_table(parsed, hometeam, awayteam, week):
+	"""Merge a game's cleaned spread and over-under tables into `game`'s table.
+
+	`parsed` maps 'spread' and 'over_under' to the pages' `_parse_page` values.
+	"""
+	(sp, favored), (ou, _) = parsed['spread'], parsed['over_under']
+	with _timing('merge_game'):
+		data = _merge_on_datetime(sp, ou)
+
+	# Add this function's arguments to the table.
+	data['hometeam'] = hometeam
+	data['awayteam'] = awayteam
+	data['week'] = week
+	data['favored'] = favored
+	return data
+
+
+def _merge_on_datetime(sp, ou):
+	"""Outer join tables `sp` and `ou` on their datetime columns.
+
+	The join is sorted by datetime like `merge`'s. When each table's datetimes
+	are distinct and its other columns are all floats, as they are for cleaned
+	line-movement tables, place each table's rows in the sorted union of the
+	datetimes rather than having `merge` build a hash table.
+	"""
+	tables = [(t['datetime'].to_numpy(), t.drop(columns='datetime'))
+			  for t in (sp, ou)]
+	if not all(times.dtype.kind == 'M' and _distinct(times) and
+			   (lines.dtypes == np.float64).all() for times, lines in tables):
+		return sp.merge(ou, on=['datetime'], how='outer')
+	union = np.union1d(tables[0][0], tables[1][0])
+	values = np.full((len(union), sum(l.shape[1] for _, l in tables)), np.nan)
+	start = 0
+	for times, lines in tables:
+		stop = start + lines.shape[1]
+		values[np.searchsorted(union, times), start:stop] = lines.to_numpy()
+		start = stop
+	data = pd.DataFrame(values, columns=[c for _, l in tables
+										 for c in l.columns], copy=False)
+	data.insert(0, 'datetime', union)
+	return data
+
+
+def _distinct(times):
+	"Return whether the datetime64 array `times` has no repeats or NaTs."
+	times = np.sort(times)
+	return not np.isnat(times).any() and bool((times[1:] > times[:-1]).all())
+
+
+def season_games_url(year):
+	"Calculate the URL for the games in season starting in `year`."
+	return _SEASON_URL_TEMPLATE.format(year=year)
+
+
+def season_games(year):
+	"""Download, parse, and clean a table of games and scores for given season.
+
+	The columns are week; hometeam; awayteam; winner; date; points, yards, and
+	turn overs for the winning team; points, yards, and turn overs for the
+	losing team; and season. Games not played yet have no winner, and, as
+	nullable Int64s, no points, yards, or turn overs.
+	"""
+	LOG.debug('Getting season %d', year)
+	url = season_games_url(year)
+	page = _fetch(url, year)
+	with _discard_unparsed(url):
+		return _parse_season_games(page, year)
+
+
+def _parse_season_games(page, year):
+	"Parse and clean a downloaded season page like `season_games` does."
+	with _timing('read_html_season'):
+		data = pd.read_html(io.BytesIO(page), encoding='utf-8',
+						 attrs={'id': 'games'},
+						 header=0)
+	if len(data) != 1:
+		raise CantFindTheRightTable
+	with _timing('clean_season_games'):
+		return _clean_season_games(data.pop(), year)
+
+
+class _ScheduleParser(HTMLParser):
+	"""Pull the cells of the table of games out of a season page.
+
+	This is much less than `_parse_season_games` does, but it doesn't need
+	Pandas. After `feed`ing the page, `rows` is a list of each row's cells'
+	text.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.rows, self._in_table, self._cell = [], False, None
+
+	def handle_starttag(self, tag, attrs):
+		if tag == 'table' and ('id', 'games') in attrs:
+			self._in_table = True
+		elif self._in_table and tag == 'tr':
+			self.rows.append([])
+		elif self._in_table and tag in ('td', 'th') and self.rows:
+			self._cell = []
+
+	def handle_endtag(self, tag):
+		if tag == 'table':
+			self._in_table = False
+		elif tag in ('td', 'th') and self._cell is not None:
+			self.rows[-1].append(''.join(self._cell).strip())
+			self._cell = None
+
+	def handle_data(self, data):
+		if self._cell is not None:
+			self._cell.append(data)
+
+
+def _schedule_page_args(page, year):
+	"""Return the `game` arguments of every game on a season page.
+
+	The arguments and their order are the same as `_schedule_args` gives for
+	`_parse_season_games`' table, but this doesn't import Pandas.
+	"""
+	parser = _ScheduleParser()
+	parser.feed(page.decode('utf-8'))
+	rows = [row for row in parser.rows if row]
+	if not rows or 'Week' not in rows[0]:
+		raise CantFindTheRightTable
+	header = rows[0]
+	week, winner, loser = (header.index(c)
+						   for c in ('Week', 'Winner/tie', 'Loser/tie'))
+	args = []
+	for row in rows[1:]:
+		if len(row) <= loser or row[week] in ('', 'Week', 'nan'):
+			continue
+		w = _PLAYOFF_WEEKS.get(row[week], row[week])
+		teams = [row[c].rsplit(None, 1)[-1].lower() for c in (winner, loser)]
+		if '@' in row[winner + 1:loser]:
+			teams.reverse()
+		args.append((teams[0], teams[1], int(w) if w.isdigit() else w, year))
+	return args
+
+
+def _dry_run(file, years, week=None):
+	"""Write the URLs a run would download, and whether each is cached, as CSV.
+
+	List each season's schedule page and, if the schedule is cached, the
+	pages of its games, limited to `week` unless `None`. Games whose home and
+	away teams are unknown get the URLs of the order tried first. Don't use
+	the network or import Pandas.
+	"""
+	writer = csv.writer(file)
+	writer.writerow(['url', 'cache'])
+	def write(url, year):
+		writer.writerow([url, 'hit' if _is_cached(url, year) else 'miss'])
+	for year in years:
+		url = season_games_url(year)
+		write(url, year)
+		page = _cached(url, year)
+		if page is None:
+			LOG.warning("Can't list the games of %d without downloading %s",
+						year, url)
+			continue
+		for team_a, team_b, w, _ in _schedule_page_args(page, year):
+			if week is None or w == week:
+				hometeam, awayteam = _homeaway_orderings(
+					team_a, team_b, w, year)[0]
+				for _, url in _game_urls(hometeam, awayteam, w, year):
+					write(url, year)
+
+
+# Pro-football-reference.com's names for playoff weeks and ours
+_PLAYOFF_WEEKS = {"WildCard": "wild-card", "Division": "divisional",
+				  "ConfChamp": "conference", "SuperBowl": "super-bowl"}
+
+
+def _clean_season_games(data, year):
+	"Clean the table of games from a season page. See `season_games`."
+	del data["Unnamed: 3"]
+	# Drop the blank rows and the mid-table header rows.
+	data = data[data.Week.notnull() & ~data.Week.isin(("Week", "nan"))]
+
+	data['week'] = _parse_weeks(data.Week.astype(str).replace(_PLAYOFF_WEEKS))
+	del data['Week']
+
+	data['season'] = year
+	dates = data.Date.astype(str)
+	years = np.where(dates.str.match(r'(January|February) \d+$'),
+					 ', %d' % (year + 1), ', %d' % year)
+	data['game_date'] = _to_datetime(dates + years, '%B %d, %Y')
+	del data['Date']
+
+	for column in "PtsW", "PtsL", "YdsW", "TOW", "YdsL", "TOL":
+		values = pd.to_numeric(data[column])
+		data[column] = values.astype(
+			'int64' if values.notnull().all() else 'Int64')
+
+	# Games not played yet list the visitor first, then '@', then the home
+	# team, just like games the home team lost.
+	at = (data.pop('Unnamed: 5') == '@').to_numpy()
+	winner, loser = (data.pop(column).str.rsplit(n=1).str[-1].str.lower()
+					 for column in ('Winner/tie', 'Loser/tie'))
+	data['hometeam'] = np.where(at, loser, winner)
+	data['awayteam'] = np.where(at, winner, loser)
+	data['winner'] = winner.where(data.PtsW.notnull())
+	return data
+
+
+def _parse_weeks(weeks):
+	"Convert the strings in Series `weeks` to integers where they're numbers."
+	# There are only a few distinct weeks, so convert each just once.
+	return weeks.map({w: int(w) if w.isdigit() else w for w in weeks.unique()})
+
+
+def game_unknown_homeaway(team_a, team_b, week, year, parser=_DEFAULT_PARSER,
+						  parse_pool=None):
+	"""Convenience wrapper for `game` when you're not sure who's the home team.
+
+	We first try calling `game` with `team_a` as the home team, and if that
+	doesn't work, we next try `team_b`. In the former case we add a column
+	called `home_away_discrepency` equal to `False`. In the latter case the
+	column contains `True` and the `awayteam` and `hometeam` columns are swapped
+	to make it easier to merge with data from `season_games`.
+
+	If `set_homeaway_index` has given us an index, we try the order of teams
+	that worked last time first and orders known to fail last. `parser` and
+	`parse_pool` are passed to `game`.
+	"""
+	with _timing('game', (team_a, team_b, week, year)):
+		orderings = _homeaway_orderings(team_a, team_b, week, year)
+		for i, (hometeam, awayteam) in enumerate(orderings, 1):
+			try:
+				g = game(hometeam, awayteam, week, year, parser, parse_pool)
+			except (CantFindTheRightTable, ValueError):
+				_record_homeaway(hometeam, awayteam, week, year, False)
+				if i == len(orderings):
+					raise
+			else:
+				_record_homeaway(hometeam, awayteam, week, year, True)
+				return _mark_homeaway(g, swapped=hometeam != team_a)
+
+
+def _mark_homeaway(g, swapped):
+	"""Add the `home_away_discrepency` column to `game` table `g`.
+
+	If `swapped`, also swap `g`'s home and away teams to match the schedule.
+	"""
+	if not swapped:
+		g['home_away_discrepency'] = False
+		return g
+	awayteam, hometeam = g.hometeam.copy(), g.awayteam.copy()
+	g.hometeam, g.awayteam = hometeam, awayteam
+	g['home_away_discrepency'] = True
+	return g
+
+
+def season(year, week=None, timeout=None, concurrency=_DEFAULT_CONCURRENCY,
+		   parser=_DEFAULT_PARSER, parse_processes=None, compact=False,
+		   game_timeout=None):
+	"""Download, parse, and clean the scores & spreads for all games in a season
+
+	`concurrency` is the number of threads to use, defaulting to the number of
+	CPUs. If not `None`, `week` limits the games fetched to those in the given
+	week. `parser` is passed to `game`.
+
+	`timeout` and `game_timeout` are in seconds. A game that takes longer than
+	`game_timeout` fails. When `timeout` runs out, the games still downloading
+	are cancelled, and they and the games not yet started fail, but the games
+	already finished are kept. Each request also gives up on a site that
+	doesn't answer within `set_request_timeouts`' timeouts.
+
+	By default each thread both downloads and parses its games, so parsing
+	contends for the GIL. If `parse_processes` is a number, the threads only
+	download pages, and a pool of that many processes parses them. The
+	processes import the calling script afresh, so scripts that pass
+	`parse_processes` need an `if __name__ == '__main__':` guard.
+
+	If `compact`, each game's table and the season's games go through
+	`compact_table` as soon as they're downloaded, so the table takes much less
+	memory.
+
+	This function returns two values. The first is the table, which is the the
+	merger of the tables that `season_games` and `game` return. The second is a
+	list of `game` arguments that caused `game` to fail.
+	"""
+	return _download_schedules(_schedules([year], week, concurrency), timeout,
+							   concurrency, parser, parse_processes, compact,
+							   game_timeout)
+
+
+def _schedules(years, week, concurrency):
+	"""Download the `season_games` tables for `years` all at once.
+
+	Return a dict mapping each year to its table, limited to the given `week`
+	unless `week` is `None`, and to the games `set_journal`'s journal wants.
+	"""
+	years = list(years)
+	with futures.ThreadPoolExecutor(max(1, min(concurrency, len(years)))) as pool:
+		schedules = dict(zip(years, pool.map(season_games, years)))
+	for year, games in schedules.items():
+		if week is not None:
+			games = games[games.week == week]
+		schedules[year] = _journal_filter(games, year)
+	return schedules
+
+
+def _schedule_args(schedules):
+	"Generate the `game` arguments for every game in `_schedules`' dict."
+	for year, games in schedules.items():
+		for arg in zip(games.hometeam, games.awayteam, games.week):
+			yield arg + (year,)
+
+
+def _download_schedules(schedules, timeout, concurrency, parser,
+						parse_processes=None, compact=False, game_timeout=None):
+	"""Download every game in `schedules`, a dict like `_schedules` returns.
+
+	All the games from all the years share one pool of threads. Return the
+	years' `season` tables, one after another in the same order as
+	`schedules`, as one table, and a list of the `game` arguments that failed.
+	If `compact`, compact the tables with `compact_table`.
+	"""
+	if compact:
+		schedules = {year: compact_table(games)
+					 for year, games in schedules.items()}
+	builder, failures = _SeasonTable(schedules), []
+	for args, table in _iter_downloads(_schedule_args(schedules), timeout,
+									   concurrency, parser, failures,
+									   parse_processes, game_timeout):
+		builder.add(args, compact_table(table) if compact else table)
+	return builder.table(), failures
+
+
+def _iter_downloads(args, timeout, concurrency, parser, failures,
+					parse_processes=None, game_timeout=None):
+	"""Generate a (`args`, table) pair for each `game_unknown_homeaway` call.
+
+	`args` is an iterable of `game_unknown_homeaway` arguments. Pairs come out
+	in the order their downloads finish. Append the arguments of games that
+	fail to the list `failures`.
+
+	To keep memory bounded, at most a couple of games per thread are queued at
+	any time; more are submitted as games finish. If `parse_processes` is not
+	`None`, the pages are parsed in a pool of that many processes. Games that
+	`set_journal`'s journal already has come straight from the journal.
+
+	Each game stops downloading after `game_timeout` seconds unless `None`.
+	After `timeout` seconds, unless `None`, stop waiting for games, cancel the
+	ones still downloading, and count them and the games not yet started as
+	failures. Stopping the generator early cancels the games too.
+	"""
+	LOG.debug('Concurrency = %d', concurrency)
+	args, futures_to_args, finished = iter(args), {}, []
+	deadline = None if timeout is None else time.monotonic() + timeout
+	cancelled = threading.Event()
+	# See https://docs.python.org/3/library/concurrent.futures.html#threadpoolexecutor-example.
+	with _parse_pool(parse_processes) as parse_pool:
+		pool = futures.ThreadPoolExecutor(concurrency)
+		def submit():
+			while len(futures_to_args) < 2 * concurrency:
+				arg = next(args, None)
+				if arg is None:
+					break
+				table = _journaled(arg)
+				if table is not None:
+					finished.append((arg, table))
+					continue
+				future = pool.submit(_call_before, game_timeout, cancelled,
+									 game_unknown_homeaway, *arg, parser=parser,
+									 parse_pool=parse_pool)
+				futures_to_args[future] = arg
+		try:
+			submit()
+			while futures_to_args or finished:
+				if futures_to_args:
+					remaining = (None if deadline is None
+								 else deadline - time.monotonic())
+					done, _ = futures.wait(futures_to_args, timeout=remaining,
+										   return_when=futures.FIRST_COMPLETED)
+					if not done:
+						_time_out(futures_to_args, args, finished, failures)
+					for future in done:
+						# Pop so we don't hang on to tables already generated.
+						arg, tables = futures_to_args.pop(future), []
+						_collect(arg, future, tables, failures)
+						finished.extend((arg, table) for table in tables)
+					# Keep the pool busy while the caller handles the games.
+					submit()
+				ready, finished[:] = finished[:], []
+				yield from ready
+		finally:
+			# Don't wait for stragglers: they stop at their next download.
+			cancelled.set()
+			for future in futures_to_args:
+				future.cancel()
+			pool.shutdown(wait=False)
+
+
+def _time_out(futures_to_args, args, finished, failures):
+	"""Give up on the games in `_iter_downloads` when its `timeout` runs out.
+
+	Count the games still downloading in `futures_to_args`, which this
+	empties, and the ones in the iterator `args` as failures, except for the
+	games in the journal, which go to `finished`.
+	"""
+	LOG.error('Timed out with %d games left', len(futures_to_args))
+	error = futures.TimeoutError('Timed out')
+	for arg in futures_to_args.values():
+		_fail(arg, error, failures)
+	futures_to_args.clear()
+	for arg in args:
+		table = _journaled(arg)
+		if table is None:
+			_fail(arg, error, failures)
+		else:
+			finished.append((arg, table))
+
+
+def _parse_pool(processes):
+	"""Return a pool of `processes` processes, or a null context if `None`.
+
+	The pool starts its processes the first time a download thread submits a
+	page. Forking then could copy locks other threads hold into the new
+	process and deadlock it, so start the processes from a fresh server
+	process, or from scratch where there's no such thing.
+	"""
+	if processes is None:
+		return contextlib.nullcontext()
+	LOG.debug('Parse processes = %d', processes)
+	methods = multiprocessing.get_all_start_methods()
+	context = multiprocessing.get_context(
+		'forkserver' if 'forkserver' in methods else 'spawn')
+	return futures.ProcessPoolExecutor(processes, mp_context=context)
+
+
+def _collect(args, future, tables, failures):
+	"""Sort the result of `future`, a call to `game_unknown_homeaway(*args)`.
+
+	Append the resulting table to `tables` or append `args` to `failures`, and
+	record which in `set_journal`'s journal.
+	"""
+	try:
+		table = future.result()
+	except (futures.TimeoutError, asyncio.TimeoutError) as exc:
+		LOG.error('Timed out: %s', args)
+		_fail(args, exc, failures)
+	except Exception as exc:
+		LOG.exception('Error from %s: %s', args, exc)
+		_fail(args, exc, failures)
 	else:
-		raise ValueError("couldn't figure out who %s is" % city)
+		if table is None:
+			LOG.error('Failure: %s', args)
+			_fail(args, 'No table', failures)
+		else:
+			LOG.info('Success: %s', args)
+			tables.append(table)
+			_journal_record(args, table)
+			_count('games_succeeded')
+
+
+def _fail(args, error, failures):
+	"Count the game `args` as failed with `error`, appending it to `failures`."
+	failures.append(args)
+	_journal_record(args, error=error)
+	_count('games_failed')
+
+
+class _SeasonTable:
+	"""Put together a `season` table from games' tables as they arrive.
+
+	`schedules` is a dict mapping years to `season_games` tables, like
+	`_schedules` returns. `add` each game's `game_unknown_homeaway` table,
+	and `table` returns the schedules' rows joined with the games' tables.
 
-	return data
+	Rather than concatenating the games' tables and merging the result with
+	the schedules on the teams and week, keep each game's table under the
+	position of its game in the schedules. `table` then concatenates the
+	games' tables in schedule order and sets them beside the schedules' rows,
+	taken by position, so there is no join to compute.
+	"""
 
+	KEYS = 'hometeam', 'awayteam', 'week'
 
-def season_games_url(year):
-	"Calculate the URL for the games in season starting in `year`."
-	return _SEASON_URL_TEMPLATE.format(year=year)
+	def __init__(self, schedules):
+		games = list(schedules.values())
+		self.games = (games[0] if len(games) == 1
+					  else pd.concat(games, ignore_index=True))
+		self._positions = {args: i for i, args in
+						   enumerate(_schedule_args(schedules))}
+		self._tables = {}
 
+	def add(self, args, table):
+		"Add the table of the game whose `game` arguments are `args`."
+		i = self._positions[args]
+		assert i not in self._tables, 'Got %s twice' % (args,)
+		self._tables[i] = table
 
-def season_games(year):
-	"""Download, parse, and clean a table of games and scores for given season.
+	def table(self):
+		"Return the table of the schedules' games that were `add`ed."
+		if not self._tables: # Every game failed or timed out
+			return self.games.iloc[:0].reindex(
+				columns=list(self.games.columns) + _LINES + [
+					'datetime', 'favored', 'home_away_discrepency'])
+		with _timing('merge_season'):
+			positions = sorted(self._tables)
+			tables = [self._tables[i] for i in positions]
+			lengths = [len(t) for t in tables]
+			rows = self.games.take(np.repeat(positions, lengths))
+			lines = pd.concat(tables, ignore_index=True)
+			return pd.concat([rows.reset_index(drop=True),
+							  lines.drop(columns=list(self.KEYS))], axis=1)
 
-	The columns are week; hometeam; awayteam; winner; date; points, yards, and
-	turn overs for the winning team; points, yards, and turn overs for the
-	losing team; and season.
-	"""
-	LOG.debug('Getting season %d', year)
-	data = read_html(io=season_games_url(year),
-					  attrs={'id': 'games'},
-					  infer_types=False,
-					  header=0)
-	if len(data) != 1:
-		raise CantFindTheRightTable
-	data = data.pop()
 
-	# Cleaning.
-	del data["Unnamed: 3"]
-	# The code below issues "UserWarning: " So we catch UserWarnings.
-	with warnings.catch_warnings():
-		warnings.filterwarnings(action='ignore', category=UserWarning,
-								module=r'pandas\.core\.frame',
-								message=(r"Boolean Series key will be reindexed"
-										 r" to match DataFrame index\."))
-		# These rows are mid-table header rows.
-		data = data[data.Week != "Week"][data.Week != "nan"]
-
-	data['week'] = (data.Week
-					.replace("WildCard", "wild-card")
-					.replace("Division", "divisional")
-					.replace("ConfChamp", "conference")
-					.replace("SuperBowl", "super-bowl")
-					.apply(
-						lambda s: (int(s)
-								   if all(c in '1234567890' for c in s)
-								   else s)))
-	del data['Week']
+def seasons(years, timeout=None, concurrency=_DEFAULT_CONCURRENCY,
+			parser=_DEFAULT_PARSER, parse_processes=None, compact=False,
+			game_timeout=None):
+	"""Download, parse, and clean multiple seasons of NFL games and spreads.
 
-	data['season'] = year
-	data['game_date'] = pd.to_datetime(
-		data.Date
-		.replace(r"$", r", %d" % year, regex=True)
-		.replace(r"^(January|February) (\d+), \d+$", r"\1 \2, %d" % (year + 1),
-				 regex=True))
-	del data['Date']
+	`years` is an iterable of integers. `concurrency is the number of threads
+	to use, defaulting to the number of CPUs. `timeout`, `game_timeout`,
+	`parser`, `parse_processes`, and `compact` are as for `season`. All
+	the seasons' schedules are downloaded at once, and then all their games
+	share one pool of threads, so the pool never waits for one season to finish
+	before starting the next.
 
-	for column in "PtsW", "PtsL", "YdsW", "TOW", "YdsL", "TOL":
-	    data[column] = data[column].apply(int)
-
-	data['WatL'] = data['Unnamed: 5'].apply(lambda x: x == '@')
-	del data['Unnamed: 5']
-	data['hometeam'] = (~data.WatL * data['Winner/tie'] +
-						data.WatL * data['Loser/tie'])
-	data['awayteam'] = (data.WatL * data['Winner/tie'] +
-						~data.WatL * data['Loser/tie'])
-	data['winner'] = data['Winner/tie']
-	for column in 'Winner/tie', 'Loser/tie', "WatL":
-		del data[column]
-	for column in 'hometeam', 'awayteam', 'winner':
-		data[column] = data[column].apply(lambda s: s.split()[-1].lower())
+	This function returns two values. The first is the table, which is the the
+	merger of the tables that `season_games` and `game` return. The second is a
+	list of `game` arguments that caused `game` to fail.
+	"""
+	schedules = _schedules(years, None, concurrency)
+	LOG.info('Downloading %d games from %d seasons',
+			 sum(map(len, schedules.values())), len(schedules))
+	return _download_schedules(schedules, timeout, concurrency, parser,
+							   parse_processes, compact, game_timeout)
 
-	return data
 
+async def season_async(year, week=None, timeout=None,
+					   concurrency=_DEFAULT_ASYNC_CONCURRENCY,
+					   parser=_DEFAULT_PARSER, parse_processes=None,
+					   compact=False, game_timeout=None):
+	"""Coroutine version of `season` that downloads pages on a single thread.
 
-def game_unknown_homeaway(team_a, team_b, week, year):
-	"""Convenience wrapper for `game` when you're not sure who's the home team.
+	Rather than tying up a thread per game, keep up to `concurrency` page
+	downloads in flight at once on the event loop. Pages are parsed on one
+	other thread, or in `parse_processes` processes if not `None`, so that
+	parsing doesn't hold up the downloads. The arguments and return values are
+	otherwise the same as `season`'s. Requires aiohttp.
+	"""
+	async with _async_engine(concurrency, parser, parse_processes) as engine:
+		return await _seasons_async(engine, [year], week, timeout, compact,
+									game_timeout)
 
-	We first try calling `game` with `team_a` as the home team, and if that
-	doesn't work, we next try `team_b`. In the former case we add a column
-	called `home_away_discrepency` equal to `False`. In the latter case the
-	column contains `True` and the `awayteam` and `hometeam` columns are swapped
-	to make it easier to merge with data from `season_games`.
+
+async def seasons_async(years, timeout=None,
+						concurrency=_DEFAULT_ASYNC_CONCURRENCY,
+						parser=_DEFAULT_PARSER, parse_processes=None,
+						compact=False, game_timeout=None):
+	"""Coroutine version of `seasons`. See `season_async`.
+
+	Like `seasons`, all the seasons' games share the event loop at once.
 	"""
-	try:
-		g = game(team_a, team_b, week, year)
-	except (CantFindTheRightTable, ValueError):
-		g = game(team_b, team_a, week, year)
-		awayteam, hometeam = g.hometeam.copy(), g.awayteam.copy()
-		g.hometeam, g.awayteam = hometeam, awayteam
-		g['home_away_discrepency'] = True
-	else:
-		g['home_away_discrepency'] = False
-	return g
+	async with _async_engine(concurrency, parser, parse_processes) as engine:
+		return await _seasons_async(engine, years, None, timeout, compact,
+									game_timeout)
 
 
-def season(year, week=None, timeout=None, concurrency=_DEFAULT_CONCURRENCY):
-	"""Download, parse, and clean the scores & spreads for all games in a season
+_AsyncEngine = collections.namedtuple('_AsyncEngine',
+									  'session parse_pool parser')
 
-	`timeout` is in seconds and `concurrency` is the number of threads to use,
-	defaulting to the number of CPUs. If not `None`, `week` limits the games
-	fetched to those in the given week.
 
-	This function returns two values. The first is the table, which is the the
-	merger of the tables that `season_games` and `game` return. The second is a
-	list of `game` arguments that caused `game` to fail.
+@contextlib.asynccontextmanager
+async def _async_engine(concurrency, parser, parse_processes=None):
+	"""Yield an `_AsyncEngine` with an aiohttp session and a parsing thread.
+
+	If `parse_processes` is not `None`, parse in that many processes instead.
 	"""
+	import aiohttp
 	LOG.debug('Concurrency = %d', concurrency)
-	games = season_games(year)
+	connector = aiohttp.TCPConnector(limit=concurrency)
+	connect, read = _REQUEST_TIMEOUTS
+	timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+	if parse_processes is None:
+		parse_pool = futures.ThreadPoolExecutor(1)
+	else:
+		parse_pool = _parse_pool(parse_processes)
+	with parse_pool:
+		async with aiohttp.ClientSession(connector=connector,
+										 timeout=timeout) as session:
+			yield _AsyncEngine(session, parse_pool, parser)
+
+
+async def _seasons_async(engine, years, week, timeout, compact=False,
+						 game_timeout=None):
+	"""Download `years`' games at once and return the table and failures.
+
+	This is `_schedules` and `_download_schedules` for the asyncio engine.
+	"""
+	loop = asyncio.get_running_loop()
+	years = list(years)
+	schedules = dict(zip(years, await asyncio.gather(*(
+		_schedule_async(engine, year, week, compact) for year in years))))
+	LOG.info('Downloading %d games from %d seasons',
+			 sum(map(len, schedules.values())), len(schedules))
+	builder, tasks_to_args, failures = _SeasonTable(schedules), {}, []
+	for arg in _schedule_args(schedules):
+		table = _journaled(arg)
+		if table is not None:
+			builder.add(arg, compact_table(table) if compact else table)
+			continue
+		task = asyncio.ensure_future(asyncio.wait_for(
+			_game_unknown_homeaway_async(engine, *arg, compact=compact),
+			game_timeout))
+		tasks_to_args[task] = arg
+	deadline = None if timeout is None else loop.time() + timeout
+	pending = set(tasks_to_args)
+	try:
+		while pending:
+			remaining = None if deadline is None else deadline - loop.time()
+			done, pending = await asyncio.wait(
+				pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+			if not done:
+				_time_out({task: tasks_to_args[task] for task in pending}, (),
+						  (), failures)
+				break
+			for task in done:
+				arg, tables = tasks_to_args[task], []
+				_collect(arg, task, tables, failures)
+				for table in tables:
+					builder.add(arg, table)
+	finally:
+		for task in pending:
+			task.cancel()
+	return builder.table(), failures
+
+
+async def _schedule_async(engine, year, week, compact):
+	"Return `year`'s games to download, like `_schedules` does for a year."
+	loop = asyncio.get_running_loop()
+	url = season_games_url(year)
+	page = await _fetch_async(engine.session, url, year)
+	with _discard_unparsed(url):
+		games = await loop.run_in_executor(
+			engine.parse_pool, _parse_season_games, page, year)
 	if week is not None:
 		games = games[games.week == week]
-	expected_n = len(games)
-	tables, futures_to_args, failures = [], {}, []
-	# See https://docs.python.org/3/library/concurrent.futures.html#threadpoolexecutor-example.
-	with futures.ThreadPoolExecutor(concurrency) as pool:
-		for arg in zip(games.hometeam, games.awayteam, games.week):
-			arg = arg + (year,)
-			futures_to_args[pool.submit(game_unknown_homeaway, *arg)] = arg
-		for future in futures.as_completed(futures_to_args, timeout=timeout):
-			args = futures_to_args[future]
+	games = _journal_filter(games, year)
+	return compact_table(games) if compact else games
+
+
+async def _game_unknown_homeaway_async(engine, team_a, team_b, week, year,
+									   compact=False):
+	"""Coroutine version of `game_unknown_homeaway`.
+
+	If `compact`, return the table as `compact_table` returns it.
+	"""
+	with _timing('game', (team_a, team_b, week, year)):
+		orderings = _homeaway_orderings(team_a, team_b, week, year)
+		for i, (hometeam, awayteam) in enumerate(orderings, 1):
 			try:
-				table = future.result()
-			except Exception as exc:
-				LOG.exception('Error from %s: %s', args, exc)
+				g = await _game_async(engine, hometeam, awayteam, week, year)
+			except (CantFindTheRightTable, ValueError):
+				_record_homeaway(hometeam, awayteam, week, year, False)
+				if i == len(orderings):
+					raise
 			else:
-				if table is None:
-					LOG.error('Failure: %s', args)
-					failures.append(args)
-				else:
-					LOG.info('Success: %s', args)
-					tables.append(table)
-	tables = games.merge(pd.concat(tables), on=('hometeam', 'awayteam', 'week'))
-	if __debug__:
-		n = len(tables.groupby(['hometeam', 'awayteam', 'week']))
-		assert n == expected_n, "Expected %d games, got %d" % (expected_n, n)
-	return tables, failures
+				_record_homeaway(hometeam, awayteam, week, year, True)
+				g = _mark_homeaway(g, swapped=hometeam != team_a)
+				return compact_table(g) if compact else g
 
 
-def seasons(years, timeout=None, concurrency=_DEFAULT_CONCURRENCY):
-	"""Download, parse, and clean multiple seasons of NFL games and spreads.
+async def _game_async(engine, hometeam, awayteam, week, year):
+	"Coroutine version of `game`."
+	loop = asyncio.get_running_loop()
+	LOG.debug('Getting game %s', (hometeam, awayteam, week, year))
+	async def get(name, url):
+		page = await _fetch_async(engine.session, url, year)
+		key = _parsed_key(page, name, year, engine.parser)
+		parsed = _cached_parse(key)
+		if parsed is None:
+			with _discard_unparsed(url):
+				parsed = await loop.run_in_executor(
+					engine.parse_pool, _parse_page, page, name, year,
+					engine.parser)
+			_store_parse(key, parsed)
+		return name, parsed
+	parsed = await asyncio.gather(*(
+		get(name, url)
+		for name, url in _game_urls(hometeam, awayteam, week, year)))
+	return _game_table(dict(parsed), hometeam, awayteam, week)
 
-	`years` is an iterable of integers. `timeout` is measured in
-	seconds. `concurrency is the number of threads to use, defaulting to the
-	number of CPUs.
 
-	This function returns two values. The first is the table, which is the the
-	merger of the tables that `season_games` and `game` return. The second is a
-	list of `game` arguments that caused `game` to fail.
+async def _fetch_async(session, url, year):
+	"Coroutine version of `_fetch` that downloads with an aiohttp `session`."
+	body = _cached(url, year)
+	if body is None:
+		attempt = 0
+		while body is None:
+			attempt += 1
+			try:
+				async with _limited_async(url):
+					with _timing('fetch'):
+						async with session.get(url) as response:
+							response.raise_for_status()
+							body = await response.read()
+			except Exception as e:
+				if not _retry(e, attempt):
+					raise
+		_count('pages_downloaded')
+		_count('bytes_downloaded', len(body))
+		_store(url, body)
+	else:
+		_count('cache_hits')
+	return body
+
+
+def iter_games(years, week=None, timeout=None, concurrency=_DEFAULT_CONCURRENCY,
+			   parser=_DEFAULT_PARSER, failures=None, parse_processes=None,
+			   compact=False, game_timeout=None):
+	"""Generate `hometeamify`'d tables for one game at a time from `years`.
+
+	Each table is a `game` table merged with the game's row of the
+	`season_games` table. Tables come out as soon as each game finishes
+	downloading, so only a few games are ever in memory at once. If not
+	`None`, `week` limits the games to those in the given week. Arguments of
+	games that fail are appended to the list `failures` if given. The other
+	arguments are as for `seasons`.
 	"""
-	tables, failures = [], []
-	for year in years:
-		LOG.info('=' * 10 + ' %d ' + '=' * 10, year)
-		table, failure = season(year, timeout=timeout, concurrency=concurrency)
-		tables.append(table)
-		failures.extend(failure)
-	return pd.concat(tables), failures
+	if failures is None:
+		failures = []
+	schedules = _schedules(years, week, concurrency)
+	if compact:
+		schedules = {year: compact_table(games)
+					 for year, games in schedules.items()}
+	rows = {year: {arg: i for i, arg in enumerate(_schedule_args({year: games}))}
+			for year, games in schedules.items()}
+	for args, table in _iter_downloads(_schedule_args(schedules), timeout,
+									   concurrency, parser, failures,
+									   parse_processes, game_timeout):
+		year = args[-1]
+		row = schedules[year].iloc[[rows[year][args]]]
+		if compact:
+			table = compact_table(table)
+		yield hometeamify(row.merge(table, on=['hometeam', 'awayteam', 'week']))
 
 
 def hometeamify(t):
@@ -313,27 +2205,172 @@ def hometeamify(t):
 	suffixes) with columns points, yards, turn_overs (all with home and away
 	suffixes), but leaves the spreads columns intact (but modified). The winner
 	and favored columns are removed. The returned table is a copy, leaving the
-	function argument unodified.
+	function argument unodified. Each column keeps its dtype, so the table
+	stays as small as `compact_table` made it.
+
+	Games not played yet have no winner, so their points, yards, and turn
+	overs stay missing; their home and away teams come from the hometeam and
+	awayteam columns as always. Likewise lines of games without a favored
+	team stay as they are.
 	"""
-	t = t.copy()
 	# Winner/loser based columns
+	played = t.winner.notnull()
 	hw, aw = t.hometeam == t.winner, t.awayteam == t.winner
-	assert (hw == ~aw).all()
-	# Suffix for keys = W for winner L for loser. Values are new names
-	for old, new in {'Pts': 'points', 'Yds': 'yards', 'TO': 'turn_overs'}.items():
-		t[new + '_home'] = (hw * t[old + 'W'] + aw * t[old + 'L'])
-		t[new + '_away'] = (aw * t[old + 'W'] + hw * t[old + 'L'])
-		del t[old + 'L'], t[old + 'W']
-	del t['winner']
+	assert (hw == ~aw)[played].all()
+	hw = hw.to_numpy()
 	# Favored-team based columns
 	to_swap, to_keep = t.favored == t.awayteam, t.favored == t.hometeam
-	assert (to_keep == ~to_swap).all()
+	assert (to_keep == ~to_swap)[t.favored.notnull()].all()
+	to_swap = to_swap.to_numpy()
+	# Suffix for keys = W for winner L for loser. Values are new names
+	renames = {'Pts': 'points', 'Yds': 'yards', 'TO': 'turn_overs'}
+	columns = {}
+	for old, new in renames.items():
+		w, l = t[old + 'W'], t[old + 'L']
+		columns[new + '_home'] = w.where(hw, l)
+		columns[new + '_away'] = l.where(hw, w)
+	# Dropping the old columns makes the copy we return.
+	t = t.drop(columns=['winner', 'favored'] +
+			   [old + wl for old in renames for wl in 'WL'])
 	for col in 'pinnacle_spread', 'betonline_spread', 'bookmaker_spread':
-		t[col] = -1 * to_swap * t[col] + to_keep * t[col]
-	del t['favored']
+		line = t[col].to_numpy()
+		t[col] = np.where(to_swap, -line, line)
+	for col, values in columns.items():
+		t[col] = values
 	return t
 
 
+# The teams' names, as in URLs and tables. Washington's later names are at the
+# end.
+TEAMS = (
+	"49ers", "bears", "bengals", "bills", "broncos", "browns", "buccaneers",
+	"cardinals", "chargers", "chiefs", "colts", "cowboys", "dolphins", "eagles",
+	"falcons", "giants", "jaguars", "jets", "lions", "packers", "panthers",
+	"patriots", "raiders", "rams", "ravens", "redskins", "saints", "seahawks",
+	"steelers", "texans", "titans", "vikings", "team", "commanders")
+
+
+# The dtypes below are functions so that importing this module needn't import
+# Pandas.
+@functools.lru_cache(maxsize=None)
+def _team_dtype():
+	return pd.CategoricalDtype(TEAMS)
+
+
+@functools.lru_cache(maxsize=None)
+def _week_dtype():
+	return pd.CategoricalDtype(
+		list(range(1, 18 + 1)) + list(_PLAYOFF_WEEKS.values()), ordered=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _compact_dtypes():
+	"Return a dict of the dtype each column `compact_table` shrinks gets."
+	return dict(
+		[(c, _team_dtype())
+		 for c in ('hometeam', 'awayteam', 'favored', 'winner')] +
+		[(c + suffix, 'float32')
+		 for c in ('pinnacle', 'betonline', 'bookmaker')
+		 for suffix in ('_spread', '_over_under')] +
+		[(c + suffix, dtype)
+		 for c, dtype in (('Pts', 'int8'), ('Yds', 'int16'), ('TO', 'int8'),
+						  ('points', 'int8'), ('yards', 'int16'),
+						  ('turn_overs', 'int8'))
+		 for suffix in ('W', 'L', '_home', '_away')] +
+		[('week', _week_dtype()), ('season', 'int16'),
+		 ('Day', pd.CategoricalDtype(['Mon', 'Tue', 'Wed', 'Thu', 'Fri',
+									  'Sat', 'Sun']))])
+
+
+def compact_table(t):
+	"""Return a copy of table `t` that takes much less memory.
+
+	`t` is any table from `game`, `season_games`, `season`, or `hometeamify`.
+	Teams become categoricals whose categories are always `TEAMS`, and weeks
+	and days become categoricals with fixed categories too, so tables from
+	different seasons still merge and concatenate as categoricals. Lines
+	become float32, and points, yards, and turn overs become small integers.
+	Raise `ValueError` if `t` has a team or week that isn't one of the
+	categories.
+	"""
+	dtypes = {c: d for c, d in _compact_dtypes().items() if c in t.columns}
+	for column, dtype in dtypes.items():
+		if dtype in ('int8', 'int16') and t[column].isnull().any():
+			dtypes[column] = dtype.capitalize() # Games not played yet
+		if isinstance(dtype, pd.CategoricalDtype):
+			values = t[column]
+			unknown = values.notnull() & ~values.isin(dtype.categories)
+			if unknown.any():
+				raise ValueError('Unknown %s: %s' % (
+					column, ', '.join(map(str, values[unknown].unique()))))
+	return t.astype(dtypes)
+
+
+# The book makers' line columns in `game` tables.
+_LINES = [book + line for line in ('_spread', '_over_under')
+		  for book in ('pinnacle', 'betonline', 'bookmaker')]
+
+
+def game_features(t):
+	"""Summarize each game's line movements in `hometeamify`'d table `t`.
+
+	Return a table with one row per game. Its columns are the columns of `t`
+	that stay the same throughout a game, like season, week, teams, and points,
+	and, for each line column of `t` like pinnacle_spread:
+
+	- pinnacle_spread_open, the first line the book maker posted;
+	- pinnacle_spread_close, the last line the book maker posted;
+	- pinnacle_spread_max_move, the farthest the line ever got from the open;
+	- pinnacle_spread_changes, how many times the line changed.
+
+	For each book maker, the closing lines then give pinnacle_ats, which is 1
+	if the home team covered the spread, -1 if the away team did, and 0 for a
+	push; and pinnacle_total, which is 1 if the total points went over the
+	over/under, -1 if under, and 0 for a push. Games without a line have no
+	values for its features. Every feature comes from one sorted pass over all
+	of `t` at once rather than from a loop over the games.
+	"""
+	keys = ['season', 'week', 'hometeam', 'awayteam']
+	games = t.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+	order = np.lexsort((t.datetime.to_numpy(), games))
+	games = games[order]
+	n = games[-1] + 1 if len(games) else 0
+	# An empty `t`, as when every game failed, gives an empty table of features.
+	starts = np.flatnonzero(np.r_[True, games[1:] != games[:-1]]) if n else games
+	lines = [c for c in _LINES if c in t.columns]
+	features = t.iloc[order[starts]].drop(columns=lines + ['datetime'])
+	features = features.reset_index(drop=True)
+	for col in lines:
+		values = t[col].to_numpy(dtype=np.float64)[order]
+		posted = ~np.isnan(values)
+		g, v = games[posted], values[posted]
+		opening, closing, max_move = (np.full(n, np.nan) for _ in range(3))
+		# A book may have posted no lines of this kind in any game of `t`.
+		if len(g):
+			first = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+			last = np.r_[first[1:], len(g)] - 1
+			opening[g[first]], closing[g[last]] = v[first], v[last]
+			max_move[g[first]] = np.maximum.reduceat(
+				np.abs(v - opening[g]), first)
+		moved = (g[1:] == g[:-1]) & (v[1:] != v[:-1])
+		features[col + '_open'] = opening
+		features[col + '_close'] = closing
+		features[col + '_max_move'] = max_move
+		features[col + '_changes'] = np.bincount(g[1:][moved], minlength=n)
+	# Games not played yet have no points and so no results against the lines.
+	home, away = (features[c].to_numpy(dtype=np.float64, na_value=np.nan)
+				  for c in ('points_home', 'points_away'))
+	margin, total = home - away, home + away
+	for book in 'pinnacle', 'betonline', 'bookmaker':
+		if book + '_spread' in lines:
+			features[book + '_ats'] = np.sign(
+				margin + features[book + '_spread_close'])
+		if book + '_over_under' in lines:
+			features[book + '_total'] = np.sign(
+				total - features[book + '_over_under_close'])
+	return features
+
+
 def latest_season_before(date):
 	"""Return the latest football season that started before the given `date`.
 
@@ -345,28 +2382,960 @@ def latest_season_before(date):
 	return date.year
 
 
-def _download_and_print(file, year=None, week=None, timeout=None,
-					   concurrency=cpu_count()):
+def update_store(path, years, week=None, timeout=None,
+				 concurrency=_DEFAULT_CONCURRENCY, parser=_DEFAULT_PARSER,
+				 parse_processes=None, game_timeout=None):
+	"""Bring the SQLite database at `path` up to date with the seasons `years`.
+
+	The database holds a table called spreads of `hometeamify`'d `season`
+	tables. Download only games missing from the table and games recent enough
+	that their lines may still move, and replace those games' rows. If not
+	`None`, `week` limits the games to those in the given week. The other
+	arguments are as for `season`. Return a list of `game` arguments that
+	caused `game` to fail.
+	"""
+	cutoff = datetime.date.today() - datetime.timedelta(days=_CHANGING_DAYS)
+	with contextlib.closing(sqlite3.connect(path)) as connection:
+		stored = _stored_games(connection)
+		schedules = {}
+		for year, games in _schedules(years, week, concurrency).items():
+			games = _games_to_update(games, stored, cutoff)
+			LOG.info('Updating %d games from %d', len(games), year)
+			if len(games):
+				schedules[year] = games
+		if not schedules:
+			return []
+		table, failures = _download_schedules(schedules, timeout, concurrency,
+											  parser, parse_processes,
+											  game_timeout=game_timeout)
+		_upsert(connection, hometeamify(table))
+	return failures
+
+
+def read_store(path):
+	"Return the table in the database that `update_store` keeps at `path`."
+	with contextlib.closing(sqlite3.connect(path)) as connection:
+		table = pd.read_sql('SELECT * FROM ' + _STORE_TABLE, connection,
+							parse_dates=['game_date', 'datetime'])
+	table['week'] = _parse_weeks(table.week)
+	table['home_away_discrepency'] = table.home_away_discrepency.astype(bool)
+	return table
+
+
+def _stored_games(connection):
+	"Return the set of (season, week, hometeam, awayteam) keys in the store."
+	try:
+		rows = connection.execute(
+			'SELECT DISTINCT season, week, hometeam, awayteam FROM ' +
+			_STORE_TABLE)
+	except sqlite3.OperationalError: # No table yet
+		return set()
+	return set(rows)
+
+
+def _games_to_update(games, stored, cutoff):
+	"""Return the games in `season_games` table `games` that need downloading.
+
+	Those are the games whose keys aren't in the set `stored` (see
+	`_stored_games`) and the games on or after the date `cutoff`.
+	"""
+	missing = [key not in stored for key in zip(
+		games.season, games.week.astype(str), games.hometeam, games.awayteam)]
+	return games[np.array(missing, dtype=bool) |
+				 (games.game_date >= pd.Timestamp(cutoff)).to_numpy()]
+
+
+def _upsert(connection, table):
+	"Replace the rows in the store for the games in `hometeamify`'d `table`."
+	table = table.assign(week=table.week.astype(str))
+	keys = table[['season', 'week', 'hometeam', 'awayteam']].drop_duplicates()
+	with connection:
+		if _stored_games(connection):
+			connection.executemany(
+				'DELETE FROM %s WHERE season = ? AND week = ? AND hometeam = ? '
+				'AND awayteam = ?' % _STORE_TABLE,
+				((int(s), w, h, a) for s, w, h, a in keys.itertuples(False)))
+		table.to_sql(_STORE_TABLE, connection, if_exists='append', index=False)
+		connection.execute(
+			'CREATE INDEX IF NOT EXISTS %s_game ON %s '
+			'(season, week, hometeam, awayteam)' % (_STORE_TABLE, _STORE_TABLE))
+
+
+class WorkQueue:
+	"""A queue of games to download, shared by workers through SQLite.
+
+	`plan_queue` fills the database at `path` with the games of some seasons
+	and their schedules. `work_queue` workers then `claim` games, holding them
+	on a lease of `lease` seconds that they `renew` while they work. If a
+	worker dies, its lease runs out and another worker claims its games. The
+	database must be on a filesystem whose locks work for every worker, such
+	as a local disk or a shared filesystem with working locks.
+	"""
+
+	def __init__(self, path, lease=_DEFAULT_LEASE):
+		self.path, self.lease = path, lease
+		with self._connect() as connection:
+			connection.execute(
+				'CREATE TABLE IF NOT EXISTS tasks (season INTEGER, week TEXT, '
+				"team_a TEXT, team_b TEXT, state TEXT DEFAULT 'pending', "
+				'worker TEXT, lease_expires REAL, attempts INTEGER DEFAULT 0, '
+				'shard TEXT, PRIMARY KEY (season, week, team_a, team_b))')
+			connection.execute(
+				'CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state)')
+
+	def _connect(self):
+		return contextlib.closing(sqlite3.connect(
+			self.path, timeout=60, isolation_level=None))
+
+	@contextlib.contextmanager
+	def _transaction(self):
+		"Run the `with` statement's body in a transaction that locks the queue."
+		with self._connect() as connection:
+			connection.execute('BEGIN IMMEDIATE')
+			try:
+				yield connection
+			except BaseException:
+				connection.execute('ROLLBACK')
+				raise
+			connection.execute('COMMIT')
+
+	def add(self, year, games):
+		"""Queue the games in `season_games` table `games` from season `year`.
+
+		Keep the schedule for `schedules`, replacing the season's old one.
+		Games already queued keep their state. Return the number of new games.
+		"""
+		games = games.assign(week=games.week.astype(str))
+		# `to_sql` commits, so have it convert the schedule's rows for SQLite
+		# in memory, and replace the schedule in the same transaction as
+		# queueing the games. Then no one sees the season without a schedule.
+		with contextlib.closing(sqlite3.connect(':memory:')) as memory:
+			games.to_sql('schedules', memory, index=False)
+			(schema,), = memory.execute(
+				"SELECT sql FROM sqlite_master WHERE name = 'schedules'")
+			cursor = memory.execute('SELECT * FROM schedules')
+			columns = [column for column, *_ in cursor.description]
+			rows = cursor.fetchall()
+		with self._transaction() as connection:
+			connection.execute(schema.replace(
+				'CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+			connection.execute('DELETE FROM schedules WHERE season = ?',
+							   (year,))
+			connection.executemany(
+				'INSERT INTO schedules (%s) VALUES (%s)' % (
+					', '.join('"%s"' % c for c in columns),
+					', '.join('?' * len(columns))), rows)
+			before = connection.total_changes
+			connection.executemany(
+				'INSERT OR IGNORE INTO tasks (season, week, team_a, team_b) '
+				'VALUES (?, ?, ?, ?)',
+				((year, w, a, b) for a, b, w in zip(
+					games.hometeam, games.awayteam, games.week)))
+			return connection.total_changes - before
+
+	def claim(self, worker, n):
+		"""Lease up to `n` waiting games to `worker`, a unique name.
+
+		The games are those never claimed and those whose leases have run
+		out. Return a list of their `game_unknown_homeaway` arguments.
+		"""
+		now = time.time()
+		with self._transaction() as connection:
+			rows = connection.execute(
+				'SELECT season, week, team_a, team_b FROM tasks '
+				"WHERE state = 'pending' OR (state = 'leased' AND "
+				'lease_expires < ?) ORDER BY season, rowid LIMIT ?',
+				(now, n)).fetchall()
+			connection.executemany(
+				"UPDATE tasks SET state = 'leased', worker = ?, "
+				'lease_expires = ?, attempts = attempts + 1 WHERE season = ? '
+				'AND week = ? AND team_a = ? AND team_b = ?',
+				((worker, now + self.lease) + row for row in rows))
+		return [_task_args(row) for row in rows]
+
+	def renew(self, worker):
+		"Extend the leases on every game `worker` holds."
+		with self._transaction() as connection:
+			connection.execute(
+				"UPDATE tasks SET lease_expires = ? WHERE worker = ? AND "
+				"state = 'leased'", (time.time() + self.lease, worker))
+
+	def finish(self, worker, done, shard, failures=()):
+		"""Record that `worker` downloaded the games `done` into `shard`.
+
+		`done` and `failures` are lists of `game_unknown_homeaway` arguments;
+		the games in `failures` failed. Games whose leases `worker` lost to
+		another worker are left to that worker.
+		"""
+		with self._transaction() as connection:
+			for state, args, shard in (('done', done, shard),
+									   ('failed', failures, None)):
+				connection.executemany(
+					'UPDATE tasks SET state = ?, shard = ? WHERE season = ? '
+					'AND week = ? AND team_a = ? AND team_b = ? AND '
+					"worker = ? AND state = 'leased'",
+					((state, shard, year, str(week), team_a, team_b, worker)
+					 for team_a, team_b, week, year in args))
+
+	def expiry(self):
+		"Return when the first lease runs out, or `None` if nothing's leased."
+		with self._connect() as connection:
+			(expiry,), = connection.execute(
+				"SELECT MIN(lease_expires) FROM tasks WHERE state = 'leased'")
+		return expiry
+
+	def counts(self):
+		"Return a dict mapping each state of the games to how many are in it."
+		with self._connect() as connection:
+			return dict(connection.execute(
+				'SELECT state, COUNT(*) FROM tasks GROUP BY state'))
+
+	def results(self):
+		"Return a dict mapping each downloaded game's arguments to its shard."
+		with self._connect() as connection:
+			rows = connection.execute(
+				'SELECT season, week, team_a, team_b, shard FROM tasks '
+				"WHERE state = 'done'")
+			return {_task_args(row[:4]): row[4] for row in rows}
+
+	def failures(self):
+		"Return a list of the arguments of the games that failed."
+		with self._connect() as connection:
+			rows = connection.execute(
+				'SELECT season, week, team_a, team_b FROM tasks '
+				"WHERE state = 'failed'")
+			return [_task_args(row) for row in rows]
+
+	def schedules(self):
+		"Return a dict mapping each queued season to its `season_games` table."
+		with self._connect() as connection:
+			try:
+				games = pd.read_sql('SELECT * FROM schedules', connection,
+									parse_dates=['game_date'])
+			except pd.errors.DatabaseError: # Nothing queued yet
+				return {}
+		games['week'] = _parse_weeks(games.week)
+		return {year: games[games.season == year].reset_index(drop=True)
+				for year in sorted(games.season.unique())}
+
+
+def _task_args(row):
+	"Convert a (season, week, team_a, team_b) row to `game` arguments."
+	year, week, team_a, team_b = row
+	return team_a, team_b, int(week) if week.isdigit() else week, year
+
+
+def plan_queue(path, years, week=None, concurrency=_DEFAULT_CONCURRENCY):
+	"""Queue the games of seasons `years` in the `WorkQueue` at `path`.
+
+	If not `None`, `week` limits the games to those in the given week.
+	Planning seasons already queued again leaves their games as they are.
+	Return the queue.
+	"""
+	queue = WorkQueue(path)
+	for year, games in _schedules(years, week, concurrency).items():
+		LOG.info('Queued %d new games from %d', queue.add(year, games), year)
+	return queue
+
+
+def work_queue(path, shards, concurrency=_DEFAULT_CONCURRENCY,
+			   parser=_DEFAULT_PARSER, parse_processes=None, game_timeout=None,
+			   lease=_DEFAULT_LEASE, worker=None):
+	"""Download games from the `WorkQueue` at `path` until there are none left.
+
+	Write the games to shard files in the directory `shards` for
+	`collect_queue` to merge. Run as many workers at once as you like, on
+	any machines that share `path` and `shards`. Each needs a unique `worker`
+	name, by default this machine's name and process ID. A worker that runs
+	out of games waits for other workers' leases to run out in case any of
+	them died. The other arguments are as for `season`. Return the number of
+	games downloaded.
+	"""
+	queue = WorkQueue(path, lease)
+	if worker is None:
+		worker = '%s-%d' % (platform.node(), os.getpid())
+	os.makedirs(shards, exist_ok=True)
+	batch, n, shard = 2 * concurrency, 0, 0
+	while True:
+		tables, failures = {}, []
+		def flush():
+			nonlocal shard
+			if not tables and not failures:
+				return
+			name = '%s-%d.pkl' % (worker, shard)
+			if tables:
+				_write_shard(os.path.join(shards, name), tables)
+			queue.finish(worker, list(tables), name, failures)
+			shard += 1
+			tables.clear()
+			failures.clear()
+		with _heartbeat(queue, worker):
+			for args, table in _iter_downloads(
+					_claimed(queue, worker, concurrency), None, concurrency,
+					parser, failures, parse_processes, game_timeout):
+				tables[args] = table
+				n += 1
+				if len(tables) >= batch:
+					flush()
+			flush()
+		expiry = queue.expiry()
+		if expiry is None:
+			return n
+		# Wait for another worker to finish or for its lease to run out.
+		time.sleep(min(max(0.0, expiry - time.time()), lease) + 1)
+
+
+def _claimed(queue, worker, n):
+	"Generate the arguments of games `worker` claims, `n` at a time."
+	while True:
+		claimed = queue.claim(worker, n)
+		if not claimed:
+			return
+		yield from claimed
+
+
+@contextlib.contextmanager
+def _heartbeat(queue, worker):
+	"Renew `worker`'s leases on `queue` until the `with` statement ends."
+	stop = threading.Event()
+	def beat():
+		while not stop.wait(queue.lease / 3):
+			try:
+				queue.renew(worker)
+			except sqlite3.Error as exc:
+				LOG.error('Could not renew leases: %s', exc)
+	thread = threading.Thread(target=beat, daemon=True)
+	thread.start()
+	try:
+		yield
+	finally:
+		stop.set()
+		thread.join()
+
+
+def _write_shard(path, tables):
+	"Write the dict `tables` of games' tables to `path` all at once."
+	tmp = '%s.%d.tmp' % (path, os.getpid())
+	pd.to_pickle(tables, tmp)
+	os.replace(tmp, path)
+
+
+def collect_queue(path, shards):
+	"""Merge the games `work_queue` downloaded from the `WorkQueue` at `path`.
+
+	`shards` is the directory of shards `work_queue` wrote. Return a
+	`hometeamify`'d table of every downloaded game, like `seasons`' table,
+	and a list of the `game` arguments that failed. Games not yet downloaded
+	are left out. If no games were ever queued, the table is empty and has no
+	columns.
+	"""
+	queue = WorkQueue(path)
+	counts = queue.counts()
+	waiting = counts.get('pending', 0) + counts.get('leased', 0)
+	if waiting:
+		LOG.warning('%d games are not downloaded yet', waiting)
+	results, schedules = queue.results(), queue.schedules()
+	if not schedules:
+		LOG.warning('No games are queued in %s', path)
+		return pd.DataFrame(), queue.failures()
+	builder = _SeasonTable(schedules)
+	for shard in sorted(set(results.values())):
+		# A game downloaded twice, after a lease ran out, counts only from
+		# the shard the queue recorded.
+		for args, table in pd.read_pickle(os.path.join(shards, shard)).items():
+			if results.get(args) == shard:
+				builder.add(args, table)
+	return hometeamify(builder.table()), queue.failures()
+
+
+class LineWatcher:
+	"""Poll the games of one week for line movements not seen before.
+
+	Watch the games of `week` in season `year`. If `year` is `None`, watch the
+	latest season, and if `week` is `None`, watch the week of the next game to
+	kick off.
+
+	Each `poll` downloads the spread and over-under pages of the games due
+	with conditional requests, so a page that hasn't changed since the last
+	poll costs a short 304 response and no parsing. It returns only the rows
+	with a line from some book maker newer than the latest line already seen
+	for that game and book maker.
+
+	Before a game kicks off, it's polled every `interval` seconds and at
+	kickoff. After kickoff the lines hardly move, so the wait doubles after
+	each poll until it would pass `max_interval`, and then the game is done.
+	Kickoff is the schedule's date plus its Time column, if it has one, or
+	1 PM, in local time. `concurrency` and `parser` are as for `season`.
+	"""
+
+	def __init__(self, year=None, week=None, interval=_DEFAULT_WATCH_INTERVAL,
+				 max_interval=_DEFAULT_WATCH_MAX_INTERVAL,
+				 concurrency=_DEFAULT_CONCURRENCY, parser=_DEFAULT_PARSER):
+		if year is None:
+			year = latest_season_before(datetime.date.today())
+		games = season_games(year)
+		kickoffs = _kickoffs(games)
+		if week is None:
+			upcoming = kickoffs >= datetime.datetime.now()
+			if not upcoming.any():
+				raise ValueError('No games left to watch in %d' % year)
+			week = games.week.to_numpy()[upcoming.argmax()]
+		this_week = (games.week == week).to_numpy()
+		self.games, kickoffs = games[this_week], kickoffs[this_week]
+		self.year, self.week = year, week
+		self.interval, self.max_interval = interval, max_interval
+		self.concurrency, self.parser = concurrency, parser
+		keys = list(_schedule_args({year: self.games}))
+		self._rows = {game: i for i, game in enumerate(keys)}
+		self._kickoffs = dict(zip(keys, kickoffs))
+		self._due = dict.fromkeys(keys, datetime.datetime.min)
+		self._waits = {} # Game -> seconds to wait after its next poll
+		self._homeaway = {} # Game -> (hometeam, awayteam) that worked
+		self._pages = {} # URL -> (`_parse_page` value, validators)
+		self._seen = {} # (game, line) -> datetime of the latest line seen
+
+	@property
+	def done(self):
+		"Whether every game is done."
+		return not self._due
+
+	def wait(self, now=None):
+		"Return the seconds until the next game is due, or `None` if done."
+		if self.done:
+			return None
+		now = datetime.datetime.now() if now is None else now
+		return max(0.0, (min(self._due.values()) - now).total_seconds())
+
+	def poll(self, now=None):
+		"""Poll the games that are due at `now`, by default the current time.
+
+		Return a list of `hometeamify`'d tables like `iter_games`', one for
+		each game with new lines, of only the new lines. A game that fails is
+		logged and polled again at its next turn.
+		"""
+		now = datetime.datetime.now() if now is None else now
+		due = [game for game, at in self._due.items() if at <= now]
+		if not due:
+			return []
+		tables = []
+		with futures.ThreadPoolExecutor(min(self.concurrency, len(due))) as pool:
+			futures_to_games = {pool.submit(self._poll_game, *game): game
+								for game in due}
+			for future in futures.as_completed(futures_to_games):
+				game = futures_to_games[future]
+				try:
+					table = future.result()
+				except Exception as exc:
+					LOG.exception('Error from %s: %s', game, exc)
+				else:
+					if table is not None:
+						LOG.info('%d new lines: %s', len(table), game)
+						tables.append(table)
+				self._schedule(game, now)
+		return tables
+
+	def _schedule(self, game, now):
+		"Set when to poll `game` next after polling it at `now`."
+		kickoff = self._kickoffs[game]
+		if now < kickoff:
+			self._due[game] = min(
+				now + datetime.timedelta(seconds=self.interval), kickoff)
+			return
+		wait = self._waits.get(game, self.interval)
+		if wait > self.max_interval:
+			LOG.info('Done watching %s', game)
+			del self._due[game]
+		else:
+			self._due[game] = now + datetime.timedelta(seconds=wait)
+			self._waits[game] = 2 * wait
+
+	def _poll_game(self, team_a, team_b, week, year):
+		"""Return a table of a game's new lines, or `None` if there are none.
+
+		The teams are in the schedule's order. Try the orders of teams that
+		`game_unknown_homeaway` would until one works, and then stick to it.
+		"""
+		game = team_a, team_b, week, year
+		if game in self._homeaway:
+			orderings = [self._homeaway[game]]
+		else:
+			orderings = _homeaway_orderings(*game)
+		for i, (hometeam, awayteam) in enumerate(orderings, 1):
+			try:
+				parsed = self._download(hometeam, awayteam, week, year)
+			except (CantFindTheRightTable, ValueError):
+				_record_homeaway(hometeam, awayteam, week, year, False)
+				if i == len(orderings):
+					raise
+			else:
+				if game not in self._homeaway:
+					_record_homeaway(hometeam, awayteam, week, year, True)
+					self._homeaway[game] = hometeam, awayteam
+				break
+		if parsed is None:
+			return None
+		table = _mark_homeaway(_game_table(parsed, hometeam, awayteam, week),
+							   swapped=hometeam != team_a)
+		table = self._unseen(game, table)
+		if not len(table):
+			return None
+		row = self.games.iloc[[self._rows[game]]]
+		return hometeamify(row.merge(table, on=['hometeam', 'awayteam', 'week']))
+
+	def _download(self, hometeam, awayteam, week, year):
+		"""Return a game's parsed pages as `_game_table` takes them.
+
+		Return `None` if neither page has changed since the last poll.
+		"""
+		parsed, changed = {}, False
+		for name, url in _game_urls(hometeam, awayteam, week, year):
+			page, validators = self._pages.get(url, (None, None))
+			body, validators = _fetch_if_changed(url, validators)
+			if body is not None:
+				page = _parse_page_cached(body, name, year, self.parser)
+				self._pages[url] = page, validators
+				changed = True
+			parsed[name] = page
+		return parsed if changed else None
+
+	def _unseen(self, game, table):
+		"""Return the rows of `game` table `table` with lines not seen before.
+
+		Remember the latest line seen of each book maker's spread and
+		over/under.
+		"""
+		times = table.datetime.to_numpy()
+		new = np.zeros(len(table), dtype=bool)
+		for line in _LINES:
+			present = table[line].notna().to_numpy()
+			seen = self._seen.get((game, line))
+			fresh = present if seen is None else present & (times > seen)
+			if fresh.any():
+				self._seen[game, line] = times[fresh].max()
+				new |= fresh
+		return table[new]
+
+
+def _kickoffs(games):
+	"Return an array of when each game in `season_games` table `games` starts."
+	kickoffs = pd.to_datetime(games.game_date).dt.normalize()
+	if 'Time' in games:
+		times = pd.to_datetime(games.Time.astype(str), format='%I:%M%p',
+							   errors='coerce')
+		kickoffs += (times - times.dt.normalize()).fillna(_DEFAULT_KICKOFF)
+	else:
+		kickoffs += _DEFAULT_KICKOFF
+	return np.array(kickoffs.dt.to_pydatetime(), dtype=object)
+
+
+def watch(year=None, week=None, interval=_DEFAULT_WATCH_INTERVAL,
+		  max_interval=_DEFAULT_WATCH_MAX_INTERVAL,
+		  concurrency=_DEFAULT_CONCURRENCY, parser=_DEFAULT_PARSER):
+	"""Generate tables of new line movements as they appear.
+
+	Poll with a `LineWatcher`, whose arguments these are, sleeping between
+	polls, until every game is done. Each table is a game's new lines.
+	"""
+	watcher = LineWatcher(year, week, interval, max_interval, concurrency,
+						  parser)
+	LOG.info('Watching week %s of %d', watcher.week, watcher.year)
+	while not watcher.done:
+		yield from watcher.poll()
+		wait = watcher.wait()
+		if wait:
+			time.sleep(wait)
+
+
+class SpreadsDataset:
+	"""Fast lookups in a `hometeamify`'d table of line movements.
+
+	`table` is a table like `hometeamify` makes from `season` or `seasons` or
+	like `read_store` returns. Sort the rows by the columns `INDEX`, which
+	become the table's index, so finding a game or a season is a binary search
+	instead of a scan of every row. Also keep, for each team, the sorted
+	positions of the rows of its games, and the rows' positions in order of
+	time. Save the dataset with `save` and get it back, index and all, with
+	`load`.
+
+	Weeks may be numbers or strings, as when `table` comes from reading CSV
+	output with `pd.read_csv`. Raise `ValueError` if `table` has a week that
+	isn't a week of the season.
+	"""
+
+	INDEX = ['season', 'week', 'hometeam', 'awayteam', 'datetime']
+
+	def __init__(self, table):
+		weeks, dtype = _parse_weeks(table.week.astype(str)), _week_dtype()
+		unknown = ~weeks.isin(dtype.categories)
+		if unknown.any():
+			raise ValueError('Unknown week: %s' % ', '.join(
+				map(str, weeks[unknown].unique())))
+		table = table.assign(week=weeks.astype(dtype))
+		self.table = table.set_index(self.INDEX).sort_index()
+		n = len(self.table)
+		home = self.table.index.get_level_values('hometeam')
+		away = self.table.index.get_level_values('awayteam')
+		# Posting lists: each team's rows' positions, home and away, sorted.
+		codes, teams = pd.factorize(np.concatenate(
+			[np.asarray(home, dtype=object), np.asarray(away, dtype=object)]))
+		positions = np.concatenate([np.arange(n), np.arange(n)])
+		order = np.lexsort((positions, codes))
+		bounds = np.searchsorted(codes[order], np.arange(len(teams) + 1))
+		self._teams = {team: positions[order[start:stop]]
+					   for team, start, stop in zip(teams, bounds, bounds[1:])}
+		times = self.table.index.get_level_values('datetime').to_numpy()
+		self._by_time = np.argsort(times, kind='stable')
+		self._times = times[self._by_time]
+		# Where each game's rows start. Within a game, rows are in time order.
+		games = self.table.index.droplevel('datetime')
+		self._game_starts = np.flatnonzero(
+			np.r_[True, games[1:] != games[:-1]]) if n else np.arange(0)
+
+	def __len__(self):
+		return len(self.table)
+
+	def game(self, hometeam, awayteam, week, year):
+		"Return the game's rows in order of time, or no rows if there is none."
+		try:
+			rows = self.table.index.get_loc((year, week, hometeam, awayteam))
+		except (KeyError, TypeError): # TypeError for unknown categories
+			return self.table.iloc[:0]
+		return self.table.iloc[rows]
+
+	def team_season(self, team, year):
+		"Return the rows of every game `team` played in season `year`."
+		start, stop = self.table.index.slice_locs((year,), (year,))
+		rows = self._teams.get(team, np.arange(0))
+		return self.table.iloc[rows[np.searchsorted(rows, start):
+									np.searchsorted(rows, stop)]]
+
+	def between(self, start, end):
+		"""Return the rows observed at or after `start` but before `end`.
+
+		The rows are in order of time.
+		"""
+		left, right = np.searchsorted(
+			self._times, [np.datetime64(pd.Timestamp(t)) for t in (start, end)])
+		return self.table.iloc[self._by_time[left:right]]
+
+	def as_of(self, timestamp):
+		"""Return each game's latest line observed at or before `timestamp`.
+
+		Return one row for each game with any rows by then.
+		"""
+		times = self.table.index.get_level_values('datetime')
+		if not len(times):
+			return self.table
+		seen = (times <= pd.Timestamp(timestamp)).astype(np.intp)
+		counts = np.add.reduceat(seen, self._game_starts)
+		latest = self._game_starts[counts > 0] + counts[counts > 0] - 1
+		return self.table.iloc[latest]
+
+	def save(self, path):
+		"""Save the dataset to the file `path` for `load` to read.
+
+		The file is a pickle, compressed according to `path`'s extension as
+		`pandas.to_pickle` does.
+		"""
+		pd.to_pickle(self, path)
+
+	@classmethod
+	def load(cls, path):
+		"""Return the dataset `save` saved to `path` without sorting it again.
+
+		Like any pickle, only load files you trust.
+		"""
+		dataset = pd.read_pickle(path)
+		if not isinstance(dataset, cls):
+			raise TypeError('%s does not hold a %s' % (path, cls.__name__))
+		return dataset
+
+
+def _years(year, week):
+	"Return the seasons to download given the command line's year and week."
 	latest = latest_season_before(datetime.date.today())
 	if year is None:
 		if week is not None:
 			raise TypeError('Cannot give a week without a year')
-		table, failures = seasons(range(EARLIEST_DATA_SEASON, latest + 1),
-								  timeout=timeout, concurrency=concurrency)
+		return range(EARLIEST_DATA_SEASON, latest + 1)
+	if year < EARLIEST_DATA_SEASON or latest < year:
+		raise ValueError('year=%d not in [%d, %d]' %
+						 (year, EARLIEST_DATA_SEASON, latest))
+	return [year]
+
+
+def _download_and_print(file, year=None, week=None, timeout=None,
+					   concurrency=cpu_count(), engine='threads',
+					   parser=_DEFAULT_PARSER, parse_processes=None,
+					   compact=False, format='csv', features=False,
+					   game_timeout=None):
+	if engine == 'asyncio':
+		get_season = lambda *a, **k: asyncio.run(season_async(*a, **k))
+		get_seasons = lambda *a, **k: asyncio.run(seasons_async(*a, **k))
 	else:
-		if year < EARLIEST_DATA_SEASON or latest < year:
-			raise ValueError('year=%d not in [%d, %d]' %
-							 (year, EARLIEST_DATA_SEASON, latest))
-		if week is None:
-			table, failures = season(year, timeout=timeout,
-									 concurrency=concurrency)
-		else:
-			table, failures = season(year, week=week, timeout=timeout,
-									 concurrency=concurrency)
+		get_season, get_seasons = season, seasons
+	years = _years(year, week)
+	if year is None:
+		table, failures = get_seasons(years, timeout=timeout,
+									  concurrency=concurrency, parser=parser,
+									  parse_processes=parse_processes,
+									  compact=compact, game_timeout=game_timeout)
+	else:
+		table, failures = get_season(year, week=week, timeout=timeout,
+									 concurrency=concurrency, parser=parser,
+									 parse_processes=parse_processes,
+									 compact=compact, game_timeout=game_timeout)
 	if failures:
 		LOG.error('FAILURES:\n%s', '\n'.join(map(str, failures)))
 	table = hometeamify(table)
-	table.to_csv(sys.stdout, index=False)
+	if features:
+		table = game_features(table)
+	_write_table(table, file, format)
+
+
+def _stream_and_print(file, year=None, week=None, timeout=None,
+					 concurrency=cpu_count(), parser=_DEFAULT_PARSER,
+					 parse_processes=None, compact=False, features=False,
+					 game_timeout=None):
+	"Like `_download_and_print` but print each game as soon as it's ready."
+	header, failures = None, []
+	for table in iter_games(_years(year, week), week=week, timeout=timeout,
+							concurrency=concurrency, parser=parser,
+							failures=failures, parse_processes=parse_processes,
+							compact=compact, game_timeout=game_timeout):
+		if features:
+			table = game_features(table)
+		if header is None:
+			header = list(table.columns)
+			table.to_csv(file, index=False)
+		else:
+			table.reindex(columns=header).to_csv(file, index=False, header=False)
+		file.flush()
+	if failures:
+		LOG.error('FAILURES:\n%s', '\n'.join(map(str, failures)))
+
+
+def _collect_and_print(file, path, shards, format='csv', features=False):
+	"Print the `hometeamify`'d table that `collect_queue` returns."
+	table, failures = collect_queue(path, shards)
+	if failures:
+		LOG.error('FAILURES:\n%s', '\n'.join(map(str, failures)))
+	if not len(table.columns): # Nothing was queued
+		return
+	if features:
+		table = game_features(table)
+	_write_table(table, file, format)
+
+
+def _watch_and_print(file, year=None, week=None,
+					interval=_DEFAULT_WATCH_INTERVAL, concurrency=cpu_count(),
+					parser=_DEFAULT_PARSER):
+	"Print the rows of new line movements that `watch` finds as CSV."
+	header = None
+	for table in watch(year, week, interval, concurrency=concurrency,
+					   parser=parser):
+		if header is None:
+			header = list(table.columns)
+			table.to_csv(file, index=False)
+		else:
+			table.reindex(columns=header).to_csv(file, index=False, header=False)
+		file.flush()
+
+
+def _write_table(table, file, format):
+	"""Write `hometeamify`'d `table` to the text file `file` in `format`.
+
+	`format` is one of `_FORMATS`. Binary formats go to `file`'s underlying
+	binary buffer.
+	"""
+	if format == 'csv':
+		table.to_csv(file, index=False)
+		return
+	# Some writers seek backwards, which pipes can't, so write to memory first.
+	buffer = io.BytesIO()
+	_FORMATS[format](table, buffer)
+	file.flush()
+	file.buffer.write(buffer.getvalue())
+	file.buffer.flush()
+
+
+def _write_arrow(table, file, format):
+	"Write `table` as Parquet or Feather, which require pyarrow."
+	# Arrow columns can't mix integers and strings.
+	week = table.week
+	if isinstance(week.dtype, pd.CategoricalDtype):
+		week = week.cat.rename_categories(str)
+	else:
+		week = week.astype(str)
+	table = table.assign(week=week).reset_index(drop=True)
+	if format == 'parquet':
+		table.to_parquet(file, index=False)
+	else:
+		table.to_feather(file)
+
+
+# Stata variable labels, formats, and notes, as `spreads_read.ado` gives them.
+_STATA_VARIABLE_LABELS = {
+	'week': "Week of season on which game occured",
+	'game_date': "Date of game",
+	'datetime': "Time of book maker observation",
+	'home_away_discrepency':
+		"Disagreement between sources on which team was home/away",
+}
+_STATA_FORMATS = [
+	(re.compile(r'season$'), '%4.0f'),
+	(re.compile(r'game_date$'), '%td'),
+	(re.compile(r'datetime$'), '%tc'),
+	(re.compile(r'.*(_spread|_over_under)$'), '%4.1f'),
+	(re.compile(r'home_away_discrepency$'), '%1.0f'),
+	(re.compile(r'turn_overs'), '%2.0f'),
+	(re.compile(r'yards'), '%4.0f'),
+	(re.compile(r'points'), '%2.0f'),
+]
+_STATA_NOTES = (
+	"Sources: pro-football-reference.com for games, points, yards, and "
+	"turnovers. teamrankings.com for spreads and over-unders.",
+	"Pinnacle, BetOnline, and Bookmaker are the book makers that track "
+	"spreads and over-unders.",
+)
+_STATA_DATA_LABEL = "Historical NFL games and the bets placed on them."
+# Which value label each labeled variable uses.
+_STATA_VALUE_LABELS = {'week': 'week', 'hometeam': 'teams', 'awayteam': 'teams'}
+
+
+# The pandas versions, from and up to, that `_StataWriter` is known to work
+# with. It overrides these private methods of pandas' `StataWriter117`.
+_STATA_PANDAS_VERSIONS = (1, 5), (4, 0)
+_STATA_WRITER_HOOKS = ('_set_formats_and_types', '_write_value_label_names',
+					   '_write_value_labels', '_write_characteristics',
+					   '_update_map', '_tag', '_write_bytes')
+
+
+def _write_dta(table, file):
+	"""Write `table` as a Stata .dta file just like `spreads_read.ado` makes.
+
+	With a version of pandas outside `_STATA_PANDAS_VERSIONS`, or one missing
+	any of `_STATA_WRITER_HOOKS`, write only what pandas' public interface
+	can: no formats or notes, and each value label named after its variable.
+	"""
+	from pandas.io.stata import StataWriter117
+	version = tuple(int(n) for n in re.findall(r'\d+', pd.__version__)[:2])
+	low, high = _STATA_PANDAS_VERSIONS
+	if low <= version < high and all(hasattr(StataWriter117, hook)
+									 for hook in _STATA_WRITER_HOOKS):
+		class Writer(_StataWriter, StataWriter117): pass
+	else:
+		LOG.warning("Writing .dta without formats or notes: spreads doesn't "
+					"know how to add them with pandas %s", pd.__version__)
+		Writer = StataWriter117
+	table, value_labels = _stata_table(table)
+	dates = {'game_date': 'td', 'datetime': 'tc'}
+	Writer(file, table, write_index=False,
+		   convert_dates={c: f for c, f in dates.items() if c in table},
+		   data_label=_STATA_DATA_LABEL,
+		   variable_labels=_STATA_VARIABLE_LABELS,
+		   value_labels=value_labels).write_file()
+
+
+def _stata_table(t):
+	"""Convert `t` to the variables, types, and order Stata should get.
+
+	Return the table and the value labels for its labeled variables.
+	"""
+	t = t.drop(columns=['Day'], errors='ignore')
+	# Number weeks and teams like Stata's `encode`, which sorts the values,
+	# and which adds awayteam's values missing from hometeam's to the end.
+	weeks = sorted(t.week.astype(str).unique())
+	teams = sorted(t.hometeam.astype(str).unique())
+	teams += sorted(set(t.awayteam.astype(str).unique()) - set(teams))
+	value_labels = {}
+	for column, labels in (('week', weeks), ('hometeam', teams),
+						   ('awayteam', teams)):
+		codes = {label: code for code, label in enumerate(labels, 1)}
+		t[column] = t[column].astype(str).map(codes).astype('int8')
+		value_labels[column] = dict(enumerate(labels, 1))
+	if 'home_away_discrepency' in t:
+		t['home_away_discrepency'] = t.home_away_discrepency.astype('int8')
+	# Like Stata's `compress`, use the smallest type that loses nothing.
+	for column in t.columns:
+		if t[column].dtype.kind == 'i':
+			t[column] = pd.to_numeric(t[column], downcast='integer')
+		elif t[column].dtype == np.float64:
+			single = t[column].astype('float32')
+			if ((single == t[column]) | t[column].isnull()).all():
+				t[column] = single
+	first = (['season', 'week', 'hometeam', 'awayteam', 'game_date'] +
+			 [c for c in t.columns if c.endswith('spread')] +
+			 [c for c in t.columns if c.endswith('under')] + ['datetime'])
+	first = [c for c in first if c in t.columns]
+	t = t[first + [c for c in t.columns if c not in first]]
+	return t.reset_index(drop=True), value_labels
+
+
+class _StataWriter:
+	"""Mix-in for `StataWriter117` to add `spreads_read.ado`'s extras.
+
+	Pandas names each value label after its variable and has no way to set
+	formats or notes, so this mix-in names the value labels after
+	`_STATA_VALUE_LABELS` and writes each label only once, sets the formats in
+	`_STATA_FORMATS`, and writes `_STATA_NOTES` as Stata's note characteristics.
+	"""
+
+	def _set_formats_and_types(self, dtypes):
+		super()._set_formats_and_types(dtypes)
+		for i, column in enumerate(self.varlist):
+			for pattern, fmt in _STATA_FORMATS:
+				if pattern.match(column):
+					self.fmtlist[i] = fmt
+					break
+
+	def _write_value_label_names(self):
+		self._update_map('value_label_names')
+		names = b''.join(
+			_stata_bytes(_STATA_VALUE_LABELS.get(column, ''), 33)
+			for column in self.varlist)
+		self._write_bytes(self._tag(names, 'value_label_names'))
+
+	def _write_value_labels(self):
+		self._update_map('value_labels')
+		written, labels = set(), []
+		for label in self._value_labels:
+			name = _STATA_VALUE_LABELS[label.labname]
+			if name not in written:
+				written.add(name)
+				label.labname = name
+				labels.append(self._tag(
+					label.generate_value_label(self._byteorder), 'lbl'))
+		self._write_bytes(self._tag(b''.join(labels), 'value_labels'))
+
+	def _write_characteristics(self):
+		# Stata keeps notes in the characteristics _dta[note1], _dta[note2],
+		# and so on, and the number of notes in _dta[note0].
+		self._update_map('characteristics')
+		notes = (str(len(_STATA_NOTES)),) + _STATA_NOTES
+		chars = b''
+		for i, note in enumerate(notes):
+			contents = (_stata_bytes('_dta', 33) +
+						_stata_bytes('note%d' % i, 33) +
+						note.encode(self._encoding) + b'\0')
+			chars += self._tag(
+				struct.pack(self._byteorder + 'I', len(contents)) + contents,
+				'ch')
+		self._write_bytes(self._tag(chars, 'characteristics'))
+
+
+def _stata_bytes(s, length):
+	"Encode `s` as a null-padded Stata string of `length` bytes."
+	return s.encode('latin-1')[:length - 1].ljust(length, b'\0')
+
+
+# Writers for the binary --format choices. See `_write_table`.
+_FORMATS = {
+	'csv': None,
+	'parquet': lambda t, f: _write_arrow(t, f, 'parquet'),
+	'feather': lambda t, f: _write_arrow(t, f, 'feather'),
+	'dta': _write_dta,
+}
 
 
 def parse_args(args):
@@ -383,14 +3352,146 @@ def parse_args(args):
 	a.add_argument('-w', '--week',
 				   help='--year required; return data only from this week')
 	a.add_argument('--timeout', type=float, metavar='T',
-				   help='in seconds')
+				   help=('stop after T seconds, outputting the games finished '
+						 'by then and counting the rest as failures'))
+	a.add_argument('--game-timeout', type=float, metavar='T',
+				   help='give up on any one game after T seconds')
+	a.add_argument('--connect-timeout', type=float, metavar='T',
+				   default=_DEFAULT_CONNECT_TIMEOUT,
+				   help=('give up on connecting to a site after T seconds '
+						 '(default %(default)s)'))
+	a.add_argument('--read-timeout', type=float, metavar='T',
+				   default=_DEFAULT_READ_TIMEOUT,
+				   help=('give up on a page when the site sends nothing for T '
+						 'seconds (default %(default)s)'))
 	a.add_argument('--concurrency', type=int, metavar='N',
-				   default=_DEFAULT_CONCURRENCY,
-				   help='number of processors (default %(default)d)')
+				   help=('number of games to download at once (default %d, or '
+						 '%d with --engine asyncio)' %
+						 (_DEFAULT_CONCURRENCY, _DEFAULT_ASYNC_CONCURRENCY)))
+	a.add_argument('--adaptive', action='store_true',
+				   help=('adapt how many pages to download at once, and how '
+						 'fast, from each site to how quickly and reliably it '
+						 'answers; --concurrency is then only a ceiling '
+						 '(default %d games)' % _DEFAULT_ADAPTIVE_CONCURRENCY))
+	a.add_argument('--engine', choices=('threads', 'asyncio'),
+				   default='threads',
+				   help=('download with a pool of threads or with asyncio '
+						 '(default %(default)s)'))
+	a.add_argument('--stream', action='store_true',
+				   help=('print each game as soon as it is downloaded rather '
+						 'than all at once at the end'))
+	a.add_argument('--watch', action='store_true',
+				   help=('keep polling the games of --week (by default the '
+						 'upcoming week) of --year (by default this season) '
+						 'and print each new line movement as it appears, '
+						 'until the games are over'))
+	a.add_argument('--watch-interval', type=float, metavar='T',
+				   default=_DEFAULT_WATCH_INTERVAL,
+				   help=('with --watch, poll each game every T seconds until '
+						 'kickoff, and less often after (default '
+						 '%(default)s)'))
+	a.add_argument('--incremental', metavar='STORE',
+				   help=('instead of printing CSV, update the SQLite database '
+						 'STORE with games it lacks and games from the past %d '
+						 'days or later' % _CHANGING_DAYS))
+	a.add_argument('--dry-run', action='store_true',
+				   help=('instead of downloading anything, print the URLs a '
+						 'run would download as CSV, with whether each is '
+						 'already cached; lists the games only of seasons '
+						 'whose schedules are cached'))
+	queue = a.add_mutually_exclusive_group()
+	queue.add_argument('--plan', metavar='QUEUE',
+					   help=('instead of downloading, queue the games to '
+							 'download in the SQLite database QUEUE for '
+							 '--work'))
+	queue.add_argument('--work', metavar='QUEUE',
+					   help=('download the games in QUEUE until there are '
+							 'none left, writing them to --shards; run as '
+							 'many workers as you like, on any machines that '
+							 'share QUEUE'))
+	queue.add_argument('--collect', metavar='QUEUE',
+					   help='output the games that --work downloaded')
+	a.add_argument('--shards', metavar='DIR',
+				   help=('directory for --work to write games to and '
+						 '--collect to read them from (default QUEUE.shards)'))
+	a.add_argument('--parser', choices=sorted(_PARSERS),
+				   default=_DEFAULT_PARSER,
+				   help='how to parse spread pages (default %(default)s)')
+	a.add_argument('--parse-processes', type=int, nargs='?', metavar='N',
+				   const=cpu_count(),
+				   help=('only download pages in the threads or event loop, '
+						 'and parse them in a pool of N processes (default %d '
+						 'if N is omitted)' % cpu_count()))
+	a.add_argument('--cache-dir', metavar='DIR', default=_DEFAULT_CACHE_DIR,
+				   help='cache downloaded pages in DIR (default %(default)s)')
+	a.add_argument('--no-cache', action='store_true',
+				   help='download every page even if it is in the cache')
+	a.add_argument('--format', choices=sorted(_FORMATS), default='csv',
+				   help=('write the data to stdout as CSV, Parquet, Feather, '
+						 'or a Stata .dta file ready to use without '
+						 'spreads_read.ado (default %(default)s); Parquet and '
+						 'Feather require pyarrow'))
+	a.add_argument('--features', action='store_true',
+				   help=('instead of every line movement, output one row per '
+						 'game with its opening and closing lines, largest '
+						 'moves, numbers of changes, and results against the '
+						 'spread and over/under'))
+	a.add_argument('--compact', action='store_true',
+				   help=('hold the data in memory with compact types, which '
+						 'takes much less memory for many seasons'))
+	journal = a.add_mutually_exclusive_group()
+	journal.add_argument('--resume', metavar='JOURNAL',
+						 help=('record each finished or failed game in '
+							   'JOURNAL as the run goes, and skip the games '
+							   'JOURNAL already has; run the same command '
+							   'again to pick up where a failed run left off'))
+	journal.add_argument('--retry-failures', metavar='JOURNAL',
+						 help=('like --resume, but download only the games '
+							   'that failed according to JOURNAL'))
+	a.add_argument('--stats', metavar='FILE',
+				   help=('write how long each stage of downloading took, and '
+						 'other statistics, to FILE as JSON'))
 	a.add_argument('--verbosity', default='INFO',
 				   choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
 				   help='set amount of logging output (default: %(default)s)')
 	args = a.parse_args(args)
+	if args.stream and args.engine != 'threads':
+		a.error('--stream requires --engine threads')
+	if args.stream and args.format != 'csv':
+		a.error('--stream requires --format csv')
+	# Check now rather than after downloading everything.
+	if (args.format in ('parquet', 'feather') and
+		importlib.util.find_spec('pyarrow') is None):
+		a.error('--format %s requires pyarrow' % args.format)
+	if args.watch and (args.stream or args.incremental is not None or
+					   args.engine != 'threads' or args.format != 'csv' or
+					   args.features):
+		a.error('--watch prints CSV and cannot be combined with --stream, '
+				'--incremental, --engine, --format, or --features')
+	if args.incremental is not None and (
+			args.stream or args.engine != 'threads' or args.format != 'csv' or
+			args.features or args.compact):
+		a.error('--incremental writes to STORE and cannot be combined with '
+				'--stream, --engine, --format, --features, or --compact')
+	queued = (args.plan, args.work, args.collect) != (None, None, None)
+	if queued and (args.stream or args.watch or args.incremental is not None):
+		a.error('--plan, --work, and --collect cannot be combined with '
+				'--stream, --watch, or --incremental')
+	if args.dry_run and (queued or args.watch or args.incremental is not None
+						 or args.resume is not None
+						 or args.retry_failures is not None):
+		a.error('--dry-run cannot be combined with --plan, --work, --collect, '
+				'--watch, --incremental, --resume, or --retry-failures')
+	if (args.retry_failures is not None and
+		not os.path.exists(args.retry_failures)):
+		a.error('no such journal: %s' % args.retry_failures)
+	if args.concurrency is None:
+		if args.engine == 'asyncio':
+			args.concurrency = _DEFAULT_ASYNC_CONCURRENCY
+		elif args.adaptive:
+			args.concurrency = _DEFAULT_ADAPTIVE_CONCURRENCY
+		else:
+			args.concurrency = _DEFAULT_CONCURRENCY
 	if args.week is not None:
 		try:
 			args.week = int(args.week)
@@ -405,9 +3506,84 @@ def main(args):
 		level=args.verbosity,
 		format="[%(levelname)-8s %(asctime)s] %(message)s")
 	logging.captureWarnings(capture=True)
+	set_request_timeouts(args.connect_timeout, args.read_timeout)
+	if not args.no_cache:
+		set_cache(ResponseCache(args.cache_dir))
+		set_parsed_cache(ParsedCache(os.path.join(args.cache_dir, 'parsed')))
+		set_homeaway_index(
+			HomeAwayIndex(os.path.join(args.cache_dir, 'homeaway.jsonl')))
+	# Each game downloads two pages at once.
+	set_connection_pool(ConnectionPool(per_host=2 * args.concurrency))
+	if args.adaptive:
+		set_limiter(AdaptiveLimiter(max_concurrency=2 * args.concurrency))
+	if args.resume is not None:
+		set_journal(Journal(args.resume))
+	elif args.retry_failures is not None:
+		journal = Journal(args.retry_failures, retry_failures=True)
+		LOG.info('Retrying %d failed games', len(journal.failures))
+		set_journal(journal)
+	if args.stats is None:
+		return _run(args)
+	stats = Stats()
+	add_collector(stats)
+	try:
+		return _run(args)
+	finally:
+		remove_collector(stats)
+		stats.write(args.stats)
+
+
+def _run(args):
+	"Download the data and output it as the command line `args` say."
+	if args.incremental is not None:
+		failures = update_store(
+			args.incremental, _years(args.year, args.week), week=args.week,
+			timeout=args.timeout, concurrency=args.concurrency,
+			parser=args.parser, parse_processes=args.parse_processes,
+			game_timeout=args.game_timeout)
+		if failures:
+			LOG.error('FAILURES:\n%s', '\n'.join(map(str, failures)))
+		return 0
+	if args.plan is not None:
+		plan_queue(args.plan, _years(args.year, args.week), week=args.week,
+				   concurrency=args.concurrency)
+		return 0
+	if args.work is not None:
+		n = work_queue(args.work, args.shards or args.work + '.shards',
+					   concurrency=args.concurrency, parser=args.parser,
+					   parse_processes=args.parse_processes,
+					   game_timeout=args.game_timeout)
+		LOG.info('Downloaded %d games', n)
+		return 0
 	with open(sys.stdout.fileno(), 'w', newline='', closefd=False) as stdout:
+		if args.dry_run:
+			_dry_run(stdout, _years(args.year, args.week), args.week)
+			return 0
+		if args.collect is not None:
+			_collect_and_print(stdout, args.collect,
+							   args.shards or args.collect + '.shards',
+							   format=args.format, features=args.features)
+			return 0
+		if args.watch:
+			_watch_and_print(file=stdout, year=args.year, week=args.week,
+							 interval=args.watch_interval,
+							 concurrency=args.concurrency, parser=args.parser)
+			return 0
+		if args.stream:
+			_stream_and_print(file=stdout, year=args.year, week=args.week,
+							  timeout=args.timeout,
+							  concurrency=args.concurrency, parser=args.parser,
+							  parse_processes=args.parse_processes,
+							  compact=args.compact, features=args.features,
+							  game_timeout=args.game_timeout)
+			return 0
 		_download_and_print(file=stdout, year=args.year, week=args.week,
-							timeout=args.timeout, concurrency=args.concurrency)
+							timeout=args.timeout, concurrency=args.concurrency,
+							engine=args.engine, parser=args.parser,
+							parse_processes=args.parse_processes,
+							compact=args.compact, format=args.format,
+							features=args.features,
+							game_timeout=args.game_timeout)
 	return 0
 
 
@@ -1,6 +1,21 @@
+import io
+import os
+import sys
+import subprocess
 import math
+import asyncio
+import time
 import unittest
 import datetime
+import tempfile
+import contextlib
+import sqlite3
+import socket
+import gzip
+import zlib
+import threading
+import http.server
+from concurrent import futures
 
 import numpy as np
 import pandas as pd
@@ -18,6 +33,17 @@ WEEKS = frozenset(list(range(1, 17 + 1)) + ['wild-card', 'divisional',
 											'conference', 'super-bowl'])
 
 
+def season_page(rows):
+	"Return a season page like pro-football-reference.com's with `rows`."
+	header = ('Week', 'Day', 'Date', '', 'Winner/tie', '', 'Loser/tie', 'PtsW',
+			  'PtsL', 'YdsW', 'TOW', 'YdsL', 'TOL')
+	return ('<table id="games"><thead><tr>%s</tr></thead><tbody>%s'
+			'</tbody></table>' % (
+				''.join('<th>%s</th>' % h for h in header),
+				''.join('<tr>%s</tr>' % ''.join('<td>%s</td>' % c for c in row)
+						for row in rows))).encode()
+
+
 class TestOneGame(unittest.TestCase):
 
 	def test_spread_url(self):
@@ -102,6 +128,14 @@ class TestOneGame(unittest.TestCase):
 		self.assertEqual(row.bookmaker_spread, -3.5)
 		self.assertEqual(row.bookmaker_over_under, 43.5)
 
+	def test_lxml_parser(self):
+		args = 'cardinals', 'rams', 1, 2013
+		expected = spreads.game(*args, parser='pandas')
+		data = spreads.game(*args, parser='lxml')
+		self.assert_columns(data, *args)
+		self.assertTrue(data.equals(expected))
+		self.assertRaises(ValueError, spreads.game, *args, parser='nonesuch')
+
 	def test_game_unknown_homeaway(self):
 		# In reality, ravens were home
 		hometeam, awayteam, week, year = 'broncos', 'ravens', 1, 2013
@@ -149,6 +183,31 @@ class TestSeason(unittest.TestCase):
 		for x in self.table.week:
 			self.assertEqual(x, self.week)
 
+	def test_season_async(self):
+		table, failures = asyncio.run(
+			spreads.season_async(self.year, week=self.week))
+		self.assertFalse(failures)
+		# Both engines put the table together the same way.
+		pd.testing.assert_frame_equal(table, self.table)
+
+	def test_parse_processes(self):
+		table, failures = spreads.season(self.year, week=self.week,
+										 parse_processes=2)
+		self.assertFalse(failures)
+		self.assertEqual(len(table), len(self.table))
+		self.assertEqual(set(table.columns), set(self.table.columns))
+
+	def test_iter_games(self):
+		failures = []
+		tables = list(spreads.iter_games([self.year], week=self.week,
+										 failures=failures))
+		self.assertFalse(failures)
+		expected = spreads.hometeamify(self.table)
+		self.assertEqual(sum(map(len, tables)), len(expected))
+		for table in tables:
+			self.assertEqual(set(table.columns), set(expected.columns))
+			self.assertEqual(len(table.groupby(['hometeam', 'awayteam'])), 1)
+
 	def test_season_games(self):
 		year, nonplayoff = 2013, range(1, 17 + 1)
 		games = spreads.season_games(year)
@@ -261,3 +320,1075 @@ class TestSeason(unittest.TestCase):
 			for v in t[col]:
 				if not math.isnan(v):
 					self.assertGreater(v, 0)
+
+
+class TestResponseCache(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+
+	def test_round_trip(self):
+		cache = spreads.ResponseCache(self.tmp.name)
+		self.assertIsNone(cache.get('http://example.com/a'))
+		cache.put('http://example.com/a', b'<html>a</html>')
+		self.assertEqual(cache.get('http://example.com/a'), b'<html>a</html>')
+		self.assertIsNone(cache.get('http://example.com/b'))
+		# A new cache on the same directory sees the old pages.
+		cache = spreads.ResponseCache(self.tmp.name)
+		self.assertEqual(cache.get('http://example.com/a'), b'<html>a</html>')
+
+	def test_max_age(self):
+		cache = spreads.ResponseCache(self.tmp.name)
+		cache.put('http://example.com/a', b'a')
+		path = cache._path('http://example.com/a')
+		old = time.time() - 100
+		os.utime(path, (old, old))
+		self.assertIsNone(cache.get('http://example.com/a', max_age=10))
+		self.assertEqual(cache.get('http://example.com/a', max_age=1000), b'a')
+		self.assertEqual(cache.get('http://example.com/a'), b'a')
+
+	def test_lru_eviction(self):
+		body = os.urandom(1000) # Incompressible
+		cache = spreads.ResponseCache(self.tmp.name, max_bytes=2500)
+		for i, url in enumerate('abc'):
+			cache.put(url, body)
+			t = time.time() - 100 + i
+			os.utime(cache._path(url), (t, t))
+			if url == 'b':
+				cache.get('a') # Now b is the least recently used
+		self.assertEqual(cache.get('a'), body)
+		self.assertIsNone(cache.get('b'))
+		self.assertEqual(cache.get('c'), body)
+
+	def test_eviction_race(self):
+		# Pages evicted by other threads while being read are hits or misses,
+		# never errors.
+		body = os.urandom(1000)
+		cache = spreads.ResponseCache(self.tmp.name, max_bytes=1500)
+		urls = [str(i) for i in range(20)]
+		def churn():
+			for _ in range(20):
+				for url in urls:
+					cache.put(url, body)
+		with futures.ThreadPoolExecutor(2) as pool:
+			writer = pool.submit(churn)
+			while not writer.done():
+				for url in urls:
+					self.assertIn(cache.get(url), (None, body))
+			writer.result()
+
+	def test_delete(self):
+		cache = spreads.ResponseCache(self.tmp.name)
+		cache.put('a', b'a')
+		cache.put('b', b'bb')
+		size = cache._size - os.path.getsize(cache._path('a'))
+		cache.delete('a')
+		cache.delete('c')
+		self.assertIsNone(cache.get('a'))
+		self.assertEqual(cache.get('b'), b'bb')
+		self.assertEqual(cache._size, size)
+
+	def test_discard_unparsed(self):
+		# Pages that don't parse aren't kept to fail again on the next run.
+		cache = spreads.ResponseCache(self.tmp.name)
+		self.addCleanup(spreads.set_cache, spreads.set_cache(cache))
+		self.addCleanup(spreads.set_parsed_cache, spreads.set_parsed_cache(None))
+		url = spreads.season_games_url(2013)
+		cache.put(url, b'<html>Too many requests</html>')
+		self.assertRaises(ValueError, spreads.season_games, 2013)
+		self.assertIsNone(cache.get(url))
+		def parse(page, name, year):
+			if name == 'spread':
+				raise spreads.CantFindTheRightTable
+			return pd.DataFrame({'datetime': pd.to_datetime([])}), None
+		spreads._PARSERS['test'] = parse
+		self.addCleanup(spreads._PARSERS.pop, 'test')
+		urls = dict(spreads._game_urls('ravens', 'broncos', 1, 2013))
+		for page in urls.values():
+			cache.put(page, b'<html></html>')
+		self.assertRaises(spreads.CantFindTheRightTable, spreads.game,
+						  'ravens', 'broncos', 1, 2013, parser='test')
+		self.assertIsNone(cache.get(urls['spread']))
+
+
+class TestParsedCache(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		self.addCleanup(spreads.set_parsed_cache, spreads.set_parsed_cache(
+			spreads.ParsedCache(self.tmp.name)))
+		self.calls = []
+		def parse(page, name, year):
+			self.calls.append(page)
+			return pd.DataFrame({
+				'pinnacle_spread': [-3., np.nan],
+				'datetime': pd.to_datetime(['2013-09-01 10:00',
+											'2013-09-02 11:30'])}), 'jets'
+		spreads._PARSERS['test'] = parse
+		self.addCleanup(spreads._PARSERS.pop, 'test')
+
+	def test_round_trip(self):
+		first = spreads._parse_page_cached(b'page', 'spread', 2013, 'test')
+		second = spreads._parse_page_cached(b'page', 'spread', 2013, 'test')
+		self.assertEqual(self.calls, [b'page'])
+		pd.testing.assert_frame_equal(first[0], second[0])
+		self.assertEqual(second[1], 'jets')
+		spreads._parse_page_cached(b'new page', 'spread', 2013, 'test')
+		spreads._parse_page_cached(b'page', 'spread', 2014, 'test')
+		self.assertEqual(len(self.calls), 3)
+
+	def test_parser_version(self):
+		spreads._parse_page_cached(b'page', 'spread', 2013, 'test')
+		version = spreads._PARSER_VERSION
+		self.addCleanup(setattr, spreads, '_PARSER_VERSION', version)
+		spreads._PARSER_VERSION = version + 1
+		spreads._parse_page_cached(b'page', 'spread', 2013, 'test')
+		self.assertEqual(len(self.calls), 2)
+
+
+class TestHomeAwayIndex(unittest.TestCase):
+
+	def test_orderings(self):
+		index = spreads.HomeAwayIndex()
+		self.assertEqual(index.orderings('broncos', 'ravens', 1, 2013),
+						 [('broncos', 'ravens'), ('ravens', 'broncos')])
+		index.record('broncos', 'ravens', 1, 2013, False)
+		# An order that failed once may work next time, so it comes last.
+		self.assertEqual(index.orderings('broncos', 'ravens', 1, 2013),
+						 [('ravens', 'broncos'), ('broncos', 'ravens')])
+		index.record('ravens', 'broncos', 1, 2013, True)
+		for a, b in ('broncos', 'ravens'), ('ravens', 'broncos'):
+			self.assertEqual(index.orderings(a, b, 1, 2013),
+							 [('ravens', 'broncos')])
+		# Other games are unaffected.
+		self.assertEqual(index.orderings('broncos', 'ravens', 2, 2013),
+						 [('broncos', 'ravens'), ('ravens', 'broncos')])
+
+	def test_all_orderings_failed(self):
+		index = spreads.HomeAwayIndex()
+		index.record('broncos', 'ravens', 1, 2013, False)
+		index.record('ravens', 'broncos', 1, 2013, False)
+		self.assertEqual(index.orderings('broncos', 'ravens', 1, 2013),
+						 [('broncos', 'ravens'), ('ravens', 'broncos')])
+
+	def test_persistence(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, 'homeaway.jsonl')
+			index = spreads.HomeAwayIndex(path)
+			index.record('seahawks', 'broncos', 'super-bowl', 2013, True)
+			index.record('broncos', 'ravens', 1, 2013, False)
+			index = spreads.HomeAwayIndex(path)
+			# Recording what the index already knows doesn't grow the file.
+			index.record('seahawks', 'broncos', 'super-bowl', 2013, True)
+			index.record('broncos', 'ravens', 1, 2013, False)
+			with open(path) as f:
+				self.assertEqual(len(f.readlines()), 2)
+			self.assertEqual(
+				index.orderings('broncos', 'seahawks', 'super-bowl', 2013),
+				[('seahawks', 'broncos')])
+			self.assertEqual(index.orderings('broncos', 'ravens', 1, 2013),
+							 [('ravens', 'broncos'), ('broncos', 'ravens')])
+
+
+class TestJournal(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.path = os.path.join(tmp.name, 'journal.jsonl')
+		self.table = pd.DataFrame({
+			'datetime': pd.to_datetime(['2013-09-05 21:05', '2013-09-06 10:00']),
+			'bookmaker_spread': [-7, np.nan],
+			'hometeam': 'ravens', 'awayteam': 'broncos', 'week': 1,
+			'home_away_discrepency': True})
+
+	def test_resume(self):
+		done, failed = ('ravens', 'broncos', 1, 2013), ('bears', 'bengals', 1, 2013)
+		journal = spreads.Journal(self.path)
+		journal.record(failed, error=ValueError('oops'))
+		journal.record(done, error=ValueError('oops'))
+		journal.record(done, self.table)
+		journal = spreads.Journal(self.path)
+		self.assertEqual(journal.failures, [failed])
+		self.assertIsNone(journal.table(failed))
+		pd.testing.assert_frame_equal(journal.table(done), self.table)
+		self.assertTrue(journal.wanted(('bills', 'jets', 1, 2013)))
+
+	def test_retry_failures(self):
+		done, failed = ('ravens', 'broncos', 1, 2013), ('bears', 'bengals', 1, 2013)
+		journal = spreads.Journal(self.path)
+		journal.record(done, self.table)
+		journal.record(failed, error='No table')
+		journal = spreads.Journal(self.path, retry_failures=True)
+		self.assertTrue(journal.wanted(done))
+		self.assertTrue(journal.wanted(failed))
+		self.assertFalse(journal.wanted(('bills', 'jets', 1, 2013)))
+
+	def test_retry_failures_season(self):
+		done, failed = ('ravens', 'broncos', 1, 2013), ('bears', 'bengals', 1, 2013)
+		schedule = pd.DataFrame({
+			'week': [1, 1, 1, 2], 'season': 2013,
+			'hometeam': ['ravens', 'bears', 'bills', 'ravens'],
+			'awayteam': ['broncos', 'bengals', 'jets', 'browns']})
+		downloaded = []
+		def game_unknown_homeaway(*args, **kwargs):
+			downloaded.append(args)
+			return self.table.assign(hometeam=args[0], awayteam=args[1])
+		for name, value in [('season_games', lambda year: schedule),
+							('game_unknown_homeaway', game_unknown_homeaway)]:
+			self.addCleanup(setattr, spreads, name, getattr(spreads, name))
+			setattr(spreads, name, value)
+		journal = spreads.Journal(self.path)
+		journal.record(done, self.table)
+		journal.record(failed, error='No table')
+		self.addCleanup(spreads.set_journal, spreads.set_journal(
+			spreads.Journal(self.path, retry_failures=True)))
+		table, failures = spreads.season(2013, week=1, concurrency=2)
+		self.assertEqual(downloaded, [failed])
+		self.assertFalse(failures)
+		self.assertEqual(list(table.hometeam), ['ravens', 'ravens', 'bears',
+												'bears'])
+
+
+class TestStats(unittest.TestCase):
+
+	def test_summary(self):
+		stats = spreads.Stats(slowest=2)
+		stats.timing('fetch', 0.0015)
+		stats.timing('fetch', 0.5)
+		for i, seconds in enumerate((0.1, 0.3, 0.2)):
+			stats.timing('game', seconds, ('broncos', 'ravens', i + 1, 2013))
+		stats.count('bytes_downloaded', 100)
+		stats.count('bytes_downloaded', 50)
+		summary = stats.summary()
+		self.assertEqual(summary['counters'], {'bytes_downloaded': 150})
+		fetch = summary['stages']['fetch']
+		self.assertEqual(fetch['count'], 2)
+		self.assertAlmostEqual(fetch['total'], 0.5015)
+		self.assertEqual(fetch['max'], 0.5)
+		self.assertEqual(fetch['histogram']['<=0.002s'], 1)
+		self.assertEqual(fetch['histogram']['<=0.5s'], 1)
+		self.assertEqual(sum(fetch['histogram'].values()), 2)
+		self.assertEqual(summary['slowest_games'], [
+			{'game': ['broncos', 'ravens', 2, 2013], 'seconds': 0.3},
+			{'game': ['broncos', 'ravens', 3, 2013], 'seconds': 0.2}])
+
+	def test_collectors(self):
+		stats = spreads.Stats()
+		spreads.add_collector(stats)
+		try:
+			with spreads._timing('stage'):
+				pass
+			spreads._count('counter')
+		finally:
+			spreads.remove_collector(stats)
+		with spreads._timing('stage'):
+			pass
+		summary = stats.summary()
+		self.assertEqual(summary['stages']['stage']['count'], 1)
+		self.assertEqual(summary['counters'], {'counter': 1})
+
+
+class TestIncremental(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.games = pd.DataFrame({
+			'season': [2013] * 3,
+			'week': [1, 17, 'super-bowl'],
+			'hometeam': ['broncos', 'jets', 'seahawks'],
+			'awayteam': ['ravens', 'dolphins', 'broncos'],
+			'game_date': pd.to_datetime(['2013-09-05', '2013-12-29',
+										 '2014-02-02'])})
+
+	def test_games_to_update(self):
+		stored = {(2013, '1', 'broncos', 'ravens'),
+				  (2013, '17', 'jets', 'dolphins'),
+				  (2013, 'super-bowl', 'seahawks', 'broncos')}
+		cutoff = datetime.date(2014, 1, 1)
+		games = spreads._games_to_update(self.games, stored, cutoff)
+		self.assertEqual(list(games.week), ['super-bowl'])
+		stored.remove((2013, '1', 'broncos', 'ravens'))
+		games = spreads._games_to_update(self.games, stored, cutoff)
+		self.assertEqual(list(games.week), [1, 'super-bowl'])
+
+	def test_upsert(self):
+		table = self.games.assign(
+			datetime=self.games.game_date, pinnacle_spread=[-7., 3., 2.],
+			home_away_discrepency=[False, True, False])
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, 'spreads.db')
+			with sqlite3.connect(path) as connection:
+				spreads._upsert(connection, table)
+				# Replacing a game replaces all its rows.
+				spreads._upsert(connection, table[table.week == 1].assign(
+					pinnacle_spread=-3.5))
+				self.assertEqual(len(spreads._stored_games(connection)), 3)
+			connection.close()
+			stored = spreads.read_store(path).sort_values('game_date')
+		self.assertEqual(list(stored.week), [1, 17, 'super-bowl'])
+		self.assertEqual(list(stored.pinnacle_spread), [-3.5, 3., 2.])
+		self.assertEqual(list(stored.home_away_discrepency),
+						 [False, True, False])
+		self.assertEqual(stored.game_date.dtype.kind, 'M')
+
+	def test_update_store_unplayed(self):
+		# Week 2 hasn't been played yet.
+		schedule = spreads._parse_season_games(season_page([
+			('1', 'Thu', 'September 5', 'boxscore', 'Denver Broncos', '',
+			 'Baltimore Ravens', 49, 27, 510, 2, 400, 2),
+			('2', 'Thu', 'September 12', 'preview', 'New England Patriots',
+			 '@', 'New York Jets', '', '', '', '', '', '')]), 2013)
+		def game_unknown_homeaway(home, away, week, year, *args, **kwargs):
+			table = pd.DataFrame({
+				'datetime': pd.to_datetime(['2013-09-01 12:00']),
+				'hometeam': home, 'awayteam': away, 'week': week,
+				'favored': home, 'home_away_discrepency': False})
+			for book in ('pinnacle', 'betonline', 'bookmaker'):
+				table[book + '_spread'], table[book + '_over_under'] = -3.5, 45.
+			return table
+		for name, value in [('season_games', lambda year: schedule),
+							('game_unknown_homeaway', game_unknown_homeaway)]:
+			self.addCleanup(setattr, spreads, name, getattr(spreads, name))
+			setattr(spreads, name, value)
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, 'spreads.db')
+			self.assertEqual(spreads.update_store(path, [2013], concurrency=2),
+							 [])
+			stored = spreads.read_store(path).sort_values('game_date')
+		self.assertEqual(list(stored.hometeam), ['broncos', 'jets'])
+		self.assertEqual(list(stored.points_home.isnull()), [False, True])
+		self.assertEqual(stored.points_home.iloc[0], 49)
+		self.assertEqual(list(stored.turn_overs_away.isnull()), [False, True])
+
+	def test_incremental_args(self):
+		spreads.parse_args(['--incremental', 'spreads.db'])
+		for extra in (['--engine', 'asyncio'], ['--format', 'dta'],
+					  ['--features'], ['--compact'], ['--stream']):
+			with contextlib.redirect_stderr(io.StringIO()):
+				self.assertRaises(SystemExit, spreads.parse_args,
+								  ['--incremental', 'spreads.db'] + extra)
+
+
+class TestCompact(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Two rows from the steelers-titans game and one from bills-patriots.
+		self.table = pd.DataFrame({
+			'Day': ['Sun'] * 3, 'week': [1, 1, 'super-bowl'],
+			'season': [2013] * 3,
+			'hometeam': ['steelers', 'steelers', 'bills'],
+			'awayteam': ['titans', 'titans', 'patriots'],
+			'winner': ['titans', 'titans', 'patriots'],
+			'favored': ['steelers', 'steelers', 'patriots'],
+			'PtsW': [16, 16, 23], 'PtsL': [9, 9, 21],
+			'YdsW': [229, 229, 431], 'YdsL': [194, 194, 286],
+			'TOW': [0, 0, 3], 'TOL': [2, 2, 2],
+			'pinnacle_spread': [-7, np.nan, -9.5],
+			'betonline_spread': [-7, -7.5, -9],
+			'bookmaker_spread': [np.nan, -7, -9],
+			'pinnacle_over_under': [40, 41.5, np.nan]})
+
+	def test_compact_table(self):
+		table = spreads.compact_table(self.table)
+		self.assertEqual(list(table.hometeam.cat.categories), list(spreads.TEAMS))
+		self.assertEqual(table.week.dtype, spreads._week_dtype())
+		self.assertEqual(table.PtsW.dtype, np.dtype('int8'))
+		self.assertEqual(table.YdsW.dtype, np.dtype('int16'))
+		self.assertEqual(table.pinnacle_spread.dtype, np.dtype('float32'))
+		self.assertEqual(list(table.week), [1, 1, 'super-bowl'])
+		self.assertTrue(self.table.astype(table.dtypes).equals(table))
+		self.assertRaises(ValueError, spreads.compact_table,
+						  self.table.assign(winner='martians'))
+
+	def test_hometeamify(self):
+		expected = spreads.hometeamify(self.table)
+		self.assertEqual(list(expected.points_home), [9, 9, 21])
+		self.assertEqual(list(expected.yards_away), [229, 229, 431])
+		self.assertEqual(list(expected.pinnacle_spread.fillna(0)),
+						 [-7, 0, 9.5])
+		table = spreads.hometeamify(spreads.compact_table(self.table))
+		self.assertEqual(table.hometeam.dtype, spreads._team_dtype())
+		self.assertEqual(table.points_home.dtype, np.dtype('int8'))
+		self.assertEqual(table.yards_home.dtype, np.dtype('int16'))
+		self.assertEqual(table.pinnacle_spread.dtype, np.dtype('float32'))
+		self.assertEqual(list(table.columns), list(expected.columns))
+		self.assertTrue(spreads.compact_table(expected).equals(table))
+
+
+class TestFormats(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Rows like `hometeamify` gives for the games in `TestCompact`.
+		self.table = pd.DataFrame({
+			'Day': ['Sun'] * 3, 'week': [1, 1, 'super-bowl'],
+			'season': [2013] * 3,
+			'hometeam': ['titans', 'titans', 'patriots'],
+			'awayteam': ['steelers', 'steelers', 'bills'],
+			'game_date': pd.to_datetime(['2013-09-08'] * 2 + ['2014-02-02']),
+			'datetime': pd.to_datetime(['2013-09-01 12:00', '2013-09-02 12:00',
+										'2014-01-30 08:15']),
+			'home_away_discrepency': [False, False, True],
+			'pinnacle_spread': [7, np.nan, -9.5],
+			'betonline_spread': [7, 7.5, -9],
+			'bookmaker_spread': [np.nan, 7, -9],
+			'pinnacle_over_under': [40, 41.5, np.nan],
+			'points_home': [16, 16, 23], 'points_away': [9, 9, 21]})
+
+	def test_dta(self):
+		with tempfile.TemporaryFile() as f:
+			spreads._write_dta(self.table, f)
+			f.seek(0)
+			with pd.io.stata.StataReader(f) as reader:
+				table = reader.read()
+				labels = reader.value_labels()
+				variable_labels = reader.variable_labels()
+				self.assertEqual(reader.data_label,
+								 spreads._STATA_DATA_LABEL)
+			f.seek(0)
+			contents = f.read()
+		self.assertEqual(list(table.columns[:6]),
+						 ['season', 'week', 'hometeam', 'awayteam',
+						  'game_date', 'pinnacle_spread'])
+		self.assertNotIn('Day', table.columns)
+		self.assertEqual(list(table.hometeam), ['titans', 'titans', 'patriots'])
+		self.assertEqual(list(table.week), ['1', '1', 'super-bowl'])
+		self.assertEqual(labels['teams'],
+						 {1: 'patriots', 2: 'titans', 3: 'bills', 4: 'steelers'})
+		self.assertEqual(list(table.awayteam), ['steelers', 'steelers', 'bills'])
+		self.assertEqual(labels['week'], {1: '1', 2: 'super-bowl'})
+		self.assertEqual(variable_labels['week'],
+						 "Week of season on which game occured")
+		self.assertEqual(list(table.home_away_discrepency), [0, 0, 1])
+		self.assertEqual(table.points_home.dtype, np.dtype('int8'))
+		self.assertTrue(table.datetime.equals(self.table.datetime.astype(
+			table.datetime.dtype)))
+		for note in spreads._STATA_NOTES:
+			self.assertIn(note.encode() + b'\0</ch>', contents)
+		for fmt in b'%4.0f', b'%4.1f', b'%1.0f', b'%td', b'%tc':
+			self.assertIn(fmt, contents)
+
+	def test_dta_untested_pandas(self):
+		# Pandas versions the writer doesn't know still get a usable file.
+		self.addCleanup(setattr, spreads, '_STATA_PANDAS_VERSIONS',
+						spreads._STATA_PANDAS_VERSIONS)
+		spreads._STATA_PANDAS_VERSIONS = (0, 0), (0, 1)
+		with tempfile.TemporaryFile() as f:
+			with self.assertLogs(spreads.LOG, 'WARNING'):
+				spreads._write_dta(self.table, f)
+			f.seek(0)
+			with pd.io.stata.StataReader(f) as reader:
+				table = reader.read()
+				labels = reader.value_labels()
+			f.seek(0)
+			contents = f.read()
+		self.assertEqual(list(table.hometeam), ['titans', 'titans', 'patriots'])
+		self.assertEqual(list(table.awayteam), ['steelers', 'steelers', 'bills'])
+		self.assertEqual(labels['week'], {1: '1', 2: 'super-bowl'})
+		self.assertNotIn(spreads._STATA_NOTES[0].encode(), contents)
+
+	def test_arrow_args(self):
+		# Without pyarrow, fail before downloading anything.
+		if 'pyarrow' in sys.modules:
+			self.addCleanup(sys.modules.__setitem__, 'pyarrow',
+							sys.modules['pyarrow'])
+		else:
+			self.addCleanup(sys.modules.pop, 'pyarrow', None)
+		sys.modules['pyarrow'] = None
+		for format in 'parquet', 'feather':
+			with contextlib.redirect_stderr(io.StringIO()):
+				self.assertRaises(SystemExit, spreads.parse_args,
+								  ['--format', format])
+		spreads.parse_args(['--format', 'dta'])
+
+
+class TestDataset(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Out of order on purpose: two games in 2013 and one in 2014.
+		self.table = pd.DataFrame({
+			'season': [2014, 2013, 2013, 2013, 2013],
+			'week': [1, 'super-bowl', 2, 2, 'super-bowl'],
+			'hometeam': ['bears', 'broncos', 'bears', 'bears', 'broncos'],
+			'awayteam': ['lions', 'seahawks', 'vikings', 'vikings', 'seahawks'],
+			'datetime': pd.to_datetime([
+				'2014-09-01', '2014-01-30', '2013-09-10', '2013-09-09',
+				'2014-01-29']),
+			'pinnacle_spread': [-3, 2.5, -7, -6.5, 2]})
+		self.dataset = spreads.SpreadsDataset(self.table)
+
+	def test_lookups(self):
+		game = self.dataset.game('broncos', 'seahawks', 'super-bowl', 2013)
+		self.assertEqual(list(game.pinnacle_spread), [2, 2.5])
+		self.assertEqual(len(self.dataset.game('bears', 'lions', 2, 2013)), 0)
+		bears = self.dataset.team_season('bears', 2013)
+		self.assertEqual(list(bears.pinnacle_spread), [-6.5, -7])
+		self.assertEqual(len(self.dataset.team_season('vikings', 2014)), 0)
+		between = self.dataset.between('2013-09-10', '2014-01-30')
+		self.assertEqual(list(between.pinnacle_spread), [-7, 2])
+		as_of = self.dataset.as_of('2014-01-29 12:00')
+		self.assertEqual(list(as_of.pinnacle_spread), [-7, 2])
+
+	def test_csv_weeks(self):
+		# Reading CSV with a playoff week in it gives every week as a string.
+		dataset = spreads.SpreadsDataset(pd.read_csv(
+			io.StringIO(self.table.to_csv(index=False)),
+			parse_dates=['datetime']))
+		self.assertEqual(list(dataset.game('bears', 'vikings', 2, 2013)
+							  .pinnacle_spread), [-6.5, -7])
+		self.assertTrue(dataset.table.equals(self.dataset.table))
+		self.assertRaises(ValueError, spreads.SpreadsDataset,
+						  self.table.assign(week=[1, 2, 3, 4, 'pro-bowl']))
+
+	def test_save(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'spreads.pkl')
+			self.dataset.save(path)
+			dataset = spreads.SpreadsDataset.load(path)
+		self.assertTrue(dataset.table.equals(self.dataset.table))
+		self.assertEqual(list(dataset.team_season('bears', 2014).index),
+						 list(self.dataset.team_season('bears', 2014).index))
+
+
+class TestFeatures(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Two games, rows out of order, and no betonline or bookmaker lines.
+		self.table = pd.DataFrame({
+			'season': [2013] * 6, 'week': [1, 1, 1, 2, 1, 2],
+			'hometeam': ['bears'] * 3 + ['lions', 'bears', 'lions'],
+			'awayteam': ['lions'] * 3 + ['bears', 'lions', 'bears'],
+			'datetime': pd.to_datetime(['2013-09-03', '2013-09-01',
+										'2013-09-02', '2013-09-09',
+										'2013-09-04', '2013-09-08']),
+			'pinnacle_spread': [-4, -3, np.nan, 1, -4, np.nan],
+			'pinnacle_over_under': [44, 41, 45, np.nan, 43, np.nan],
+			'points_home': [20] * 5 + [17], 'points_away': [17] * 5 + [20]})
+
+	def test_game_features(self):
+		features = spreads.game_features(self.table)
+		self.assertEqual(len(features), 2)
+		week1, week2 = features.iloc[0], features.iloc[1]
+		self.assertEqual(week1.pinnacle_spread_open, -3)
+		self.assertEqual(week1.pinnacle_spread_close, -4)
+		self.assertEqual(week1.pinnacle_spread_max_move, 1)
+		self.assertEqual(week1.pinnacle_spread_changes, 1)
+		self.assertEqual(week1.pinnacle_over_under_max_move, 4)
+		self.assertEqual(week1.pinnacle_over_under_changes, 3)
+		self.assertEqual(week1.pinnacle_ats, -1)
+		self.assertEqual(week1.pinnacle_total, -1)
+		self.assertEqual(week2.pinnacle_spread_close, 1)
+		self.assertEqual(week2.pinnacle_spread_changes, 0)
+		self.assertEqual(week2.pinnacle_ats, -1)
+		self.assertTrue(np.isnan(week2.pinnacle_over_under_open))
+		self.assertTrue(np.isnan(week2.pinnacle_total))
+		self.assertNotIn('datetime', features.columns)
+		self.assertNotIn('betonline_ats', features.columns)
+
+	def test_no_lines(self):
+		features = spreads.game_features(
+			self.table.assign(pinnacle_spread=np.nan))
+		self.assertEqual(len(features), 2)
+		self.assertTrue(features.pinnacle_spread_open.isnull().all())
+		self.assertTrue(features.pinnacle_ats.isnull().all())
+		self.assertEqual(list(features.pinnacle_spread_changes), [0, 0])
+		self.assertEqual(features.pinnacle_over_under_close.iloc[0], 43)
+
+	def test_empty(self):
+		features = spreads.game_features(self.table.iloc[:0])
+		self.assertEqual(len(features), 0)
+		self.assertIn('pinnacle_spread_close', features.columns)
+		self.assertIn('pinnacle_ats', features.columns)
+
+
+class TestLimiter(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.limiter = spreads.AdaptiveLimiter(concurrency=2, rate=1000)
+		self.stats = spreads.Stats()
+		spreads.add_collector(self.stats)
+		self.addCleanup(spreads.remove_collector, self.stats)
+
+	def test_aimd(self):
+		limiter, host = self.limiter, 'example.com'
+		limiter.acquire(host)
+		limiter.acquire(host)
+		# Both slots are taken, so a third download must wait.
+		with limiter._condition:
+			self.assertIsNone(limiter._try_acquire(host))
+		limiter.release(host, 0.1, True)
+		limiter.release(host, 0.1, True)
+		# Slow start: one more for each quick download.
+		self.assertEqual(limiter.limits()[host]['concurrency'], 4)
+		for _ in range(4):
+			limiter.acquire(host)
+		limiter.release(host, 0.1, False)
+		self.assertEqual(limiter.limits()[host]['concurrency'], 2)
+		# Downloads that started before the halving don't halve it again.
+		limiter.release(host, 1, False)
+		self.assertEqual(limiter.limits()[host]['concurrency'], 2)
+		limiter.release(host, 0.1, True)
+		limiter.release(host, 0.1, True)
+		# After the first trouble, limits grow by about one per limit's worth.
+		self.assertEqual(limiter.limits()[host]['concurrency'], 2)
+		limiter.acquire(host)
+		limiter.release(host, 0.1, True)
+		self.assertEqual(limiter.limits()[host]['concurrency'], 3)
+		summary = self.stats.summary()
+		self.assertEqual(summary['counters']['backoffs'], 1)
+		self.assertEqual(summary['gauges']['concurrency example.com'],
+						 {'last': 3, 'min': 2, 'max': 4})
+
+	def test_overloaded(self):
+		from urllib.error import HTTPError, URLError
+		self.assertTrue(spreads._overloaded(HTTPError('', 503, '', {}, None)))
+		self.assertTrue(spreads._overloaded(HTTPError('', 429, '', {}, None)))
+		self.assertFalse(spreads._overloaded(HTTPError('', 404, '', {}, None)))
+		self.assertTrue(spreads._overloaded(URLError(socket.timeout())))
+		self.assertTrue(spreads._overloaded(ConnectionResetError()))
+		self.assertFalse(spreads._overloaded(URLError(socket.gaierror())))
+		self.assertFalse(spreads._overloaded(ValueError()))
+		# Our own deadlines aren't the host's fault, nor are timeouts that
+		# they cut short.
+		with spreads._deadline(0):
+			self.assertRaises(spreads._DeadlineError, spreads._remaining)
+			self.assertFalse(spreads._overloaded(socket.timeout()))
+		cancelled = threading.Event()
+		cancelled.set()
+		with spreads._deadline(cancelled=cancelled):
+			self.assertFalse(spreads._overloaded(socket.timeout()))
+		self.assertFalse(spreads._overloaded(
+			spreads._DeadlineError('Deadline passed')))
+
+
+class TestTimeouts(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.addCleanup(spreads.set_cache, spreads.set_cache(None))
+		# A server that accepts connections but never answers.
+		self.server = socket.socket()
+		self.addCleanup(self.server.close)
+		self.server.bind(('127.0.0.1', 0))
+		self.server.listen()
+		self.url = 'http://127.0.0.1:%d/' % self.server.getsockname()[1]
+
+	def test_read_timeout(self):
+		self.addCleanup(spreads.set_request_timeouts,
+						*spreads.set_request_timeouts(1, 0.2))
+		start = time.monotonic()
+		self.assertRaises(OSError, spreads._fetch, self.url, 2013)
+		self.assertLess(time.monotonic() - start, 1)
+
+	def test_deadline(self):
+		start = time.monotonic()
+		with spreads._deadline(0.2):
+			self.assertRaises(OSError, spreads._fetch, self.url, 2013)
+			self.assertRaises(futures.TimeoutError, spreads._fetch, self.url,
+							  2013)
+		self.assertLess(time.monotonic() - start, 1)
+
+	def test_partial_results(self):
+		def game(team_a, team_b, week, year, parser, parse_pool):
+			while team_a == 'slow':
+				spreads._remaining()
+				time.sleep(0.01)
+			return pd.DataFrame({'hometeam': [team_a]})
+		original = spreads.game_unknown_homeaway
+		spreads.game_unknown_homeaway = game
+		self.addCleanup(setattr, spreads, 'game_unknown_homeaway', original)
+		args = [('slow', 'jets', 1, 2013), ('bills', 'jets', 2, 2013),
+				('slow', 'jets', 3, 2013), ('bills', 'jets', 4, 2013)]
+		for timeouts in dict(timeout=0.2), dict(timeout=5, game_timeout=0.1):
+			failures = []
+			done = list(spreads._iter_downloads(
+				args, concurrency=4, parser=None, failures=failures,
+				**timeouts))
+			self.assertEqual(sorted(arg for arg, _ in done),
+							 [args[1], args[3]])
+			self.assertEqual(sorted(failures), [args[0], args[2]])
+
+
+class TestConnectionPool(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		connections = self.connections = []
+
+		class Handler(http.server.BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+
+			def setup(self):
+				super().setup()
+				connections.append(self.client_address)
+
+			def do_GET(self):
+				if self.path == '/old':
+					self.send_response(301)
+					self.send_header('Location', '/page')
+					self.send_header('Content-Length', '0')
+					self.end_headers()
+					return
+				if self.path != '/page':
+					self.send_error(404)
+					return
+				body = gzip.compress(b'<html>page</html>')
+				self.send_response(200)
+				self.send_header('Content-Encoding', 'gzip')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+				pass
+
+		server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+		server.daemon_threads = True
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		self.url = 'http://127.0.0.1:%d' % server.server_address[1]
+		self.pool = spreads.ConnectionPool()
+		self.addCleanup(self.pool.close)
+
+	def test_keep_alive(self):
+		for path in '/page', '/old', '/page':
+			self.assertEqual(self.pool.get(self.url + path, 5, 5),
+							 b'<html>page</html>')
+		self.assertEqual(len(self.connections), 1)
+		with self.assertRaises(spreads.HTTPError) as cm:
+			self.pool.get(self.url + '/missing', 5, 5)
+		self.assertEqual(cm.exception.code, 404)
+
+	def test_per_host(self):
+		self.assertFalse(self.pool._slots) # No limit by default
+		pool = spreads.ConnectionPool(per_host=1)
+		self.addCleanup(pool.close)
+		host = 'http', self.url.split('//')[1]
+		with futures.ThreadPoolExecutor(4) as threads:
+			slots = set(threads.map(pool._host_slots, [host] * 100))
+		self.assertEqual(len(slots), 1)
+		pool._host_slots(host).acquire() # Another download holds it.
+		with self.assertRaises(spreads.URLError) as cm:
+			pool.get(self.url + '/page', 0.1, 5)
+		# Waiting on ourselves isn't the host's fault.
+		self.assertFalse(spreads._overloaded(cm.exception))
+		pool._host_slots(host).release()
+		self.assertEqual(pool.get(self.url + '/page', 5, 5),
+						 b'<html>page</html>')
+
+	def test_decompress(self):
+		body = b'<html>page</html>'
+		self.assertEqual(spreads._decompress(body, None), body)
+		self.assertEqual(spreads._decompress(zlib.compress(body), 'deflate'),
+						 body)
+		raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+		self.assertEqual(spreads._decompress(
+			raw.compress(body) + raw.flush(), 'deflate'), body)
+
+
+class TestWatch(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Week 2 hasn't been played yet.
+		schedule = spreads._parse_season_games(season_page([
+			('1', 'Thu', 'September 5', 'boxscore', 'Denver Broncos', '',
+			 'Baltimore Ravens', 49, 27, 510, 2, 400, 2),
+			('2', 'Thu', 'September 12', 'preview', 'New England Patriots',
+			 '@', 'New York Jets', '', '', '', '', '', '')]), 2013)
+		original = spreads.season_games
+		spreads.season_games = lambda year: schedule
+		self.addCleanup(setattr, spreads, 'season_games', original)
+		self.addCleanup(spreads.set_homeaway_index,
+						spreads.set_homeaway_index(None))
+		self.watcher = spreads.LineWatcher(2013, 1, interval=60,
+										   max_interval=300)
+		self.pages = [None]
+		self.watcher._download = lambda *game: self.pages.pop()
+
+	def page(self, times, favored='broncos'):
+		"Return parsed spread and over-under pages with lines at `times`."
+		times = pd.to_datetime(times)
+		lines = {book: np.arange(len(times)) - 7.
+				 for book in ('pinnacle', 'betonline', 'bookmaker')}
+		sp = pd.DataFrame({book + '_spread': line
+						   for book, line in lines.items()})
+		ou = pd.DataFrame({book + '_over_under': line + 50
+						   for book, line in lines.items()})
+		sp['datetime'] = ou['datetime'] = times
+		return {'spread': (sp, favored), 'over_under': (ou, None)}
+
+	def test_new_rows(self):
+		start = datetime.datetime(2013, 9, 4)
+		self.pages = [self.page(['09/01/2013 10:00', '09/02/2013 10:00'])]
+		table, = self.watcher.poll(start)
+		self.assertEqual(len(table), 2)
+		self.assertEqual(table.points_home.iloc[0], 49)
+		self.assertEqual(self.watcher.wait(start), 60)
+		# A poll too soon does nothing.
+		self.assertEqual(self.watcher.poll(start), [])
+		start += datetime.timedelta(minutes=1)
+		self.pages = [self.page(['09/01/2013 10:00', '09/02/2013 10:00',
+								 '09/03/2013 10:00'])]
+		table, = self.watcher.poll(start)
+		self.assertEqual(list(table.datetime),
+						 [pd.Timestamp('2013-09-03 10:00')])
+		self.assertEqual(table.pinnacle_spread.iloc[0], -5)
+		start += datetime.timedelta(minutes=1)
+		self.assertEqual(self.watcher.poll(start), [])
+
+	def test_unplayed(self):
+		games = spreads.season_games(2013)
+		self.assertEqual(list(games.hometeam), ['broncos', 'jets'])
+		self.assertEqual(list(games.awayteam), ['ravens', 'patriots'])
+		self.assertTrue(pd.isna(games.winner.iloc[1]))
+		self.assertTrue(games.PtsW.isna().iloc[1])
+		self.assertEqual(games.PtsW.dtype, pd.Int64Dtype())
+		watcher = spreads.LineWatcher(2013, 2, interval=60, max_interval=300)
+		watcher._download = lambda *game: self.pages.pop()
+		self.pages = [self.page(['09/08/2013 10:00', '09/09/2013 10:00'],
+								'patriots')]
+		table, = watcher.poll(datetime.datetime(2013, 9, 10))
+		self.assertEqual(len(table), 2)
+		self.assertEqual(list(table.hometeam), ['jets'] * 2)
+		self.assertTrue(table.points_home.isna().all())
+		# The favored team is the away team, so the home spread is positive.
+		self.assertEqual(list(table.pinnacle_spread), [7, 6])
+		features = spreads.game_features(table)
+		self.assertTrue(np.isnan(features.pinnacle_ats.iloc[0]))
+		compact = spreads.compact_table(table)
+		self.assertEqual(compact.points_home.dtype, pd.Int8Dtype())
+		self.assertTrue(compact.points_home.isna().all())
+
+	def test_back_off_after_kickoff(self):
+		now, waits = datetime.datetime(2013, 9, 5, 12, 59), []
+		while not self.watcher.done:
+			self.pages = [None]
+			self.watcher.poll(now)
+			waits.append(self.watcher.wait(now))
+			now += datetime.timedelta(seconds=waits[-1] or 0)
+		self.assertEqual(waits, [60, 60, 120, 240, None])
+
+	def test_conditional_get(self):
+		etag = '"v1"'
+
+		class Handler(http.server.BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+
+			def do_GET(self):
+				if self.headers.get('If-None-Match') == etag:
+					self.send_response(304)
+					self.end_headers()
+					return
+				self.send_response(200)
+				self.send_header('ETag', etag)
+				self.send_header('Content-Length', '4')
+				self.end_headers()
+				self.wfile.write(b'page')
+
+			def log_message(self, *args):
+				pass
+
+		server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		url = 'http://127.0.0.1:%d/' % server.server_address[1]
+		body, validators = spreads._fetch_if_changed(url)
+		self.assertEqual((body, validators), (b'page', {'ETag': etag}))
+		self.assertEqual(spreads._fetch_if_changed(url, validators),
+						 (None, validators))
+
+
+class TestWorkQueue(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.path = os.path.join(tmp.name, 'queue.db')
+		self.shards = os.path.join(tmp.name, 'shards')
+		self.games = pd.DataFrame({
+			'week': [1, 1, 'super-bowl'], 'season': [2013] * 3,
+			'game_date': pd.to_datetime(['2013-09-05', '2013-09-08',
+										 '2014-02-02']),
+			'hometeam': ['broncos', 'jets', 'seahawks'],
+			'awayteam': ['ravens', 'bucs', 'broncos'],
+			'winner': ['broncos', 'jets', 'seahawks'], 'PtsW': [49, 18, 43],
+			'PtsL': [27, 17, 8], 'YdsW': [510, 300, 341], 'TOW': [2, 1, 0],
+			'YdsL': [400, 250, 306], 'TOL': [2, 3, 4]})
+		self.args = [('broncos', 'ravens', 1, 2013), ('jets', 'bucs', 1, 2013),
+					 ('seahawks', 'broncos', 'super-bowl', 2013)]
+
+	def test_leases(self):
+		queue = spreads.WorkQueue(self.path)
+		self.assertEqual(queue.add(2013, self.games), 3)
+		self.assertEqual(queue.add(2013, self.games), 0)
+		self.assertEqual(queue.claim('a', 2), self.args[:2])
+		self.assertEqual(queue.claim('b', 2), self.args[2:])
+		self.assertEqual(queue.claim('c', 2), [])
+		queue.finish('a', [self.args[0]], 'a-0.pkl', [self.args[1]])
+		self.assertEqual(queue.counts(), {'done': 1, 'failed': 1, 'leased': 1})
+		self.assertEqual(queue.results(), {self.args[0]: 'a-0.pkl'})
+		self.assertEqual(queue.failures(), [self.args[1]])
+		# A dead worker's lease runs out, and another worker takes over.
+		queue.lease = 0
+		queue.renew('b')
+		self.assertEqual(queue.claim('c', 2), self.args[2:])
+		queue.finish('b', self.args[2:], 'b-0.pkl')
+		self.assertEqual(queue.counts()['leased'], 1)
+		queue.finish('c', self.args[2:], 'c-0.pkl')
+		self.assertEqual(queue.results()[self.args[2]], 'c-0.pkl')
+		self.assertEqual(list(queue.schedules()[2013].week),
+						 [1, 1, 'super-bowl'])
+
+	def test_work_and_collect(self):
+		def game(team_a, team_b, week, year, parser, parse_pool):
+			if team_a == 'jets':
+				raise ValueError
+			return pd.DataFrame({
+				'datetime': pd.to_datetime(['2013-09-01', '2013-09-02']),
+				'pinnacle_spread': [-3., -3.5], 'betonline_spread': -3.,
+				'bookmaker_spread': -3., 'hometeam': team_a,
+				'awayteam': team_b, 'week': week, 'favored': team_b,
+				'home_away_discrepency': False})
+		original = spreads.game_unknown_homeaway
+		spreads.game_unknown_homeaway = game
+		self.addCleanup(setattr, spreads, 'game_unknown_homeaway', original)
+		spreads.WorkQueue(self.path).add(2013, self.games)
+		self.assertEqual(spreads.work_queue(self.path, self.shards,
+											concurrency=2, worker='w'), 2)
+		table, failures = spreads.collect_queue(self.path, self.shards)
+		self.assertEqual(failures, [self.args[1]])
+		self.assertEqual(sorted(map(str, table.week)),
+						 ['1', '1', 'super-bowl', 'super-bowl'])
+		self.assertEqual(list(table.pinnacle_spread), [3., 3.5, 3., 3.5])
+		self.assertEqual(list(table.points_home[:1]), [49])
+
+	def test_collect_nothing(self):
+		table, failures = spreads.collect_queue(self.path, self.shards)
+		self.assertEqual(len(table), 0)
+		self.assertEqual(failures, [])
+
+	def test_replace_schedule(self):
+		queue = spreads.WorkQueue(self.path)
+		queue.add(2013, self.games)
+		queue.add(2014, self.games.assign(season=2014))
+		self.assertEqual(queue.add(2013, self.games[self.games.week == 1]), 0)
+		schedules = queue.schedules()
+		self.assertEqual(list(schedules[2013].week), [1, 1])
+		self.assertEqual(len(schedules[2014]), 3)
+		self.assertEqual(schedules[2013].game_date.dtype.kind, 'M')
+		self.assertEqual(list(schedules[2013].PtsW), [49, 18])
+
+
+class TestStartup(unittest.TestCase):
+
+	def test_lazy_imports(self):
+		# Importing, building URLs, and parsing arguments shouldn't import
+		# the parsing stack.
+		code = ('import sys, spreads; spreads.spread_url("jets", "bills", 1, '
+				'2013); spreads.parse_args(["--year", "2013"]); '
+				'print(",".join(m for m in ("pandas.core.frame", "bs4.element", '
+				'"lxml.etree") if m in sys.modules))')
+		output = subprocess.run(
+			[sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+			cwd=os.path.dirname(os.path.abspath(spreads.__file__)))
+		self.assertEqual(output.stdout.strip(), b'')
+
+	def test_schedule_page_args(self):
+		page = season_page([
+			('1', 'Thu', 'September 5', 'boxscore', 'Denver Broncos', '',
+			 'Baltimore Ravens', 49, 27, 510, 2, 400, 2),
+			('Week', 'Day', 'Date', '', 'Winner/tie', '', 'Loser/tie', 'PtsW',
+			 'PtsL', 'YdsW', 'TOW', 'YdsL', 'TOL'),
+			('', '', 'Playoffs', '', '', '', '', '', '', '', '', '', ''),
+			('SuperBowl', 'Sun', 'February 2', 'boxscore', 'Seattle Seahawks',
+			 '@', 'Denver Broncos', 43, 8, 341, 0, 306, 4)])
+		expected = [('broncos', 'ravens', 1, 2013),
+					('broncos', 'seahawks', 'super-bowl', 2013)]
+		self.assertEqual(spreads._schedule_page_args(page, 2013), expected)
+		games = spreads._parse_season_games(page, 2013)
+		self.assertEqual(list(spreads._schedule_args({2013: games})), expected)
+
+
+class TestAssembly(unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.schedules = {year: pd.DataFrame({
+			'week': [1, 2, 'super-bowl'], 'season': [year] * 3,
+			'hometeam': ['steelers', 'bills', 'broncos'],
+			'awayteam': ['titans', 'patriots', 'seahawks'],
+			'winner': ['titans', 'patriots', 'seahawks']})
+			for year in (2013, 2014)}
+		self.times = pd.to_datetime(['2013-09-01 12:00', '2013-09-02 12:00',
+									 '2013-09-03 12:00'])
+
+	def game(self, n, **columns):
+		return pd.DataFrame(dict(datetime=self.times[:n], **columns))
+
+	def test_season_table(self):
+		builder = spreads._SeasonTable(self.schedules)
+		tables = {('bills', 'patriots', 2, 2014): self.game(
+					  2, pinnacle_spread=[-3.0, -3.5], favored=['bills'] * 2),
+				  ('steelers', 'titans', 1, 2013): self.game(
+					  1, betonline_spread=[7.0], favored=['titans']),
+				  ('broncos', 'seahawks', 'super-bowl', 2013): self.game(
+					  3, pinnacle_spread=[1.0, 1.5, 2.0],
+					  favored=['seahawks'] * 3)}
+		for args, table in tables.items():
+			builder.add(args, table.assign(
+				hometeam=args[0], awayteam=args[1], week=args[2]))
+		self.assertRaises(AssertionError, builder.add,
+						  ('broncos', 'seahawks', 'super-bowl', 2013),
+						  self.game(1))
+		keys = ['hometeam', 'awayteam', 'week', 'season']
+		expected = pd.concat(self.schedules.values(), ignore_index=True).merge(
+			pd.concat([t.assign(hometeam=a[0], awayteam=a[1], week=a[2],
+								season=a[3]) for a, t in tables.items()]),
+			on=keys)
+		# Rows and the games' columns come in schedule order, which `merge`
+		# doesn't promise.
+		table = builder.table()
+		order = keys + ['datetime']
+		self.assertEqual(list(table.season), [2013] * 4 + [2014] * 2)
+		pd.testing.assert_frame_equal(
+			table.sort_values(order, ignore_index=True),
+			expected.sort_values(order, ignore_index=True), check_like=True)
+		self.assertEqual(list(spreads._SeasonTable(self.schedules).table()
+							  .columns[:5]), list(self.schedules[2013].columns))
+
+	def test_season_table_compact(self):
+		schedules = {2013: spreads.compact_table(self.schedules[2013])}
+		builder = spreads._SeasonTable(schedules)
+		favored = pd.Categorical(['titans'], dtype=spreads._team_dtype())
+		builder.add(('steelers', 'titans', 1, 2013), self.game(
+			1, favored=favored, hometeam='steelers', awayteam='titans', week=1))
+		table = builder.table()
+		self.assertEqual(table.hometeam.dtype, spreads._team_dtype())
+		self.assertEqual(table.favored.dtype, spreads._team_dtype())
+		self.assertEqual(list(table.favored), ['titans'])
+
+	def test_merge_on_datetime(self):
+		sp = self.game(2, pinnacle_spread=[-3.0, -3.5]).iloc[::-1]
+		ou = self.game(3, pinnacle_over_under=[40.0, 41.0, 42.0]).iloc[1:]
+		expected = sp.merge(ou, on=['datetime'], how='outer')
+		pd.testing.assert_frame_equal(spreads._merge_on_datetime(sp, ou),
+									  expected)
+		# Repeated times fall back to merge.
+		sp = self.game(1, pinnacle_spread=[-3.0]).iloc[[0, 0]]
+		pd.testing.assert_frame_equal(
+			spreads._merge_on_datetime(sp, ou),
+			sp.merge(ou, on=['datetime'], how='outer'))